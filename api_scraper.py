@@ -0,0 +1,181 @@
+import asyncio
+import httpx
+
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit, parse_qs
+from utils.response_utils import extract_slots, extract_booked_date
+from utils.metrics_utils import add_bytes
+
+# Defaults for the [API] section of config.ini
+DEFAULT_AVAILABILITY_PATH = "/api/public/booking/{booking_id}/sites/{site_id}/availabilities?from={start}&to={end}&token={token}"
+DEFAULT_SITE_ID = "1029"
+DEFAULT_HORIZON_DAYS = 90
+
+class SessionExpired(Exception):
+    """
+    Raised when the portal rejects the session and it has to be bootstrapped again.
+    """
+
+class AvailabilityClient:
+    """
+    Polls the portal's availability endpoints over a pooled keep-alive HTTP connection.
+    """
+    def __init__(self, booking_url, availability_path=DEFAULT_AVAILABILITY_PATH, site_id=DEFAULT_SITE_ID,
+                 horizon_days=DEFAULT_HORIZON_DAYS, offers_path=None, booking_path=None, session_bootstrap=None):
+        """
+        Args:
+            booking_url: Booking URL from the confirmation email.
+            availability_path: Path template of the availability endpoint. Placeholders:
+                {booking_id}, {token}, {site_id}, {start}, {end}.
+            site_id: Test center ID, e.g. "1029" for Eupen.
+            horizon_days: Number of days from today to query.
+            offers_path: Optional path template for the offers of a single day, used when the
+                availability endpoint only lists days. Additional placeholder: {date}.
+            booking_path: Optional path template of the booking, used to read the scheduled date.
+            session_bootstrap: Optional async callable taking the booking URL and returning a dict
+                of session cookies, e.g. bootstrap_session_with_browser.
+        """
+        parts = urlsplit(booking_url)
+        self.booking_url = booking_url
+        self.base_url = f"{parts.scheme}://{parts.netloc}"
+        self.params = {
+            "booking_id": parts.path.rstrip("/").split("/")[-1],
+            "token": parse_qs(parts.query).get("token", [""])[0],
+            "site_id": site_id,
+        }
+        self.availability_path = availability_path
+        self.offers_path = offers_path
+        self.booking_path = booking_path
+        self.horizon_days = horizon_days
+        self.session_bootstrap = session_bootstrap
+        self.client = None
+
+    async def open(self):
+        """
+        Creates the connection pool and obtains a session from the booking page.
+        """
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Accept": "application/json", "Accept-Language": "de-DE,de;q=0.9"},
+            limits=httpx.Limits(max_keepalive_connections=5, keepalive_expiry=300),
+            timeout=httpx.Timeout(15.0),
+            follow_redirects=True,
+        )
+        await self.bootstrap()
+
+    async def close(self):
+        """
+        Closes the connection pool.
+        """
+        if self.client:
+            await self.client.aclose()
+            self.client = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def bootstrap(self, use_browser=False):
+        """
+        Obtains session cookies, by plain GET of the booking URL or through session_bootstrap.
+        Args:
+            use_browser: If True and session_bootstrap is set, use it instead of a plain GET.
+        """
+        self.client.cookies.clear()
+        if use_browser and self.session_bootstrap:
+            print("Bootstrapping API session with the browser.")
+            for name, value in (await self.session_bootstrap(self.booking_url)).items():
+                self.client.cookies.set(name, value)
+        else:
+            await self.client.get(self.booking_url, headers={"Accept": "text/html"})
+
+    async def get_json(self, path_template, **params):
+        """
+        Fetches a JSON document, bootstrapping the session again once if it was rejected.
+        Args:
+            path_template: Path template relative to the portal.
+            params: Additional placeholders for the template.
+        Returns:
+            Decoded JSON response.
+        """
+        path = path_template.format(**self.params, **params)
+        for use_browser in (False, True):
+            try:
+                return await self._get_json(path)
+            except SessionExpired:
+                await self.bootstrap(use_browser=use_browser)
+        return await self._get_json(path)
+
+    async def _get_json(self, path):
+        response = await self.client.get(path)
+        add_bytes(received=len(response.content))
+        if response.status_code in (401, 403, 419, 440):
+            raise SessionExpired(f"{response.status_code} for {path}")
+        response.raise_for_status()
+        return response.json()
+
+    async def find_test_dates(self, date_languages=None, today=None):
+        """
+        Finds available test dates within the horizon.
+        Args:
+            date_languages: Optional list of language codes, e.g. ["de", "fr"].
+            today: Optional date to start from, defaults to today.
+        Returns:
+            Sorted list of datetime objects for available test dates.
+        """
+        start = today or datetime.now().date()
+        end = start + timedelta(days=self.horizon_days)
+        payload = await self.get_json(self.availability_path, start=start.isoformat(), end=end.isoformat())
+        slots, days = extract_slots(payload, date_languages)
+
+        # Fetch the offers of days that were listed without times concurrently
+        missing_days = sorted(days - {dt.date() for dt in slots})
+        if missing_days and self.offers_path:
+            payloads = await asyncio.gather(
+                *(self.get_json(self.offers_path, date=day.isoformat()) for day in missing_days)
+            )
+            for day_payload in payloads:
+                slots |= extract_slots(day_payload, date_languages)[0]
+        elif missing_days:
+            print(f"Availability response lists {len(missing_days)} days without offer times and no OFFERS_PATH is set.")
+
+        return sorted(dt for dt in slots if start <= dt.date() < end)
+
+    async def get_scheduled_date(self):
+        """
+        Reads the currently scheduled date from the booking endpoint.
+        Returns:
+            datetime of the booked offer, or None if booking_path is not set or has no offer.
+        """
+        if not self.booking_path:
+            return None
+        try:
+            return extract_booked_date(await self.get_json(self.booking_path))
+        except Exception as e:
+            print(f"Could not read scheduled date from API: {e}")
+            return None
+
+async def bootstrap_session_with_browser(booking_url, headless=True):
+    """
+    Loads the booking page in Chromium and returns the session cookies it received.
+    Args:
+        booking_url: Booking URL from the confirmation email.
+        headless: Run the browser headless.
+    Returns:
+        Dict of cookie names to values.
+    """
+    from playwright.async_api import async_playwright
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        try:
+            context = await browser.new_context(locale="de-DE")
+            page = await context.new_page()
+            await page.goto(booking_url)
+            await page.wait_for_load_state("networkidle")
+            return {cookie["name"]: cookie["value"] for cookie in await context.cookies()}
+        finally:
+            await browser.close()
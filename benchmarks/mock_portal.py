@@ -0,0 +1,675 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from calendar import monthrange
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.config_utils import DEFAULT_POSTAL_CODE, DEFAULT_CENTER
+
+# Size of a generated calendar: number of months, days with offers per month, offers per
+# day and the delay of every API response in milliseconds.
+Scenario = namedtuple("Scenario", ["name", "months", "days_per_month", "slots_per_day", "latency_ms"])
+
+# Offers of a day start at 07:30 and follow each other every 45 minutes
+FIRST_OFFER_MINUTES = 7 * 60 + 30
+OFFER_INTERVAL_MINUTES = 45
+MAX_SLOTS_PER_DAY = 16
+
+# Other test centers listed by the site selector
+OTHER_SITES = [
+    {"id": "1030", "name": "Führerscheinzentrum Kettenis (1030)", "postalCodes": ["4701", "4731"]},
+    {"id": "1001", "name": "Centre d'examen Liège (1001)", "postalCodes": ["4000", "4020"]},
+]
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="de">
+<head>
+<meta charset="utf-8">
+<title>Rendez-vous permis de conduire</title>
+<link rel="stylesheet" href="/assets/app.css">
+<script>window.PORTAL = {portal};</script>
+<script src="/assets/main.js" defer></script>
+</head>
+<body>
+<header><img src="/assets/logo.svg" alt="" width="120" height="32"></header>
+<main id="app"></main>
+<div id="cookies"></div>
+</body>
+</html>
+"""
+
+STYLESHEET = """
+@font-face { font-family: "Portal"; src: url("/assets/portal.woff2") format("woff2"); }
+body { font-family: "Portal", sans-serif; margin: 0 0 80px 0; }
+.hidden { display: none !important; }
+cuip-cookies-consent-banner { display: block; position: fixed; bottom: 0; left: 0; right: 0; padding: 12px; background: #eee; }
+app-booking, app-section, app-appointment, app-site-selector, app-availability, app-date-navigator, app-offer-button { display: block; margin: 8px; }
+app-date-navigator { border: 1px solid #ccc; }
+.date-nav-toggle { padding: 8px; cursor: pointer; }
+.ngb-dp-header { display: flex; align-items: center; }
+.ngb-dp-month-name { flex: 1; text-align: center; }
+.ngb-dp-week { display: flex; }
+.ngb-dp-day { width: 40px; height: 36px; }
+.ngb-dp-day.disabled .simple-day, .text-muted .simple-day { color: #aaa; }
+.simple-day { display: inline-block; width: 28px; cursor: pointer; }
+.available-offer-bubble { display: inline-block; width: 6px; height: 6px; border-radius: 3px; background: green; }
+.ng-option { padding: 6px; cursor: pointer; }
+.flag-icon { display: inline-block; width: 16px; height: 12px; margin-left: 4px; background: #999; }
+app-confirmation-dialog { display: block; margin: 8px; padding: 8px; border: 1px solid #036; }
+"""
+
+LOGO = b'<svg xmlns="http://www.w3.org/2000/svg" width="120" height="32"><rect width="120" height="32" fill="#036"/></svg>'
+
+# Angular-like single page app: every step of the booking flow with the elements and
+# texts the scraper looks for
+SCRIPT = r"""
+"use strict";
+const MONTH_NAMES = ["Januar", "Februar", "März", "April", "Mai", "Juni", "Juli", "August",
+                     "September", "Oktober", "November", "Dezember"];
+const WEEKDAY_NAMES = ["Sonntag", "Montag", "Dienstag", "Mittwoch", "Donnerstag", "Freitag", "Samstag"];
+const app = document.getElementById("app");
+const cookies = document.getElementById("cookies");
+const calendarPath = `/public/booking/${PORTAL.bookingId}/availability`;
+const state = {
+    step: location.pathname === calendarPath && document.cookie.includes("SESSION=") ? "calendar" : "overview",
+    consent: document.cookie.includes("consent=1"),
+    sites: null,
+    month: null,
+    days: {},
+    open: true,
+    selected: null,
+    offers: null,
+    chosen: null,
+    notice: null,
+};
+
+function pad(n) {
+    return String(n).padStart(2, "0");
+}
+
+function isoDate(d) {
+    return `${d.getFullYear()}-${pad(d.getMonth() + 1)}-${pad(d.getDate())}`;
+}
+
+function monthStart(offset) {
+    const [year, month] = PORTAL.start.split("-").map(Number);
+    return new Date(year, month - 1 + offset, 1);
+}
+
+function formatScheduled(value) {
+    const d = new Date(value || PORTAL.scheduled);
+    return `${WEEKDAY_NAMES[d.getDay()]} ${d.getDate()} ${MONTH_NAMES[d.getMonth()].toLowerCase()} ${d.getFullYear()}  ` +
+        `${pad(d.getHours())}:${pad(d.getMinutes())}`;
+}
+
+async function api(path, body) {
+    const separator = path.includes("?") ? "&" : "?";
+    const options = body ? {method: "POST", headers: {"Content-Type": "application/json"}, body: JSON.stringify(body)} : {};
+    const response = await fetch(`${path}${separator}token=${encodeURIComponent(PORTAL.token)}`, options);
+    return response.ok ? response.json() : null;
+}
+
+async function reschedule() {
+    const offer = state.chosen;
+    const booking = await api(`/api/public/booking/${PORTAL.bookingId}/reschedule`,
+                              {siteId: PORTAL.siteId, startTime: offer.startTime, language: offer.language});
+    if (booking) {
+        PORTAL.scheduled = booking.offer.startTime;
+        state.notice = '<div class="alert alert-success">Ihre Reservierung wurde geändert.</div>';
+    } else {
+        state.notice = '<div class="alert alert-danger">Dieser Termin ist nicht mehr verfügbar.</div>';
+    }
+    history.pushState(null, "", `/public/booking/${PORTAL.bookingId}?token=${encodeURIComponent(PORTAL.token)}`);
+    go("overview");
+}
+
+async function loadMonth(offset) {
+    const first = monthStart(offset);
+    const next = monthStart(offset + 1);
+    const days = await api(`/api/public/booking/${PORTAL.bookingId}/sites/${PORTAL.siteId}/availabilities` +
+                           `?from=${isoDate(first)}&to=${isoDate(next)}`);
+    state.month = offset;
+    state.days = {};
+    for (const day of days) {
+        state.days[day.date] = day;
+    }
+    render();
+}
+
+async function loadOffers(dateText) {
+    const body = await api(`/api/public/booking/${PORTAL.bookingId}/sites/${PORTAL.siteId}/offers?date=${dateText}`);
+    if (state.selected !== dateText) return;
+    state.offers = body.offers;
+    render();
+}
+
+async function searchSites(query) {
+    const sites = await api(`/api/public/sites?query=${encodeURIComponent(query)}`);
+    const input = app.querySelector("app-site-selector input");
+    if (!input || input.value !== query) return;
+    state.sites = sites;
+    renderSites();
+}
+
+function renderCookies() {
+    cookies.innerHTML = state.consent ? "" : `
+        <cuip-cookies-consent-banner>
+            <p>Diese Website verwendet Cookies.</p>
+            <button type="button" data-action="consent">Alle akzeptieren</button>
+        </cuip-cookies-consent-banner>`;
+}
+
+function renderSites() {
+    const panel = app.querySelector(".ng-dropdown-panel");
+    panel.innerHTML = (state.sites || []).map(site => `
+        <div class="ng-option" data-action="site" data-site="${site.id}">
+            <span class="site-text">${site.name}</span>
+        </div>`).join("");
+}
+
+function renderDatepicker() {
+    const first = monthStart(state.month);
+    const year = first.getFullYear();
+    const month = first.getMonth();
+    // Weeks start on Monday and are filled up with the days of the neighbouring months
+    const cursor = new Date(year, month, 1 - (first.getDay() + 6) % 7);
+    const weeks = [];
+    while (weeks.length === 0 || cursor.getMonth() === month) {
+        const cells = [];
+        for (let i = 0; i < 7; i++) {
+            const outside = cursor.getMonth() !== month;
+            const weekend = cursor.getDay() === 0 || cursor.getDay() === 6;
+            const dateText = isoDate(cursor);
+            const bubble = !outside && state.days[dateText] ? '<span class="available-offer-bubble"></span>' : "";
+            cells.push(`
+                <div class="ngb-dp-day${weekend ? " disabled" : ""}" role="gridcell"
+                     aria-label="${cursor.getDate()}/${cursor.getMonth() + 1}/${cursor.getFullYear()}">
+                    <div class="day${outside ? " text-muted" : ""}">
+                        <span class="simple-day" data-action="day" data-date="${dateText}">${cursor.getDate()}</span>${bubble}
+                    </div>
+                </div>`);
+            cursor.setDate(cursor.getDate() + 1);
+        }
+        weeks.push(`<div class="ngb-dp-week">${cells.join("")}</div>`);
+    }
+    return `
+        <ngb-datepicker>
+            <div class="ngb-dp-header">
+                <button type="button" title="Previous month" data-action="previous"${state.month === 0 ? " disabled" : ""}>&lsaquo;</button>
+                <div class="ngb-dp-month-name">${MONTH_NAMES[month]} ${year}</div>
+                <button type="button" title="Next month" data-action="next"${state.month >= PORTAL.months - 1 ? " disabled" : ""}>&rsaquo;</button>
+            </div>
+            <div class="ngb-dp-month">${weeks.join("")}</div>
+        </ngb-datepicker>`;
+}
+
+function renderOffers() {
+    if (!state.offers) return "";
+    return `
+        <div class="sites-offers">
+            ${state.offers.map((offer, index) => `
+                <app-offer-button>
+                    <button type="button" class="cuip-button" data-action="offer" data-index="${index}">
+                        <span class="cuip-button-content">
+                            <div class="d-flex align-items-center justify-content-center">${offer.startTime.slice(11, 16)}<span class="flag-icon flag-icon-${offer.language}"></span></div>
+                        </span>
+                    </button>
+                </app-offer-button>`).join("")}
+        </div>`;
+}
+
+const VIEWS = {
+    overview: () => `
+        ${state.notice || ""}
+        <app-booking>
+            <h4>Ihre Reservierung</h4>
+            <app-offer><span class="offer-date">${formatScheduled()}</span></app-offer>
+            <button type="button" class="cuip-button" data-action="change">Verändern</button>
+        </app-booking>`,
+    change: () => `
+        <app-section>
+            <h5>Kandidat</h5>
+            <button type="button" class="cuip-button" data-action="none">Verändern</button>
+        </app-section>
+        <app-section>
+            <h5>Termin</h5>
+            <p>${formatScheduled()}</p>
+            <button type="button" class="cuip-button" data-action="appointment">Verändern</button>
+        </app-section>`,
+    appointment: () => `
+        <app-appointment>
+            <p>${formatScheduled()}</p>
+            <button type="button" class="cuip-button" data-action="other">Wählen Sie eine andere Verfügbarkeit aus</button>
+        </app-appointment>`,
+    site: () => `
+        <app-site-selector>
+            <div class="ng-select">
+                <div class="ng-select-container">
+                    <div class="ng-placeholder">Ort, Postleitzahl, Führerscheinzentrum</div>
+                    <input type="text" autocomplete="off">
+                </div>
+                <div class="ng-dropdown-panel"></div>
+            </div>
+        </app-site-selector>`,
+    calendar: () => state.month === null ? "" : `
+        <app-availability>
+            <app-date-navigator>
+                <div class="date-nav-toggle" data-action="toggle">${state.selected || "Datum wählen"}</div>
+                ${state.open ? renderDatepicker() : ""}
+            </app-date-navigator>
+            ${renderOffers()}
+            <button type="button" class="cuip-button-empty-danger" data-action="abort">
+                <span class="cuip-button-content">Änderung abbrechen</span>
+            </button>
+        </app-availability>`,
+    confirm: () => `
+        <app-confirmation-dialog>
+            <p>Neuer Termin: <span class="offer-date">${formatScheduled(state.chosen.startTime)}</span></p>
+            <button type="button" class="cuip-button-primary" data-action="confirm">
+                <span class="cuip-button-content">Bestätigen</span>
+            </button>
+            <button type="button" class="cuip-button-empty-danger" data-action="abort">
+                <span class="cuip-button-content">Änderung abbrechen</span>
+            </button>
+        </app-confirmation-dialog>`,
+};
+
+function render() {
+    renderCookies();
+    app.innerHTML = VIEWS[state.step]();
+}
+
+function go(step) {
+    state.step = step;
+    render();
+}
+
+const ACTIONS = {
+    consent: () => {
+        document.cookie = "consent=1; path=/";
+        state.consent = true;
+        renderCookies();
+    },
+    change: () => go("change"),
+    appointment: () => go("appointment"),
+    other: () => go("site"),
+    none: () => {},
+    site: el => {
+        if (el.dataset.site !== PORTAL.siteId) return;
+        history.pushState(null, "", `${calendarPath}?site=${PORTAL.siteId}&token=${encodeURIComponent(PORTAL.token)}`);
+        state.month = null;
+        state.open = true;
+        state.selected = null;
+        state.offers = null;
+        go("calendar");
+        loadMonth(0);
+    },
+    previous: () => loadMonth(state.month - 1),
+    next: () => loadMonth(state.month + 1),
+    day: el => {
+        if (el.closest(".ngb-dp-day").classList.contains("disabled") || el.closest(".text-muted")) return;
+        state.selected = el.dataset.date;
+        state.open = false;
+        state.offers = null;
+        render();
+        loadOffers(el.dataset.date);
+    },
+    offer: el => {
+        state.chosen = state.offers[Number(el.dataset.index)];
+        go("confirm");
+    },
+    confirm: () => reschedule(),
+    toggle: () => {
+        state.open = !state.open;
+        render();
+    },
+    abort: () => {
+        state.notice = null;
+        history.pushState(null, "", `/public/booking/${PORTAL.bookingId}?token=${encodeURIComponent(PORTAL.token)}`);
+        go("overview");
+    },
+};
+
+document.addEventListener("click", event => {
+    const el = event.target.closest("[data-action]");
+    if (el && !el.disabled) {
+        ACTIONS[el.dataset.action](el);
+    }
+});
+
+document.addEventListener("input", event => {
+    if (!event.target.matches("app-site-selector input")) return;
+    const query = event.target.value.trim();
+    app.querySelector(".ng-placeholder").classList.toggle("hidden", query !== "");
+    state.sites = null;
+    renderSites();
+    if (query) searchSites(query);
+});
+
+render();
+if (state.step === "calendar") loadMonth(0);
+"""
+
+def add_months(day, months):
+    """
+    Args:
+        day: First day of a month.
+        months: Number of months to add.
+    Returns:
+        First day of the month months after day.
+    """
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+def generate_offers(start, months, days_per_month, slots_per_day, languages=("de", "fr"), seed=0):
+    """
+    Generates a deterministic calendar. Offers are only placed on weekdays, which the
+    calendar shows as enabled.
+    Args:
+        start: First day of the first month.
+        months: Number of months.
+        days_per_month: Number of days with offers per month, at most the number of weekdays.
+        slots_per_day: Number of offers per day, at most MAX_SLOTS_PER_DAY.
+        languages: Languages the offers are randomly given.
+        seed: Seed of the random generator.
+    Returns:
+        Dict of date to list of (datetime, language) tuples.
+    """
+    rng = random.Random(seed)
+    offers = {}
+    for offset in range(months):
+        first = add_months(start, offset)
+        weekdays = [first.replace(day=d) for d in range(1, monthrange(first.year, first.month)[1] + 1)
+                    if first.replace(day=d).weekday() < 5]
+        for day in sorted(rng.sample(weekdays, min(days_per_month, len(weekdays)))):
+            offers[day] = [
+                (datetime.combine(day, datetime.min.time()) + timedelta(minutes=FIRST_OFFER_MINUTES + OFFER_INTERVAL_MINUTES * i),
+                 rng.choice(languages))
+                for i in range(min(slots_per_day, MAX_SLOTS_PER_DAY))
+            ]
+    return offers
+
+class MockPortal:
+    """
+    Local stand-in for the booking portal, serving the pages of the booking flow and the
+    JSON endpoints behind them from a generated calendar.
+    """
+    def __init__(self, months=3, days_per_month=5, slots_per_day=4, latency_ms=0, languages=("de", "fr"),
+                 start=None, seed=0, booking_id="benchmark", token="secret", site_id="1029",
+                 center=DEFAULT_CENTER, postal_code=DEFAULT_POSTAL_CODE):
+        """
+        Args:
+            months: Number of months the calendar can show.
+            days_per_month: Number of days with offers per month.
+            slots_per_day: Number of offers per day.
+            latency_ms: Delay of every API response in milliseconds.
+            languages: Languages of the offers.
+            start: First month of the calendar, defaults to the current month.
+            seed: Seed of the generated calendar.
+            booking_id: Booking ID in the booking URL.
+            token: Token in the booking URL.
+            site_id: ID of the test center that has the offers.
+            center: Name of the test center in the site selector.
+            postal_code: Postal code the site selector finds the center by.
+        """
+        self.months = months
+        self.latency_ms = latency_ms
+        self.start = (start or date.today()).replace(day=1)
+        self.booking_id = booking_id
+        self.token = token
+        self.site_id = site_id
+        self.center = center
+        self.postal_code = postal_code
+        self.offers = generate_offers(self.start, months, days_per_month, slots_per_day, languages, seed)
+        self.scheduled_date = datetime.combine(add_months(self.start, months) + timedelta(days=14), datetime.min.time()).replace(hour=7, minute=30)
+        self.sites = [{"id": site_id, "name": center, "postalCodes": [postal_code]}] + \
+            [site for site in OTHER_SITES if site["id"] != site_id]
+        self.server = None
+        self.thread = None
+
+    @classmethod
+    def from_scenario(cls, scenario, **kwargs):
+        """
+        Args:
+            scenario: Scenario tuple.
+            kwargs: Further arguments of MockPortal.
+        Returns:
+            MockPortal with the calendar of the scenario.
+        """
+        return cls(scenario.months, scenario.days_per_month, scenario.slots_per_day, scenario.latency_ms, **kwargs)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    @property
+    def booking_url(self):
+        return f"{self.base_url}/public/booking/{self.booking_id}?token={self.token}"
+
+    def expected_dates(self, date_languages=None):
+        """
+        Args:
+            date_languages: Optional list of language codes, e.g. ["de"].
+        Returns:
+            Sorted list of the datetimes of all offers in these languages.
+        """
+        return sorted(dt for offers in self.offers.values() for dt, language in offers
+                      if not date_languages or language in date_languages)
+
+    def start_server(self, port=0):
+        """
+        Serves the portal on 127.0.0.1 in a background thread.
+        Args:
+            port: Port to listen on, 0 for any free port.
+        Returns:
+            self.
+        """
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), MockPortalHandler)
+        self.server.daemon_threads = True
+        self.server.portal = self
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop_server(self):
+        """
+        Stops the server started by start_server.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def __enter__(self):
+        return self.start_server()
+
+    def __exit__(self, *exc_info):
+        self.stop_server()
+
+    def page_config(self):
+        """
+        Returns:
+            Dict the page script reads from window.PORTAL.
+        """
+        return {
+            "bookingId": self.booking_id,
+            "token": self.token,
+            "siteId": self.site_id,
+            "months": self.months,
+            "start": self.start.isoformat(),
+            "scheduled": self.scheduled_date.isoformat(),
+        }
+
+    def availabilities(self, start, end):
+        """
+        Args:
+            start: First date, inclusive.
+            end: Last date, exclusive.
+        Returns:
+            List of days with offers as served by the availability endpoint.
+        """
+        return [{"date": day.isoformat(), "offers": self.offer_list(day)}
+                for day in sorted(self.offers) if start <= day < end]
+
+    def offer_list(self, day):
+        """
+        Args:
+            day: date.
+        Returns:
+            List of offer dicts of the day.
+        """
+        return [{"startTime": dt.isoformat(), "language": language} for dt, language in self.offers.get(day, [])]
+
+    def find_sites(self, query):
+        """
+        Args:
+            query: Text typed into the site selector.
+        Returns:
+            List of sites whose name or postal codes match.
+        """
+        query = query.strip().lower()
+        return [{"id": site["id"], "name": site["name"]} for site in self.sites
+                if query in site["name"].lower() or any(code.startswith(query) for code in site["postalCodes"])]
+
+    def reschedule(self, start_time):
+        """
+        Moves the booking to an offer, which is then no longer offered. The previous
+        appointment is not offered again.
+        Args:
+            start_time: datetime of the offer.
+        Returns:
+            True if the offer was still available.
+        """
+        offers = self.offers.get(start_time.date(), [])
+        for offer in offers:
+            if offer[0] == start_time:
+                offers.remove(offer)
+                if not offers:
+                    del self.offers[start_time.date()]
+                self.scheduled_date = start_time
+                return True
+        return False
+
+class MockPortalHandler(BaseHTTPRequestHandler):
+    """
+    Serves the MockPortal of the server. The booking page starts a session, the API only
+    answers requests with the session cookie and the booking token, like the live portal.
+    """
+    def do_GET(self):
+        portal = self.server.portal
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        booking_path = f"/public/booking/{portal.booking_id}"
+
+        if parts.path in (booking_path, booking_path + "/availability"):
+            headers = {}
+            if "SESSION=" not in self.headers.get("Cookie", ""):
+                headers["Set-Cookie"] = f"SESSION={random.getrandbits(64):x}; Path=/; HttpOnly"
+            body = PAGE_TEMPLATE.replace("{portal}", json.dumps(portal.page_config()))
+            return self.send_body(body.encode(), "text/html; charset=utf-8", headers)
+        if parts.path == "/assets/main.js":
+            return self.send_body(SCRIPT.encode(), "application/javascript; charset=utf-8")
+        if parts.path == "/assets/app.css":
+            return self.send_body(STYLESHEET.encode(), "text/css; charset=utf-8")
+        if parts.path == "/assets/logo.svg":
+            return self.send_body(LOGO, "image/svg+xml")
+        if parts.path == "/assets/portal.woff2":
+            return self.send_body(bytes(2048), "font/woff2")
+        if not parts.path.startswith("/api/"):
+            return self.send_error(404)
+        if not self.authorize(query):
+            return
+
+        site_path = f"/api/public/booking/{portal.booking_id}/sites/{portal.site_id}"
+        try:
+            if parts.path == "/api/public/sites":
+                body = portal.find_sites(query.get("query", [""])[0])
+            elif parts.path == site_path + "/availabilities":
+                body = portal.availabilities(date.fromisoformat(query["from"][0]), date.fromisoformat(query["to"][0]))
+            elif parts.path == site_path + "/offers":
+                body = {"offers": portal.offer_list(date.fromisoformat(query["date"][0]))}
+            elif parts.path == f"/api/public/booking/{portal.booking_id}":
+                body = {"offer": {"startTime": portal.scheduled_date.isoformat()}}
+            else:
+                return self.send_error(404)
+        except (KeyError, ValueError):
+            return self.send_error(400)
+        self.send_body(json.dumps(body).encode(), "application/json")
+
+    def do_POST(self):
+        portal = self.server.portal
+        parts = urlsplit(self.path)
+        if parts.path != f"/api/public/booking/{portal.booking_id}/reschedule":
+            return self.send_error(404)
+        if not self.authorize(parse_qs(parts.query)):
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            start_time = datetime.fromisoformat(json.loads(self.rfile.read(length))["startTime"])
+        except (KeyError, ValueError, TypeError):
+            return self.send_error(400)
+        if not portal.reschedule(start_time):
+            return self.send_error(409)
+        self.send_body(json.dumps({"offer": {"startTime": portal.scheduled_date.isoformat()}}).encode(), "application/json")
+
+    def authorize(self, query):
+        """
+        Delays an API request by the latency of the portal and rejects it without session
+        cookie or token.
+        Args:
+            query: Parsed query string.
+        Returns:
+            True if the request may be answered.
+        """
+        portal = self.server.portal
+        if portal.latency_ms:
+            time.sleep(portal.latency_ms / 1000)
+        if "SESSION=" not in self.headers.get("Cookie", ""):
+            self.send_error(401)
+            return False
+        if query.get("token") != [portal.token]:
+            self.send_error(403)
+            return False
+        return True
+
+    def send_body(self, body, content_type, headers=None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a mock booking portal for manual testing.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--days-per-month", type=int, default=5)
+    parser.add_argument("--slots-per-day", type=int, default=4)
+    parser.add_argument("--latency-ms", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    portal = MockPortal(args.months, args.days_per_month, args.slots_per_day, args.latency_ms, seed=args.seed)
+    portal.start_server(args.port)
+    print(f"Serving {portal.booking_url}")
+    print(f"{len(portal.expected_dates())} offers on {len(portal.offers)} days. Press Ctrl+C to stop.")
+    try:
+        portal.thread.join()
+    except KeyboardInterrupt:
+        portal.stop_server()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from playwright.async_api import async_playwright
+from mock_portal import MockPortal, Scenario
+from scrape import build_flag_selector, open_calendar_page, open_booking_page, open_site_calendar
+from scraper import find_test_dates
+from utils.config_utils import Target
+from utils.metrics_utils import ScanMetrics, install_call_counter
+from utils.resource_utils import ResourceMonitor, LOW_MEMORY_ARGS
+
+# Calendars from empty to a full year. The latency is the delay of every API response of the
+# mock portal, the live portal answers in about 100 to 300 ms.
+SCENARIOS = [
+    Scenario("empty", 3, 0, 0, 50),
+    Scenario("sparse", 3, 2, 2, 50),
+    Scenario("typical", 3, 8, 4, 50),
+    Scenario("busy", 3, 20, 8, 50),
+    Scenario("year", 12, 10, 4, 50),
+    Scenario("busy_year", 12, 20, 8, 50),
+]
+
+# A scenario fails the baseline check if it is this much slower than the baseline
+DEFAULT_TOLERANCE = 1.5
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark find_test_dates against the mock booking portal.")
+    parser.add_argument("--scenario", action="append", choices=[s.name for s in SCENARIOS],
+                        help="Scenario to run, may be repeated. Defaults to all scenarios.")
+    parser.add_argument("--languages", default="de,fr", help="DATE_LANGUAGES to search for.")
+    parser.add_argument("--page-pool-size", type=int, default=1, help="PAGE_POOL_SIZE passed to find_test_dates.")
+    parser.add_argument("--latency-ms", type=int, help="Overrides the API latency of all scenarios.")
+    parser.add_argument("--headed", action="store_true", help="Show the browser.")
+    parser.add_argument("--low-memory", action="store_true", help="Launch Chromium with the LOW_MEMORY switches.")
+    parser.add_argument("--json", help="Write the results to this file.")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare the wall times with.")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed slowdown against the baseline, e.g. 1.5 for 50%% slower.")
+    return parser.parse_args(argv)
+
+async def run_scenario(browser, scenario, date_languages, page_pool_size):
+    """
+    Walks the booking flow of a fresh mock portal and measures find_test_dates on its calendar.
+    Args:
+        browser: Playwright browser object.
+        scenario: Scenario tuple.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        page_pool_size: Number of tabs used to extract the offers.
+    Returns:
+        Dict with the results of the scenario.
+    """
+    with MockPortal.from_scenario(scenario) as portal:
+        target = Target("benchmark", portal.booking_url, portal.postal_code, portal.center, portal.site_id)
+        context = await browser.new_context(locale="de-DE")
+        try:
+            page = await context.new_page()
+            await open_calendar_page(page, target)
+
+            async def open_calendar(tab):
+                await open_booking_page(tab, target.url)
+                await open_site_calendar(tab, target.postal_code, target.center)
+
+            metrics = ScanMetrics(scenario.name).activate()
+            started = time.perf_counter()
+            with ResourceMonitor(sample_seconds=0.2) as monitor:
+                dates = await find_test_dates(page, build_flag_selector(date_languages), open_calendar,
+                                              page_pool_size, months=scenario.months)
+            wall_seconds = time.perf_counter() - started
+            await metrics.finish()
+        finally:
+            await context.close()
+        expected = portal.expected_dates(date_languages)
+
+    summary = metrics.summary()
+    return {
+        "scenario": scenario.name,
+        "months": scenario.months,
+        "latency_ms": scenario.latency_ms,
+        "slots": len(dates),
+        "expected_slots": len(expected),
+        "correct": sorted(set(dates)) == expected,
+        "wall_seconds": round(wall_seconds, 3),
+        "slots_per_second": round(len(dates) / wall_seconds, 2) if wall_seconds else 0.0,
+        "playwright_calls": summary["playwright_calls"],
+        "evaluations": summary["evaluations"],
+        "peak_rss_mb": round(monitor.peak_rss_bytes / 2**20, 1),
+    }
+
+def compare_with_baseline(results, baseline, tolerance):
+    """
+    Args:
+        results: List of result dicts of this run.
+        baseline: List of result dicts of an earlier run.
+        tolerance: Allowed factor of slowdown.
+    Returns:
+        List of messages, one per scenario slower than allowed.
+    """
+    baseline_seconds = {result["scenario"]: result["wall_seconds"] for result in baseline}
+    regressions = []
+    for result in results:
+        reference = baseline_seconds.get(result["scenario"])
+        if reference and result["wall_seconds"] > reference * tolerance:
+            regressions.append(f"{result['scenario']}: {result['wall_seconds']:.2f} s, baseline {reference:.2f} s")
+    return regressions
+
+def print_results(results):
+    print(f"{'scenario':<12}{'months':>7}{'slots':>7}{'expected':>10}{'seconds':>9}{'slots/s':>9}{'calls':>7}{'MB':>7}  ok")
+    for result in results:
+        print(f"{result['scenario']:<12}{result['months']:>7}{result['slots']:>7}{result['expected_slots']:>10}"
+              f"{result['wall_seconds']:>9.2f}{result['slots_per_second']:>9.1f}{result['playwright_calls']:>7}"
+              f"{result['peak_rss_mb']:>7.0f}  {'yes' if result['correct'] else 'NO'}")
+
+async def main(argv=None):
+    args = parse_args(argv)
+    date_languages = args.languages.lower().replace(" ", "").split(",")
+    scenarios = [s for s in SCENARIOS if not args.scenario or s.name in args.scenario]
+    if args.latency_ms is not None:
+        scenarios = [s._replace(latency_ms=args.latency_ms) for s in scenarios]
+    install_call_counter()
+
+    results = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=not args.headed, args=LOW_MEMORY_ARGS if args.low_memory else None)
+        try:
+            for scenario in scenarios:
+                results.append(await run_scenario(browser, scenario, date_languages, args.page_pool_size))
+        finally:
+            await browser.close()
+
+    print_results(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"finished_at": time.time(), "results": results}, f, indent=2)
+
+    failed = False
+    for result in results:
+        if not result["correct"]:
+            print(f"{result['scenario']}: found {result['slots']} slots, expected {result['expected_slots']}.")
+            failed = True
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare_with_baseline(results, json.load(f)["results"], args.tolerance)
+        for message in regressions:
+            print(f"Slower than baseline: {message}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,226 @@
+from datetime import datetime, time, timedelta
+from scraper import DAY_SELECTOR
+from utils.metrics_utils import step
+from utils.wait_utils import wait_for_any
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+# Elements of the confirmation step after an offer was selected
+DEFAULT_CONFIRM_SELECTOR = "button:has(span.cuip-button-content:text('Bestätigen'))"
+DEFAULT_SUCCESS_SELECTOR = "div.alert-success"
+DEFAULT_FAILURE_SELECTOR = "div.alert-danger"
+
+# Maximum wait for each step of a rebooking
+DEFAULT_TIMEOUT_SECONDS = 10
+
+# Slots starting sooner than this are not booked
+DEFAULT_MIN_NOTICE_HOURS = 48
+
+WEEKDAYS = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+# Outcomes of Rebooker.book
+BOOKED = "booked"
+DRY_RUN = "dry_run"
+OFFER_NOT_FOUND = "offer_not_found"
+REJECTED = "rejected"
+NO_CONFIRMATION = "no_confirmation"
+ERROR = "error"
+
+# Clicks the cell of a day if the date picker is open. Returns false if it is closed,
+# in which case the offers of the day that was opened last are still shown. Offers of
+# another day still on the page are marked, so they are not mistaken for the new ones.
+OPEN_DAY_SCRIPT = """
+    ([daySelector, dayNumber]) => {
+        const picker = document.querySelector('app-date-navigator ngb-datepicker');
+        if (!picker) return false;
+        document.querySelectorAll('app-offer-button').forEach(offer => offer.dataset.stale = '1');
+        for (const el of picker.querySelectorAll(daySelector)) {
+            const cell = el.closest('div.ngb-dp-day');
+            if (cell.classList.contains('disabled') || el.closest('.day').classList.contains('text-muted')) continue;
+            if (el.innerText.trim() === dayNumber) {
+                el.click();
+                return true;
+            }
+        }
+        throw new Error(`Day ${dayNumber} is not in the calendar`);
+    }
+"""
+
+# Looks for the offer button with the given time and an accepted language flag among the
+# offers of the opened day, and clicks it if asked to. Runs as the predicate of
+# wait_for_function, so the click happens in the same animation frame the button shows up
+# in. Returns a falsy value while the date picker is open or no offers are rendered yet.
+FIND_OFFER_SCRIPT = """
+    ([timeText, flagSelector, click]) => {
+        if (document.querySelector('app-date-navigator ngb-datepicker')) return null;
+        const offers = document.querySelectorAll('.sites-offers app-offer-button:not([data-stale])');
+        if (!offers.length) return false;
+        for (const offer of offers) {
+            const timeDiv = offer.querySelector('div.d-flex.align-items-center.justify-content-center');
+            if (!timeDiv || timeDiv.childNodes[0].textContent.trim() !== timeText) continue;
+            if (!offer.querySelector(flagSelector)) continue;
+            if (!click) return 'found';
+            offer.querySelector('button').click();
+            return 'clicked';
+        }
+        return 'missing';
+    }
+"""
+
+def parse_weekdays(value):
+    """
+    Args:
+        value: Comma separated weekday abbreviations, e.g. "mon,tue,fri". Empty for all days.
+    Returns:
+        Set of weekday numbers, Monday is 0.
+    Raises:
+        ValueError: For an unknown weekday.
+    """
+    days = set()
+    for name in (value or "").lower().replace(" ", "").split(","):
+        if name:
+            days.add(WEEKDAYS.index(name[:3]))
+    return days or set(range(7))
+
+def parse_time(value, default):
+    """
+    Args:
+        value: Time string "HH:MM" or empty.
+        default: time returned for an empty value.
+    Returns:
+        time object.
+    """
+    return datetime.strptime(value, "%H:%M").time() if value else default
+
+class Rebooker:
+    """
+    Moves a booking to an earlier slot as soon as the scan finds one that passes the
+    filters of the [REBOOK] section. The offer is selected and confirmed on the page that
+    found it, without reloading the calendar.
+    """
+    def __init__(self, languages, weekdays=None, earliest_time=time.min, latest_time=time.max, latest_date=None,
+                 min_notice_hours=DEFAULT_MIN_NOTICE_HOURS, dry_run=False, confirm_selector=DEFAULT_CONFIRM_SELECTOR,
+                 success_selector=DEFAULT_SUCCESS_SELECTOR, failure_selector=DEFAULT_FAILURE_SELECTOR,
+                 timeout_seconds=DEFAULT_TIMEOUT_SECONDS):
+        """
+        Args:
+            languages: List of language codes of acceptable offers, e.g. ["de"].
+            weekdays: Optional set of acceptable weekday numbers, Monday is 0.
+            earliest_time: Earliest acceptable time of day.
+            latest_time: Latest acceptable time of day.
+            latest_date: Optional last acceptable date.
+            min_notice_hours: Minimum time between now and an acceptable slot.
+            dry_run: Select the offer but do not confirm it.
+            confirm_selector: CSS selector of the button confirming the change.
+            success_selector: CSS selector of the message shown after the change.
+            failure_selector: CSS selector of the message shown if the change failed.
+            timeout_seconds: Maximum wait for each step.
+        """
+        self.flag_selector = ", ".join(f"span.flag-icon-{language}" for language in languages)
+        self.weekdays = weekdays if weekdays is not None else set(range(7))
+        self.earliest_time = earliest_time
+        self.latest_time = latest_time
+        self.latest_date = latest_date
+        self.min_notice_hours = min_notice_hours
+        self.dry_run = dry_run
+        self.confirm_selector = confirm_selector
+        self.success_selector = success_selector
+        self.failure_selector = failure_selector
+        self.timeout_seconds = timeout_seconds
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a rebooker from the [REBOOK] section. LANGUAGES defaults to DATE_LANGUAGES.
+        Args:
+            config: ConfigParser object.
+        Returns:
+            Rebooker, or None if rebooking is disabled.
+        """
+        if not config.getboolean("REBOOK", "ENABLED", fallback=False):
+            return None
+        section = config["REBOOK"]
+        languages = section.get("LANGUAGES", "") or config["DEFAULT"].get("DATE_LANGUAGES", "de")
+        latest_date = section.get("LATEST_DATE", "")
+        return cls(
+            languages.lower().replace(" ", "").split(","),
+            weekdays=parse_weekdays(section.get("WEEKDAYS", "")),
+            earliest_time=parse_time(section.get("EARLIEST_TIME", ""), time.min),
+            latest_time=parse_time(section.get("LATEST_TIME", ""), time.max),
+            latest_date=datetime.strptime(latest_date, "%Y-%m-%d").date() if latest_date else None,
+            min_notice_hours=section.getfloat("MIN_NOTICE_HOURS", fallback=DEFAULT_MIN_NOTICE_HOURS),
+            dry_run=section.getboolean("DRY_RUN", fallback=False),
+            confirm_selector=section.get("CONFIRM_SELECTOR", DEFAULT_CONFIRM_SELECTOR),
+            success_selector=section.get("SUCCESS_SELECTOR", DEFAULT_SUCCESS_SELECTOR),
+            failure_selector=section.get("FAILURE_SELECTOR", DEFAULT_FAILURE_SELECTOR),
+            timeout_seconds=section.getfloat("TIMEOUT_SECONDS", fallback=DEFAULT_TIMEOUT_SECONDS),
+        )
+
+    def accepts(self, slot, scheduled_date, now=None):
+        """
+        Checks a slot against the filters. Only slots before the scheduled date are
+        accepted, so without a known scheduled date nothing is booked.
+        Args:
+            slot: datetime of the slot.
+            scheduled_date: Currently scheduled datetime or None.
+            now: Optional current time, defaults to now.
+        Returns:
+            True if the booking should be moved to the slot.
+        """
+        if scheduled_date is None or slot >= scheduled_date:
+            return False
+        if slot < (now or datetime.now()) + timedelta(hours=self.min_notice_hours):
+            return False
+        if slot.weekday() not in self.weekdays:
+            return False
+        if not self.earliest_time <= slot.time() <= self.latest_time:
+            return False
+        return self.latest_date is None or slot.date() <= self.latest_date
+
+    async def offer_shown(self, page, slot):
+        """
+        Checks the offers shown on the page for the slot in one of the accepted languages,
+        without waiting. The scan finds slots in all DATE_LANGUAGES, so a slot that passes
+        the filters may only be offered in a language that is not accepted.
+        Args:
+            page: Playwright page object.
+            slot: datetime of the slot.
+        Returns:
+            True or False if the offers of the slot's day are shown, None if they are not,
+            e.g. for a day whose offers were cached.
+        """
+        found = await page.evaluate(FIND_OFFER_SCRIPT, [slot.strftime("%H:%M"), self.flag_selector, False])
+        return {"found": True, "missing": False}.get(found)
+
+    async def book(self, page, slot):
+        """
+        Selects the offer of a slot on a page showing the calendar at the slot's month and
+        confirms the change.
+        Args:
+            page: Playwright page object.
+            slot: datetime of the slot.
+        Returns:
+            Tuple (outcome, detail): one of the outcome constants and an error message or None.
+        """
+        timeout = self.timeout_seconds * 1000
+        try:
+            with step("rebook_select"):
+                await page.evaluate(OPEN_DAY_SCRIPT, [DAY_SELECTOR, str(slot.day)])
+                try:
+                    found = await page.wait_for_function(FIND_OFFER_SCRIPT,
+                                                         arg=[slot.strftime("%H:%M"), self.flag_selector, True],
+                                                         timeout=timeout)
+                except PlaywrightTimeoutError:
+                    return OFFER_NOT_FOUND, None
+                if await found.json_value() != "clicked":
+                    return OFFER_NOT_FOUND, None
+            if self.dry_run:
+                return DRY_RUN, None
+            with step("rebook_confirm"):
+                await page.locator(self.confirm_selector).first.click(timeout=timeout)
+                state = await wait_for_any(page, [
+                    (BOOKED, self.success_selector),
+                    (REJECTED, self.failure_selector),
+                ], timeout=timeout)
+            return state or NO_CONFIRMATION, None
+        except Exception as e:
+            return ERROR, str(e)
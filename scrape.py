@@ -1,18 +1,62 @@
+import argparse
 import asyncio
 import locale
+import random
 import re
+import sqlite3
+from contextlib import aclosing
 from playwright.async_api import async_playwright
-from datetime import datetime
-from scraper import find_test_dates
-from utils.config_utils import load_config
-from utils.storage_utils import load_last_dates, save_current_dates
-from utils.telegram_utils import send_telegram_message
+from datetime import datetime, time, timedelta
+from scraper import find_test_dates, find_test_dates_from_responses, iter_test_dates, click_previous_month, get_month_info
+from api_scraper import AvailabilityClient, bootstrap_session_with_browser, DEFAULT_AVAILABILITY_PATH, DEFAULT_SITE_ID, DEFAULT_HORIZON_DAYS
+from utils.config_utils import load_config, load_targets, DEFAULT_POSTAL_CODE, DEFAULT_CENTER
+from utils.storage_utils import record_scan, get_new_dates, get_last_dates, prune, record_rebooking, import_last_dates
+from utils.telegram_utils import TelegramNotifier
 from utils.date_utils import month_mapping
+from utils.response_utils import SlotResponseCollector
+from utils.metrics_utils import ScanMetrics, step, install_call_counter, write_json, write_prometheus, current_metrics
+from utils.wait_utils import wait_for_any, wait_for_state_to_pass
+from utils.route_utils import ResourceBlocker
+from utils.asset_cache_utils import AssetCache
+from utils.session_utils import load_session, save_session, clear_session
+from utils.cache_utils import ScanCache, DEFAULT_TTL_SECONDS
+from utils.schedule_utils import AdaptiveScheduler
+from utils.snapshot_utils import SnapshotServer, update_snapshot, DEFAULT_SNAPSHOT_PATH, DEFAULT_HOST, DEFAULT_PORT
+from utils.resource_utils import ResourceMonitor, OverlapLock, LOW_MEMORY_ARGS, DEFAULT_LOCK_PATH, DEFAULT_SCAN_TIMEOUT_SECONDS
+from rebooker import Rebooker, BOOKED, DRY_RUN
+
+# URLs of the portal's JSON responses that carry calendar availabilities and offers
+DEFAULT_RESPONSE_URL_PATTERN = r"availabilit|offer|slot"
+
+# Elements of the booking flow
+COOKIE_BANNER_SELECTOR = "cuip-cookies-consent-banner button"
+CHANGE_RESERVATION_SELECTOR = "button:has-text('Verändern'), button:has-text('Change')"
+OTHER_AVAILABILITY_SELECTOR = "button:has-text('Wählen Sie eine andere Verfügbarkeit aus')"
+SITE_INPUT_PLACEHOLDER_SELECTOR = "div.ng-placeholder:text('Ort, Postleitzahl, Führerscheinzentrum')"
+
+# Number of targets checked at the same time
+DEFAULT_MAX_CONCURRENCY = 2
+
+# Default output of the [METRICS] section
+DEFAULT_METRICS_JSON_PATH = "scan_metrics.json"
+
+# Days of availability history kept in the [STORAGE] database
+DEFAULT_RETENTION_DAYS = 180
+
+# Saved sessions older than this walk the full booking flow again
+DEFAULT_SESSION_MAX_AGE_HOURS = 24
+
+# Defaults for the [DAEMON] section of config.ini
+DEFAULT_DAEMON_INTERVAL_SECONDS = 300
+DEFAULT_DAEMON_JITTER_SECONDS = 60
+DEFAULT_DAEMON_RESTART_HOURS = 24
 
 async def main():
+    args = parse_args()
+
     # Read config
     config = load_config()
-    url = config["DEFAULT"].get("URL")
+    targets = load_targets(config)
     date_languages = config["DEFAULT"].get("DATE_LANGUAGES", "de").lower().replace(" ", "").split(",")
 
     # Set locale for date formatting
@@ -21,148 +65,1152 @@ async def main():
     except locale.Error as e:
         print(f"Could not set locale to de_DE.UTF-8: {e}. Date formatting may not be correct.")
 
-    # Build flag selectors based on config
+    headless = config["DEFAULT"].get("HEADLESS", "true").lower() == "true"
+    if config.getboolean("METRICS", "ENABLED", fallback=False):
+        install_call_counter()
+
+    if args.serve:
+        await serve_snapshot(config)
+        return
+
+    # A scan started while the previous one is still running, e.g. by cron, is skipped
+    lock_path = config.get("RESOURCES", "LOCK_PATH", fallback=DEFAULT_LOCK_PATH)
+    lock = OverlapLock(lock_path) if lock_path else None
+    if lock and not lock.acquire():
+        print(f"Another scan holds {lock_path}, exiting.")
+        return
+
+    # Earlier versions kept the slots of the last run in last_dates.json
+    try:
+        imported = import_last_dates(path=config.get("STORAGE", "DB_PATH", fallback=None))
+        if imported is not None:
+            print(f"Imported {imported} slots of last_dates.json into the availability history.")
+    except sqlite3.Error as e:
+        print(f"Could not import last_dates.json: {e}")
+
+    # One Telegram connection pool for all targets, closed after the queued messages are sent
+    notifier = TelegramNotifier.from_config(config)
+    try:
+        await run_checks(args, config, targets, date_languages, headless, notifier)
+    finally:
+        if notifier:
+            await notifier.close()
+        if lock:
+            lock.release()
+
+async def run_checks(args, config, targets, date_languages, headless, notifier=None):
+    """
+    Checks all targets once, through the API or the browser, or keeps checking with --daemon.
+    Args:
+        args: Parsed command line arguments.
+        config: ConfigParser object.
+        targets: List of Target tuples.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Run the browser headless.
+        notifier: Optional TelegramNotifier.
+    """
+    if config.getboolean("API", "ENABLED", fallback=False):
+        if args.daemon:
+            await run_api_daemon(config, targets, date_languages, headless, notifier)
+        else:
+            await run_api_checks(config, targets, date_languages, headless, notifier)
+        return
+
+    max_concurrency = config.getint("DEFAULT", "MAX_CONCURRENCY", fallback=DEFAULT_MAX_CONCURRENCY)
+    budget = get_scan_budget(config)
+    async with async_playwright() as p:
+        if args.daemon:
+            await run_daemon(p, config, targets, date_languages, headless, notifier)
+            return
+
+        with ResourceMonitor(budget) as monitor:
+            browser = await launch_browser(p, headless, config.getboolean("RESOURCES", "LOW_MEMORY", fallback=False))
+            try:
+                results = await run_with_budget(
+                    run_limited([check_target(browser, config, target, date_languages, headless, notifier) for target in targets], max_concurrency),
+                    budget
+                )
+            finally:
+                await close_browser(browser)
+        write_metrics(config, results, report_peak_memory(monitor))
+
+async def run_api_checks(config, targets, date_languages, headless, notifier=None):
+    """
+    Checks all targets once through the API.
+    Args:
+        config: ConfigParser object.
+        targets: List of Target tuples.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Run the browser headless if a session has to be bootstrapped with it.
+        notifier: Optional TelegramNotifier.
+    """
+    max_concurrency = config.getint("DEFAULT", "MAX_CONCURRENCY", fallback=DEFAULT_MAX_CONCURRENCY)
+    budget = get_scan_budget(config)
+    with ResourceMonitor(budget) as monitor:
+        results = await run_with_budget(
+            run_limited([run_api_scan(config, target, date_languages, headless, notifier) for target in targets], max_concurrency),
+            budget
+        )
+    for target, result in zip(targets, results):
+        if isinstance(result, Exception):
+            print(f"[{target.name}] Error during API check: {result}")
+    write_metrics(config, results, report_peak_memory(monitor))
+
+async def run_api_daemon(config, targets, date_languages, headless, notifier=None):
+    """
+    Keeps checking all targets through the API, on the interval or the adaptive interval
+    of the [DAEMON] section. No browser is kept, so RESTART_HOURS does not apply. With
+    [SERVER] enabled, the results are served over HTTP meanwhile.
+    Args:
+        config: ConfigParser object.
+        targets: List of Target tuples.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Run the browser headless if a session has to be bootstrapped with it.
+        notifier: Optional TelegramNotifier.
+    """
+    interval = config.getfloat("DAEMON", "INTERVAL_SECONDS", fallback=DEFAULT_DAEMON_INTERVAL_SECONDS)
+    jitter = config.getfloat("DAEMON", "JITTER_SECONDS", fallback=DEFAULT_DAEMON_JITTER_SECONDS)
+    scheduler = AdaptiveScheduler.from_config(config, interval, jitter)
+    server = SnapshotServer.from_config(config)
+    if server:
+        server.start()
+
+    while True:
+        try:
+            await run_api_checks(config, targets, date_languages, headless, notifier)
+        except Exception as e:
+            print(f"Error during API check: {e}")
+        await asyncio.sleep(get_next_delay(scheduler, interval, jitter))
+
+def get_next_delay(scheduler, interval, jitter):
+    """
+    Args:
+        scheduler: AdaptiveScheduler or None.
+        interval: INTERVAL_SECONDS.
+        jitter: JITTER_SECONDS.
+    Returns:
+        Seconds to wait until the next daemon check.
+    """
+    if scheduler:
+        return scheduler.decide().delay
+    delay = interval + random.uniform(0, jitter)
+    print(f"Next check in {delay:.0f} s.")
+    return delay
+
+def get_scan_budget(config):
+    """
+    Args:
+        config: ConfigParser object.
+    Returns:
+        Time budget of a run in seconds from [RESOURCES], or None for no budget. With
+        LOW_MEMORY, runs get DEFAULT_SCAN_TIMEOUT_SECONDS unless set otherwise.
+    """
+    value = config.get("RESOURCES", "SCAN_TIMEOUT_SECONDS", fallback="")
+    if value:
+        return float(value) or None
+    return DEFAULT_SCAN_TIMEOUT_SECONDS if config.getboolean("RESOURCES", "LOW_MEMORY", fallback=False) else None
+
+async def run_with_budget(coroutine, budget):
+    """
+    Runs the checks of a run, cancelling them when the time budget is used up.
+    Args:
+        coroutine: Coroutine returning the list of results of the checks.
+        budget: Time budget in seconds, or None.
+    Returns:
+        The results, or an empty list if the budget ran out.
+    """
+    try:
+        return await asyncio.wait_for(coroutine, budget)
+    except asyncio.TimeoutError:
+        print(f"Run exceeded its budget of {budget:.0f} s and was cancelled.")
+        return []
+
+def report_peak_memory(monitor):
+    """
+    Prints the peak memory of a run.
+    Args:
+        monitor: ResourceMonitor of the run.
+    Returns:
+        Peak resident memory in bytes, or None if it could not be measured.
+    """
+    if not monitor.peak_rss_bytes:
+        return None
+    print(f"Peak memory of scraper and browser: {monitor.peak_rss_bytes / 2**20:.0f} MB")
+    return monitor.peak_rss_bytes
+
+async def serve_snapshot(config):
+    """
+    Serves the snapshot written by the scans of another process until interrupted.
+    Args:
+        config: ConfigParser object.
+    """
+    server = SnapshotServer(
+        config.get("SERVER", "SNAPSHOT_PATH", fallback=DEFAULT_SNAPSHOT_PATH),
+        config.get("SERVER", "HOST", fallback=DEFAULT_HOST),
+        config.getint("SERVER", "PORT", fallback=DEFAULT_PORT),
+    ).start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        server.stop()
+
+async def run_limited(coroutines, limit):
+    """
+    Runs coroutines concurrently, at most limit at a time.
+    Args:
+        coroutines: List of coroutine objects.
+        limit: Maximum number of coroutines running at once.
+    Returns:
+        List of results in the order of coroutines. Exceptions are returned, not raised.
+    """
+    semaphore = asyncio.Semaphore(max(limit, 1))
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(c) for c in coroutines), return_exceptions=True)
+
+async def check_target(browser, config, target, date_languages, headless, notifier=None):
+    """
+    Checks one target in its own browser context and notifies about its available dates.
+    Args:
+        browser: Playwright browser object.
+        config: ConfigParser object.
+        target: Target tuple.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Whether the browser is headless.
+        notifier: Optional TelegramNotifier.
+    Returns:
+        Metrics summary dict of the check, or None if metrics are disabled.
+    """
+    saved_session = load_saved_session(config, target)
+    context, blocker, asset_cache = await new_context(browser, config, saved_session["storage_state"] if saved_session else None)
+    metrics = start_metrics(config, target.name, context)
+    try:
+        page, collector = await open_page(context, config)
+        scheduled_date = await reach_calendar(page, config, target, context, saved_session)
+        rebooked = await scan_and_report(page, config, target, date_languages, scheduled_date, collector, notifier) != scheduled_date
+
+        # Abort the process by clicking "Änderung abbrechen", unless the change was confirmed
+        with step("abort_change"):
+            try:
+                if not rebooked:
+                    await page.locator("button.cuip-button-empty-danger span.cuip-button-content:text('Änderung abbrechen')").wait_for(state="visible", timeout=5000)
+                    await page.locator("button.cuip-button-empty-danger span.cuip-button-content:text('Änderung abbrechen')").click()
+                    print('Clicked "Änderung abbrechen" to abort the process.')
+            except Exception as e:
+                print(f'Could not find or click "Änderung abbrechen": {e}')
+
+        if not headless:
+            # Keep browser open for manual inspection
+            await page.wait_for_timeout(10000)
+    except Exception as e:
+        print(f"[{target.name}] Error during check: {e}")
+    finally:
+        await report_blocking(target, blocker, metrics)
+        report_asset_cache(target, asset_cache, metrics)
+        summary = await finish_metrics(metrics)
+        await context.close()
+    return summary
+
+def start_metrics(config, name, context=None):
+    """
+    Starts collecting metrics for the current task if [METRICS] ENABLED is set.
+    Args:
+        config: ConfigParser object.
+        name: Name of the scan, e.g. the target name.
+        context: Optional Playwright browser context to count requests and bytes of.
+    Returns:
+        ScanMetrics object, or None if metrics are disabled.
+    """
+    if not config.getboolean("METRICS", "ENABLED", fallback=False):
+        return None
+    metrics = ScanMetrics(name).activate()
+    if context:
+        metrics.attach(context)
+    return metrics
+
+async def report_blocking(target, blocker, metrics=None):
+    """
+    Prints how many requests the resource blocker blocked and adds the numbers to the metrics.
+    Args:
+        target: Target tuple.
+        blocker: ResourceBlocker or None.
+        metrics: Optional ScanMetrics object.
+    """
+    if blocker is None:
+        return
+    summary = await blocker.summary()
+    print(f"[{target.name}] Blocked {summary['requests_blocked']} requests, allowed {summary['requests_allowed']} "
+          f"requests with {summary['bytes_allowed'] / 1024:.0f} KiB.")
+    if metrics:
+        metrics.details["blocking"] = summary
+
+def report_asset_cache(target, asset_cache, metrics=None):
+    """
+    Saves the asset cache, prints its hit rate and adds its numbers to the metrics.
+    Args:
+        target: Target tuple.
+        asset_cache: AssetCache or None.
+        metrics: Optional ScanMetrics object.
+    """
+    if asset_cache is None:
+        return
+    asset_cache.save()
+    summary = asset_cache.summary()
+    if summary["hit_rate"] is None:
+        return
+    print(f"[{target.name}] Asset cache: {summary['hits'] + summary['revalidated']} of "
+          f"{summary['hits'] + summary['revalidated'] + summary['misses']} static requests from disk "
+          f"({summary['hit_rate']:.0%}, {summary['revalidated']} revalidated), {summary['bytes_from_disk'] / 1024:.0f} KiB.")
+    if metrics:
+        metrics.details["asset_cache"] = summary
+
+async def finish_metrics(metrics):
+    """
+    Stops collecting metrics.
+    Args:
+        metrics: ScanMetrics object or None.
+    Returns:
+        Metrics summary dict, or None if metrics are disabled.
+    """
+    if metrics is None:
+        return None
+    await metrics.finish()
+    return metrics.summary()
+
+def write_metrics(config, results, peak_rss_bytes=None):
+    """
+    Writes the metrics summaries of a run as JSON and, if configured, as Prometheus textfile.
+    Args:
+        config: ConfigParser object.
+        results: List of return values of the checks. Everything but summary dicts is ignored.
+        peak_rss_bytes: Optional peak memory of the run.
+    """
+    summaries = [result for result in results if isinstance(result, dict)]
+    if not summaries:
+        return
+    try:
+        write_json(summaries, config["METRICS"].get("JSON_PATH", DEFAULT_METRICS_JSON_PATH), peak_rss_bytes)
+        prometheus_path = config["METRICS"].get("PROMETHEUS_PATH", "")
+        if prometheus_path:
+            write_prometheus(summaries, prometheus_path, peak_rss_bytes)
+    except OSError as e:
+        print(f"Could not write metrics: {e}")
+
+def parse_args(argv=None):
+    """
+    Parses the command line.
+    Args:
+        argv: Optional list of arguments, defaults to sys.argv.
+    Returns:
+        argparse.Namespace with "daemon" and "serve".
+    """
+    parser = argparse.ArgumentParser(description="Checks for available driving exam dates.")
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep the browser running and check again on the interval set in [DAEMON]")
+    parser.add_argument("--serve", action="store_true",
+                        help="only serve the snapshot of the latest scan as set in [SERVER], without checking")
+    return parser.parse_args(argv)
+
+def build_flag_selector(date_languages):
+    """
+    Builds the CSS selector for the language flags of the offer buttons.
+    Args:
+        date_languages: List of language codes, e.g. ["de", "fr"].
+    Returns:
+        CSS selector string.
+    """
     flag_selectors = []
     if "de" in date_languages:
         flag_selectors.append("span.flag-icon-de")
     if "fr" in date_languages:
         flag_selectors.append("span.flag-icon-fr")
-    flag_selector = ", ".join(flag_selectors)
+    return ", ".join(flag_selectors)
 
-    headless = config["DEFAULT"].get("HEADLESS", "true").lower() == "true"
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=headless)
-        context = await browser.new_context(
-            locale="de-DE",
-            extra_http_headers={
-                "Accept-Language": "de-DE,de;q=0.9"
-            }
-        )
-        page = await context.new_page()
-        await page.goto(url)
-        print(f"Opened {url}")
+async def launch_browser(p, headless, low_memory=False):
+    """
+    Launches Chromium.
+    Args:
+        p: Playwright object.
+        headless: Run the browser headless.
+        low_memory: Launch with LOW_MEMORY_ARGS, for devices with little RAM.
+    Returns:
+        Playwright browser object.
+    """
+    return await p.chromium.launch(headless=headless, args=LOW_MEMORY_ARGS if low_memory else None)
 
-        # Accept cookie banner
-        try:
-            await page.locator("cuip-cookies-consent-banner button").wait_for(state="visible", timeout=5000)
-            await page.locator("cuip-cookies-consent-banner button").click()
-            print("Cookie banner accepted.")
-        except Exception as e:
-            print(f"No cookie banner found or error accepting cookies: {e}")
+async def new_context(browser, config, storage_state=None):
+    """
+    Opens an isolated German browser context, blocking unneeded resources if [BLOCKING] is
+    enabled and serving static bundles from disk if [ASSET_CACHE] is enabled.
+    Args:
+        browser: Playwright browser object.
+        config: ConfigParser object.
+        storage_state: Optional cookies and local storage of a saved session.
+    Returns:
+        Tuple (context, blocker, asset_cache), blocker and asset_cache are None if disabled.
+    """
+    context = await browser.new_context(
+        storage_state=storage_state,
+        locale="de-DE",
+        extra_http_headers={
+            "Accept-Language": "de-DE,de;q=0.9"
+        }
+    )
+    # Attached first, so its handler runs after the blocker's, for the requests not blocked
+    asset_cache = AssetCache.from_config(config)
+    if asset_cache:
+        await asset_cache.attach(context)
+    blocker = ResourceBlocker.from_config(config)
+    if blocker:
+        await blocker.attach(context)
+    return context, blocker, asset_cache
+
+async def open_page(context, config):
+    """
+    Opens a new page and attaches the response collector if CAPTURE_RESPONSES is set.
+    Args:
+        context: Playwright browser context.
+        config: ConfigParser object.
+    Returns:
+        Tuple (page, collector), collector is None if responses are not captured.
+    """
+    page = await context.new_page()
+    collector = None
+    if config.getboolean("DEFAULT", "CAPTURE_RESPONSES", fallback=False):
+        collector = SlotResponseCollector(config["DEFAULT"].get("RESPONSE_URL_PATTERN", DEFAULT_RESPONSE_URL_PATTERN))
+        collector.attach(page)
+    return page, collector
 
-        # Extract currently scheduled date
+async def open_calendar_page(page, target):
+    """
+    Walks the full booking flow from the booking URL to the calendar.
+    Args:
+        page: Playwright page object.
+        target: Target tuple.
+    Returns:
+        Currently scheduled datetime or None.
+    """
+    await open_booking_page(page, target.url)
+
+    # Extract currently scheduled date
+    with step("scheduled_date"):
         scheduled_date = await extract_scheduled_date(page)
-        if scheduled_date:
-            print(f"Currently scheduled date: {scheduled_date}")
+    if scheduled_date:
+        print(f"Currently scheduled date: {scheduled_date}")
+
+    await open_site_calendar(page, target.postal_code, target.center)
+
+    # Print currently scheduled date
+    if scheduled_date:
+        print("Scheduled date:")
+        print("  -", scheduled_date.strftime("%A, %d.%m.%Y %H:%M"))
+    else:
+        print("Warning: no currently scheduled date found.")
+    return scheduled_date
 
-        # Click the button to change the reservation
+async def reach_calendar(page, config, target, context, saved_session=None):
+    """
+    Brings a page to the calendar of a target, jumping straight to the saved calendar route
+    if there is a saved session, and walking the full booking flow otherwise. After a full
+    walk the session is saved for the next run if [SESSION] is enabled.
+    Args:
+        page: Playwright page object.
+        config: ConfigParser object.
+        target: Target tuple.
+        context: Browser context of page.
+        saved_session: Optional dict as returned by load_saved_session.
+    Returns:
+        Currently scheduled datetime or None.
+    """
+    if saved_session:
+        if await open_calendar_shortcut(page, saved_session["calendar_url"]):
+            print(f"[{target.name}] Opened calendar from saved session.")
+            return saved_session["scheduled_date"]
+        print(f"[{target.name}] Saved session did not lead to the calendar, walking the booking flow.")
+        clear_session(target.name, config.get("SESSION", "DIRECTORY", fallback=None))
+
+    scheduled_date = await open_calendar_page(page, target)
+    if config.getboolean("SESSION", "ENABLED", fallback=False) and await page.locator("app-date-navigator").is_visible():
         try:
-            await page.locator("button:has-text('Verändern'), button:has-text('Change')").wait_for(state="visible", timeout=5000)
-            await page.locator("button:has-text('Verändern'), button:has-text('Change')").click()
-            print("Clicked the button to change the reservation.")
+            save_session(target.name, target.url, page.url, await context.storage_state(), scheduled_date,
+                         config.get("SESSION", "DIRECTORY", fallback=None))
         except Exception as e:
-            print(f"Could not find or click the change reservation button: {e}")
+            print(f"[{target.name}] Could not save session: {e}")
+    return scheduled_date
+
+def load_saved_session(config, target):
+    """
+    Loads the saved session of a target if [SESSION] is enabled.
+    Args:
+        config: ConfigParser object.
+        target: Target tuple.
+    Returns:
+        Dict as returned by load_session, or None.
+    """
+    if not config.getboolean("SESSION", "ENABLED", fallback=False):
+        return None
+    return load_session(target.name, target.url,
+                        config.getfloat("SESSION", "MAX_AGE_HOURS", fallback=DEFAULT_SESSION_MAX_AGE_HOURS),
+                        config.get("SESSION", "DIRECTORY", fallback=None))
 
-        # Click "Verändern" next to the "Termin" part on the second page
+async def open_calendar_shortcut(page, calendar_url):
+    """
+    Opens the calendar route of a saved session directly.
+    Args:
+        page: Playwright page object of a context with the saved storage state.
+        calendar_url: URL of the center's calendar.
+    Returns:
+        True if the calendar is shown, False if the portal sent the page elsewhere.
+    """
+    with step("calendar_shortcut"):
         try:
-            await page.locator("h5:text('Termin')").wait_for(state="visible", timeout=5000)
-            section = page.locator("app-section:has(h5:text('Termin'))")
-            veraendern_button = section.locator("button:has-text('Verändern')")
-            if await veraendern_button.count() > 0:
-                await veraendern_button.first.click()
-                print("Clicked 'Verändern' next to 'Termin'.")
-            else:
-                print("Could not find 'Verändern' button next to 'Termin'.")
+            await page.goto(calendar_url)
         except Exception as e:
-            print(f"Could not find or click 'Verändern' next to 'Termin': {e}")
+            print(f"Could not open {calendar_url}: {e}")
+            return False
+        state = await wait_for_any(page, [
+            ("calendar", "app-date-navigator"),
+            ("cookie_banner", COOKIE_BANNER_SELECTOR),
+            ("booking", "app-offer span.offer-date"),
+            ("change_reservation", CHANGE_RESERVATION_SELECTOR),
+        ], timeout=10000)
+        return state == "calendar"
+
+async def scan_and_report(page, config, target, date_languages, scheduled_date, collector=None, notifier=None):
+    """
+    Finds the available test dates on a page showing the calendar, records them and
+    notifies about them. With ALERT_IMMEDIATELY, slots are alerted while the calendar is
+    still being read. With [REBOOK] enabled, the calendar is always read from the page and
+    the booking is moved to the first acceptable slot.
+    Args:
+        page: Playwright page object.
+        config: ConfigParser object.
+        target: Target tuple.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        scheduled_date: Currently scheduled datetime or None.
+        collector: Optional SlotResponseCollector attached to page.
+        notifier: Optional TelegramNotifier.
+    Returns:
+        Scheduled datetime after the scan, the new slot if the booking was moved.
+    """
+    rebooker = Rebooker.from_config(config)
+    alert_immediately = bool(notifier) and config.getboolean("TELEGRAM", "ALERT_IMMEDIATELY", fallback=False)
+    if rebooker or (alert_immediately and collector is None):
+        available_dates, scanned_until, booked_slot = await stream_calendar(
+            page, config, target, date_languages, scheduled_date, notifier if alert_immediately else None, rebooker)
+        await report_available_dates(config, target, available_dates, booked_slot or scheduled_date, notifier,
+                                     alerted=alert_immediately, scanned_until=scanned_until)
+        return booked_slot or scheduled_date
+    available_dates = await scan_calendar(page, config, target, date_languages, collector)
+    await report_available_dates(config, target, available_dates, scheduled_date, notifier)
+    return scheduled_date
+
+async def stream_calendar(page, config, target, date_languages, scheduled_date, notifier=None, rebooker=None):
+    """
+    Reads the calendar and queues an alert for every slot that matches the notify rules as
+    soon as it is found. With NOTIFY_ONLY_IF_EARLIER, reading stops after the scheduled
+    date, as later days cannot hold an earlier slot. A slot the rebooker accepts is booked
+    while its offers are still shown, and reading stops once a booking was moved.
+    Args:
+        page: Playwright page object.
+        config: ConfigParser object.
+        target: Target tuple.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        scheduled_date: Currently scheduled datetime or None.
+        notifier: Optional TelegramNotifier.
+        rebooker: Optional Rebooker.
+    Returns:
+        Tuple (available_dates, scanned_until, booked_slot). scanned_until is None if the
+        whole calendar was read, otherwise the datetime from which on it was not read.
+        booked_slot is the datetime the booking was moved to, or None.
+    """
+    db_path = config.get("STORAGE", "DB_PATH", fallback=None)
+    try:
+        known_dates = get_last_dates(target.name, db_path)
+    except sqlite3.Error as e:
+        print(f"[{target.name}] Could not read the last scan: {e}")
+        known_dates = set()
+    force_notify = config.getboolean("TELEGRAM", "FORCE_NOTIFY", fallback=False)
+    notify_only_if_earlier = config.getboolean("TELEGRAM", "NOTIFY_ONLY_IF_EARLIER", fallback=False)
+    stop_after = scheduled_date if notify_only_if_earlier and scheduled_date and not force_notify else None
+
+    flag_selector = build_flag_selector(date_languages)
+    cache = load_scan_cache(config, target, flag_selector)
+    available_dates = []
+    scanned_until = datetime.combine(stop_after.date() + timedelta(days=1), time.min) if stop_after else None
+    booked_slot = None
+    try:
+        with step("find_test_dates"):
+            async with aclosing(iter_test_dates(page, flag_selector, cache=cache, stop_after=stop_after)) as dates:
+                async for dt in dates:
+                    available_dates.append(dt)
+                    if rebooker and rebooker.accepts(dt, scheduled_date):
+                        detected_at = asyncio.get_running_loop().time()
+                        # Offers in a language the rebooker does not accept are only reported
+                        if await rebooker.offer_shown(page, dt) is not False:
+                            outcome = await rebook(page, config, target, rebooker, dt, scheduled_date, notifier,
+                                                   detected_at)
+                            if outcome == BOOKED:
+                                # The rest of the slot's day and the days after it were not read
+                                booked_slot = dt
+                                scanned_until = datetime.combine(dt.date(), time.min)
+                                break
+                            continue
+                    if notifier and (force_notify or (dt not in known_dates and (not stop_after or dt < stop_after))):
+                        print(f"[{target.name}] New date found: {dt.strftime('%A, %d.%m.%Y %H:%M')}")
+                        await notifier.notify(format_slot_alert(target, dt, scheduled_date))
+    except Exception as e:
+        print(f"[{target.name}] Error finding test dates: {e}")
+        # Slots after the last day read are carried over, not reported as gone
+        last_day = max(available_dates).date() + timedelta(days=1) if available_dates else datetime.min.date()
+        scanned_until = datetime.combine(last_day, time.min)
+    if cache:
+        save_scan_cache(config, target, cache)
+    return available_dates, scanned_until, booked_slot
+
+async def rebook(page, config, target, rebooker, slot, scheduled_date, notifier=None, detected_at=None):
+    """
+    Moves the booking to a slot whose offers are shown on the page, records the attempt
+    and notifies about it.
+    Args:
+        page: Playwright page object.
+        config: ConfigParser object.
+        target: Target tuple.
+        rebooker: Rebooker.
+        slot: datetime of the slot.
+        scheduled_date: Currently scheduled datetime.
+        notifier: Optional TelegramNotifier.
+        detected_at: Optional event loop time the slot was found at.
+    Returns:
+        Outcome string, see Rebooker.book.
+    """
+    loop = asyncio.get_running_loop()
+    detected_at = detected_at or loop.time()
+    print(f"[{target.name}] Moving booking to {slot.strftime('%A, %d.%m.%Y %H:%M')}")
+    with step("rebook"):
+        outcome, detail = await rebooker.book(page, slot)
+    seconds = loop.time() - detected_at
+    print(f"[{target.name}] Rebooking {outcome} after {seconds:.2f}s" + (f": {detail}" if detail else ""))
+    metrics = current_metrics.get()
+    if metrics:
+        metrics.details["rebook"] = {"outcome": outcome, "seconds": round(seconds, 3)}
+    try:
+        record_rebooking(target.name, slot, scheduled_date, outcome, seconds, detail,
+                         path=config.get("STORAGE", "DB_PATH", fallback=None))
+    except sqlite3.Error as e:
+        print(f"[{target.name}] Could not record rebooking: {e}")
+    if outcome == BOOKED:
+        # The saved session still shows the old appointment
+        clear_session(target.name, config.get("SESSION", "DIRECTORY", fallback=None))
+    if notifier:
+        await notifier.notify(format_rebook_message(target, slot, scheduled_date, outcome))
+    return outcome
+
+def format_rebook_message(target, slot, scheduled_date, outcome):
+    """
+    Args:
+        target: Target tuple, its booking URL is linked in the message.
+        slot: datetime of the slot.
+        scheduled_date: Previously scheduled datetime.
+        outcome: Outcome string of the rebooking.
+    Returns:
+        HTML message about a rebooking.
+    """
+    slot_text = slot.strftime('%A, %d.%m.%Y %H:%M')
+    if outcome == BOOKED:
+        message = f"<b>Termin umgebucht:</b> {slot_text}"
+    elif outcome == DRY_RUN:
+        message = f"<b>Termin gefunden (Testlauf, nicht umgebucht):</b> {slot_text}"
+    else:
+        message = f"<b>Umbuchung fehlgeschlagen ({outcome}):</b> {slot_text}"
+    if scheduled_date:
+        message += f"\nVorher gebucht: {scheduled_date.strftime('%A, %d.%m.%Y %H:%M')}"
+    message += f'\n<a href="{target.url}">Buchung ansehen</a>'
+    if target.name != "default":
+        message = f"<b>{target.name}</b> – {target.center}\n" + message
+    return message
+
+def format_slot_alert(target, dt, scheduled_date=None):
+    """
+    Args:
+        target: Target tuple, its booking URL is linked in the message.
+        dt: datetime of the slot.
+        scheduled_date: Currently scheduled datetime or None.
+    Returns:
+        HTML message about one slot.
+    """
+    message = f"<b>Neuer Prüfungstermin:</b> {dt.strftime('%A, %d.%m.%Y %H:%M')}"
+    if scheduled_date:
+        message += f"\nAktuell gebucht: {scheduled_date.strftime('%A, %d.%m.%Y %H:%M')}"
+    message += f'\n<a href="{target.url}">Termin ändern</a>'
+    if target.name != "default":
+        message = f"<b>{target.name}</b> – {target.center}\n" + message
+    return message
+
+async def scan_calendar(page, config, target, date_languages, collector=None):
+    """
+    Finds the available test dates on a page showing the calendar.
+    Args:
+        page: Playwright page object.
+        config: ConfigParser object.
+        target: Target tuple, used to open the calendar in additional tabs.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        collector: Optional SlotResponseCollector attached to page.
+    Returns:
+        List of datetime objects.
+    """
+    page_pool_size = config.getint("DEFAULT", "PAGE_POOL_SIZE", fallback=1)
+
+    async def open_calendar(tab):
+        await open_booking_page(tab, target.url)
+        await open_site_calendar(tab, target.postal_code, target.center)
+
+    available_dates = None
+    if collector:
+        with step("find_test_dates_from_responses"):
+            available_dates = await find_test_dates_from_responses(page, collector, date_languages)
+        if available_dates is None:
+            print("Falling back to reading the calendar from the page.")
+    if available_dates is None:
+        flag_selector = build_flag_selector(date_languages)
+        cache = load_scan_cache(config, target, flag_selector)
+        with step("find_test_dates"):
+            available_dates = await find_test_dates(page, flag_selector, open_calendar, page_pool_size, cache=cache)
+        if cache:
+            save_scan_cache(config, target, cache)
+    return available_dates
 
-        # Click "Wählen Sie eine andere Verfügbarkeit aus" button on the next page
+def load_scan_cache(config, target, flag_selector):
+    """
+    Loads the scan cache of a target if [CACHE] is enabled.
+    Args:
+        config: ConfigParser object.
+        target: Target tuple.
+        flag_selector: CSS selector of the language flags of this scan.
+    Returns:
+        ScanCache, or None.
+    """
+    if not config.getboolean("CACHE", "ENABLED", fallback=False):
+        return None
+    return ScanCache.load(target.name, config.getfloat("CACHE", "TTL_SECONDS", fallback=DEFAULT_TTL_SECONDS),
+                          flag_selector, config.get("CACHE", "DIRECTORY", fallback=None))
+
+def save_scan_cache(config, target, cache):
+    """
+    Saves the scan cache of a target and reports how many days it saved opening.
+    Args:
+        config: ConfigParser object.
+        target: Target tuple.
+        cache: ScanCache.
+    """
+    summary = cache.summary()
+    print(f"[{target.name}] Took {summary['days_cached']} days from the cache, opened {summary['days_opened']} days.")
+    metrics = current_metrics.get()
+    if metrics:
+        metrics.details["cache"] = summary
+    try:
+        cache.save(target.name, config.get("CACHE", "DIRECTORY", fallback=None))
+    except OSError as e:
+        print(f"[{target.name}] Could not save scan cache: {e}")
+
+async def run_daemon(p, config, targets, date_languages, headless, notifier=None):
+    """
+    Keeps one browser, and one context and page per target on the calendar, and checks
+    again on an interval, or on an interval adapted to the availability history with
+    ADAPTIVE. A dead page or browser is replaced, and the browser is restarted after
+    RESTART_HOURS. With [SERVER] enabled, the results are served over HTTP meanwhile.
+    Args:
+        p: Playwright object.
+        config: ConfigParser object.
+        targets: List of Target tuples.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Run the browser headless.
+        notifier: Optional TelegramNotifier.
+    """
+    interval = config.getfloat("DAEMON", "INTERVAL_SECONDS", fallback=DEFAULT_DAEMON_INTERVAL_SECONDS)
+    jitter = config.getfloat("DAEMON", "JITTER_SECONDS", fallback=DEFAULT_DAEMON_JITTER_SECONDS)
+    restart_after = timedelta(hours=config.getfloat("DAEMON", "RESTART_HOURS", fallback=DEFAULT_DAEMON_RESTART_HOURS))
+    max_concurrency = config.getint("DEFAULT", "MAX_CONCURRENCY", fallback=DEFAULT_MAX_CONCURRENCY)
+    scheduler = AdaptiveScheduler.from_config(config, interval, jitter)
+    low_memory = config.getboolean("RESOURCES", "LOW_MEMORY", fallback=False)
+    budget = get_scan_budget(config)
+    server = SnapshotServer.from_config(config)
+    if server:
+        server.start()
+
+    browser = None
+    started_at = None
+    sessions = {}
+    while True:
         try:
-            await page.locator("button:has-text('Wählen Sie eine andere Verfügbarkeit aus')").wait_for(state="visible", timeout=5000)
-            await page.locator("button:has-text('Wählen Sie eine andere Verfügbarkeit aus')").click()
-            print("Clicked 'Wählen Sie eine andere Verfügbarkeit aus' button.")
+            if browser and (not browser.is_connected() or datetime.now() - started_at > restart_after):
+                print("Restarting browser.")
+                await close_browser(browser)
+                browser = None
+            with ResourceMonitor(budget) as monitor:
+                if browser is None:
+                    browser = await launch_browser(p, headless, low_memory)
+                    started_at = datetime.now()
+                    sessions = {target.name: TargetSession() for target in targets}
+                results = await run_with_budget(
+                    run_limited([recheck_target(browser, config, target, sessions[target.name], date_languages, notifier)
+                                 for target in targets], max_concurrency),
+                    budget
+                )
+            if not results:
+                # The checks were cancelled halfway, start over with a fresh browser
+                await close_browser(browser)
+                browser = None
+            for target, result in zip(targets, results):
+                if isinstance(result, Exception):
+                    print(f"[{target.name}] Error during check: {result}")
+                    await sessions[target.name].close()
+                    sessions[target.name] = TargetSession()
+            write_metrics(config, results, report_peak_memory(monitor))
         except Exception as e:
-            print(f"Could not find or click 'Wählen Sie eine andere Verfügbarkeit aus' button: {e}")
+            print(f"Error during check, restarting browser: {e}")
+            await close_browser(browser)
+            browser = None
+
+        await asyncio.sleep(get_next_delay(scheduler, interval, jitter))
+
+class TargetSession:
+    """
+    Browser context and calendar page of one target, kept between checks in daemon mode.
+    """
+    def __init__(self):
+        self.context = None
+        self.blocker = None
+        self.asset_cache = None
+        self.page = None
+        self.collector = None
+        self.scheduled_date = None
+        self.saved_session = None
+
+    async def close(self):
+        """
+        Closes the context, ignoring errors of a context that already died.
+        """
+        if self.context:
+            try:
+                await self.context.close()
+            except Exception as e:
+                print(f"Could not close context: {e}")
+        self.context = self.blocker = self.asset_cache = self.page = self.collector = None
+
+async def recheck_target(browser, config, target, session, date_languages, notifier=None):
+    """
+    Checks one target again, reusing its calendar page if it is still alive.
+    Args:
+        browser: Playwright browser object.
+        config: ConfigParser object.
+        target: Target tuple.
+        session: TargetSession of the target.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        notifier: Optional TelegramNotifier.
+    Returns:
+        Metrics summary dict of the check, or None if metrics are disabled.
+    """
+    if session.context is None:
+        session.saved_session = load_saved_session(config, target)
+        storage_state = session.saved_session["storage_state"] if session.saved_session else None
+        session.context, session.blocker, session.asset_cache = await new_context(browser, config, storage_state)
+    if session.blocker:
+        session.blocker.reset()
+    if session.asset_cache:
+        session.asset_cache.reset()
+    metrics = start_metrics(config, target.name, session.context)
+    try:
+        if session.page is None or session.page.is_closed() or not await return_to_calendar(session.page):
+            if session.page and not session.page.is_closed():
+                await session.page.close()
+            session.page, session.collector = await open_page(session.context, config)
+            session.scheduled_date = await reach_calendar(session.page, config, target, session.context, session.saved_session)
+            session.saved_session = None
+        if session.collector:
+            session.collector.clear()
+        session.scheduled_date = await scan_and_report(session.page, config, target, date_languages, session.scheduled_date,
+                                                       session.collector, notifier)
+        await report_blocking(target, session.blocker, metrics)
+        report_asset_cache(target, session.asset_cache, metrics)
+        return await finish_metrics(metrics)
+    finally:
+        # A failed recheck must not leave its listener on the reused context
+        if metrics:
+            metrics.detach()
+
+async def return_to_calendar(page):
+    """
+    Brings a page that finished a scan back to the current month of the calendar.
+    Args:
+        page: Playwright page object.
+    Returns:
+        True if the calendar is visible, False if the booking flow has to be walked again.
+    """
+    try:
+        date_nav = page.locator("app-date-navigator")
+        await date_nav.wait_for(state="visible", timeout=2000)
+        today = datetime.now()
+        for _ in range(12):
+            year, month = await get_month_info(date_nav)
+            if (year, month) <= (today.year, today.month):
+                break
+            await click_previous_month(page)
+        return True
+    except Exception as e:
+        print(f"Calendar is not available anymore: {e}")
+        return False
+
+async def close_browser(browser):
+    """
+    Closes a browser, ignoring errors of a browser that already died.
+    Args:
+        browser: Playwright browser object or None.
+    """
+    if browser is None:
+        return
+    try:
+        await browser.close()
+    except Exception as e:
+        print(f"Could not close browser: {e}")
 
-        # Enter "4731" in the "Ort, Postleitzahl, Führerscheinzentrum" field
+async def run_api_scan(config, target, date_languages, headless, notifier=None):
+    """
+    Checks the available dates of a target through the portal's HTTP API without a browser.
+    Args:
+        config: ConfigParser object.
+        target: Target tuple.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        headless: Run the browser headless if the session has to be bootstrapped with it.
+        notifier: Optional TelegramNotifier.
+    Returns:
+        Metrics summary dict of the check, or None if metrics are disabled.
+    """
+    metrics = start_metrics(config, target.name)
+    api_config = config["API"]
+    client = AvailabilityClient(
+        target.url,
+        availability_path=api_config.get("AVAILABILITY_PATH", DEFAULT_AVAILABILITY_PATH),
+        site_id=target.site_id or api_config.get("SITE_ID", DEFAULT_SITE_ID),
+        horizon_days=api_config.getint("HORIZON_DAYS", fallback=DEFAULT_HORIZON_DAYS),
+        offers_path=api_config.get("OFFERS_PATH") or None,
+        booking_path=api_config.get("BOOKING_PATH") or None,
+        session_bootstrap=lambda booking_url: bootstrap_session_with_browser(booking_url, headless),
+    )
+    async with client:
+        with step("scheduled_date"):
+            scheduled_date = await client.get_scheduled_date()
+        if scheduled_date:
+            print(f"Currently scheduled date: {scheduled_date}")
         try:
-            await page.locator("div.ng-placeholder:text('Ort, Postleitzahl, Führerscheinzentrum')").wait_for(state="visible", timeout=5000)
-            input_box = page.locator("app-site-selector input[type='text']")
-            if await input_box.count() > 0:
-                await input_box.first.click()
-                await input_box.first.fill("4731")
-                print("Entered '4731' in the 'Ort, Postleitzahl, Führerscheinzentrum' field.")
-            else:
-                print("Could not find the input box for 'Ort, Postleitzahl, Führerscheinzentrum'.")
+            with step("find_test_dates"):
+                available_dates = await client.find_test_dates(date_languages)
         except Exception as e:
-            print(f"Could not interact with the 'Ort, Postleitzahl, Führerscheinzentrum' field: {e}")
+            print(f"[{target.name}] Error finding test dates through the API: {e}")
+            available_dates = []
+    await report_available_dates(config, target, available_dates, scheduled_date, notifier)
+    return await finish_metrics(metrics)
+
+async def report_available_dates(config, target, available_dates, scheduled_date, notifier=None,
+                                 alerted=False, scanned_until=None):
+    """
+    Prints the available dates and queues the Telegram notification if the notify rules match.
+    Args:
+        config: ConfigParser object.
+        target: Target tuple, its booking URL is linked in the message.
+        available_dates: List of datetime objects.
+        scheduled_date: Currently scheduled datetime or None.
+        notifier: Optional TelegramNotifier, no notification is sent without it.
+        alerted: True if the slots were already alerted while the calendar was read.
+        scanned_until: Optional datetime up to which the calendar was read, see record_scan.
+    """
+    if available_dates:
+        print(f"[{target.name}] Available dates:")
+        for dt in available_dates:
+            print("  -", dt.strftime("%A, %d.%m.%Y %H:%M"))
+    else:
+        print(f"[{target.name}] No available dates found.")
 
-        # Select "Führerscheinzentrum Eupen (1029)" from the dropdown
+    # Record the scan in the availability history
+    db_path = config.get("STORAGE", "DB_PATH", fallback=None)
+    run_id = None
+    try:
+        run_id = record_scan(available_dates, target.name, path=db_path, scanned_until=scanned_until)
+        prune(config.getint("STORAGE", "RETENTION_DAYS", fallback=DEFAULT_RETENTION_DAYS), path=db_path)
+    except sqlite3.Error as e:
+        print(f"[{target.name}] Could not record scan: {e}")
+    if config.getboolean("SERVER", "ENABLED", fallback=False):
         try:
-            await page.locator("div.ng-option .site-text:text('Führerscheinzentrum Eupen (1029)')").wait_for(state="visible", timeout=5000)
-            await page.locator("div.ng-option .site-text:text('Führerscheinzentrum Eupen (1029)')").click()
-            print("Selected 'Führerscheinzentrum Eupen (1029)'.")
-        except Exception as e:
-            print(f"Could not select 'Führerscheinzentrum Eupen (1029)': {e}")
+            update_snapshot(config.get("SERVER", "SNAPSHOT_PATH", fallback=DEFAULT_SNAPSHOT_PATH), target.name,
+                            target.center, available_dates, scheduled_date, scanned_until)
+        except OSError as e:
+            print(f"[{target.name}] Could not write snapshot: {e}")
 
-        # Print currently scheduled date
+    if available_dates:
+        msg_lines = [dt.strftime("%A, %d.%m.%Y %H:%M") for dt in available_dates]
+        termin_link = f'<a href="{target.url}">Termin ändern</a>'
+        # Add scheduled date to the message if available
         if scheduled_date:
-            print("Scheduled date:")
-            print("  -", scheduled_date.strftime("%A, %d.%m.%Y %H:%M"))
+            scheduled_date_string = scheduled_date.strftime("%A, %d.%m.%Y %H:%M")
+            message = (
+                f"<b>Aktuell gebuchter Termin:</b>\n{scheduled_date_string}\n\n"
+                f"<b>Verfügbare Prüfungstermine:</b>\n" + "\n".join(msg_lines) + f"\n\n{termin_link}"
+            )
         else:
-            print("Warning: no currently scheduled date found.")
-
-        # Find available test dates
-        available_dates = await find_test_dates(page, flag_selector)
-        if available_dates:
-            print("Available dates:")
-            for dt in available_dates:
-                print("  -", dt.strftime("%A, %d.%m.%Y %H:%M"))
-        else:
-            print("No available dates found.")
-
-        # Read Telegram config
-        telegram_enabled = config["TELEGRAM"].get("ENABLED", "false").lower() == "true"
-        telegram_token = config["TELEGRAM"].get("TELEGRAM_BOT_TOKEN", "")
-        telegram_chat_id = config["TELEGRAM"].get("CHAT_ID", "")
-
-        if available_dates:
-            msg_lines = [dt.strftime("%A, %d.%m.%Y %H:%M") for dt in available_dates]
-            termin_link = f'<a href="{url}">Termin ändern</a>'
-            # Add scheduled date to the message if available
-            if scheduled_date:
-                scheduled_date_string = scheduled_date.strftime("%A, %d.%m.%Y %H:%M")
-                message = (
-                    f"<b>Aktuell gebuchter Termin:</b>\n{scheduled_date_string}\n\n"
-                    f"<b>Verfügbare Prüfungstermine:</b>\n" + "\n".join(msg_lines) + f"\n\n{termin_link}"
-                )
+            message = "<b>Verfügbare Prüfungstermine:</b>\n" + "\n".join(msg_lines) + f"\n\n{termin_link}"
+        if target.name != "default":
+            message = f"<b>{target.name}</b> – {target.center}\n\n" + message
+
+        if notifier and not alerted:
+            if should_send_telegram(run_id, config, scheduled_date, target.name):
+                with step("notify"):
+                    await notifier.notify(message)
             else:
-                message = "<b>Verfügbare Prüfungstermine:</b>\n" + "\n".join(msg_lines) + f"\n\n{termin_link}"
+                print(f"[{target.name}] No new/earlier dates. Telegram message not sent.")
+    else:
+        print(f"[{target.name}] No available dates found.")
+
+async def open_booking_page(page, url):
+    """
+    Opens the booking URL and accepts the cookie banner if it shows up before the booking.
+    Args:
+        page: Playwright page object.
+        url: Booking URL from the confirmation email.
+    """
+    with step("goto"):
+        await page.goto(url)
+    print(f"Opened {url}")
 
-            if telegram_enabled and telegram_token and telegram_chat_id:
-                if should_send_telegram(available_dates, config, scheduled_date):
-                    await send_telegram_message(telegram_token, telegram_chat_id, message)
-                else:
-                    print("No new/earlier dates. Telegram message not sent.")
+    # Accept cookie banner, or go on as soon as the booking is shown without one
+    with step("cookie_banner"):
+        state = await wait_for_any(page, [
+            ("cookie_banner", COOKIE_BANNER_SELECTOR),
+            ("booking", "app-offer span.offer-date"),
+            ("change_reservation", CHANGE_RESERVATION_SELECTOR),
+        ])
+        if state == "cookie_banner":
+            await accept_cookie_banner(page)
         else:
-            print("No available dates found.")
-            # Optionally, you could clear last_dates.json here if you want to reset on no dates
+            print("No cookie banner found.")
 
-        # Abort the process by clicking "Änderung abbrechen"
-        try:
-            await page.locator("button.cuip-button-empty-danger span.cuip-button-content:text('Änderung abbrechen')").wait_for(state="visible", timeout=5000)
-            await page.locator("button.cuip-button-empty-danger span.cuip-button-content:text('Änderung abbrechen')").click()
-            print('Clicked "Änderung abbrechen" to abort the process.')
-        except Exception as e:
-            print(f'Could not find or click "Änderung abbrechen": {e}')
+async def accept_cookie_banner(page):
+    """
+    Clicks the button of the cookie consent banner.
+    Args:
+        page: Playwright page object.
+    """
+    try:
+        await page.locator(COOKIE_BANNER_SELECTOR).click()
+        print("Cookie banner accepted.")
+    except Exception as e:
+        print(f"Error accepting cookies: {e}")
 
-        if not headless:
-            # Keep browser open for manual inspection
-            await page.wait_for_timeout(10000)
-            
-        await browser.close()
+async def open_site_calendar(page, postal_code=DEFAULT_POSTAL_CODE, center=DEFAULT_CENTER):
+    """
+    Walks from the booking overview to the availability calendar of the test center.
+    Instead of waiting for each page in turn, every round waits for whichever step of the
+    flow shows up first and handles it, so steps that are skipped cost no time. After a
+    step, the next round starts once its element is gone or a later step shows up.
+    Args:
+        page: Playwright page object showing the booking overview.
+        postal_code: Postal code typed into the site selector, e.g. "4731".
+        center: Test center as listed in the site selector, e.g. "Führerscheinzentrum Eupen (1029)".
+    """
+    site_option_selector = f"div.ng-option .site-text:text('{center}')"
+    states = [
+        ("calendar", "app-date-navigator"),
+        ("cookie_banner", COOKIE_BANNER_SELECTOR),
+        ("site_option", site_option_selector),
+        ("site_input", SITE_INPUT_PLACEHOLDER_SELECTOR),
+        ("other_availability", OTHER_AVAILABILITY_SELECTOR),
+        ("change_appointment", "h5:text('Termin')"),
+        ("change_reservation", CHANGE_RESERVATION_SELECTOR),
+    ]
+    handled = []
+    while True:
+        state = await wait_for_any(page, states)
+        if state is None:
+            print(f"Calendar did not show up after {', '.join(handled) or 'opening the booking'}.")
+            return
+        if state == "calendar":
+            return
+        if handled.count(state) >= 2:
+            print(f"Step '{state}' did not lead anywhere, giving up.")
+            return
+        handled.append(state)
+
+        with step(state):
+            if state == "cookie_banner":
+                await accept_cookie_banner(page)
+
+            # Click the button to change the reservation
+            elif state == "change_reservation":
+                try:
+                    await page.locator(CHANGE_RESERVATION_SELECTOR).first.click()
+                    print("Clicked the button to change the reservation.")
+                except Exception as e:
+                    print(f"Could not click the change reservation button: {e}")
+
+            # Click "Verändern" next to the "Termin" part on the second page
+            elif state == "change_appointment":
+                try:
+                    section = page.locator("app-section:has(h5:text('Termin'))")
+                    veraendern_button = section.locator("button:has-text('Verändern')")
+                    if await veraendern_button.count() > 0:
+                        await veraendern_button.first.click()
+                        print("Clicked 'Verändern' next to 'Termin'.")
+                    else:
+                        print("Could not find 'Verändern' button next to 'Termin'.")
+                except Exception as e:
+                    print(f"Could not click 'Verändern' next to 'Termin': {e}")
+
+            # Click "Wählen Sie eine andere Verfügbarkeit aus" button on the next page
+            elif state == "other_availability":
+                try:
+                    await page.locator(OTHER_AVAILABILITY_SELECTOR).click()
+                    print("Clicked 'Wählen Sie eine andere Verfügbarkeit aus' button.")
+                except Exception as e:
+                    print(f"Could not click 'Wählen Sie eine andere Verfügbarkeit aus' button: {e}")
+
+            # Enter the postal code in the "Ort, Postleitzahl, Führerscheinzentrum" field
+            elif state == "site_input":
+                try:
+                    input_box = page.locator("app-site-selector input[type='text']")
+                    if await input_box.count() > 0:
+                        await input_box.first.click()
+                        await input_box.first.fill(postal_code)
+                        print(f"Entered '{postal_code}' in the 'Ort, Postleitzahl, Führerscheinzentrum' field.")
+                    else:
+                        print("Could not find the input box for 'Ort, Postleitzahl, Führerscheinzentrum'.")
+                except Exception as e:
+                    print(f"Could not interact with the 'Ort, Postleitzahl, Führerscheinzentrum' field: {e}")
 
-def should_send_telegram(current_dates, config, scheduled_date=None):
+            # Select the test center from the dropdown
+            elif state == "site_option":
+                try:
+                    await page.locator(site_option_selector).click()
+                    print(f"Selected '{center}'.")
+                except Exception as e:
+                    print(f"Could not select '{center}': {e}")
+
+            # The states are ordered from most to least advanced
+            index = [name for name, _ in states].index(state)
+            await wait_for_state_to_pass(page, states[index][1], states[:index])
+
+def should_send_telegram(run_id, config, scheduled_date=None, target=None):
+    """
+    Decides whether a recorded scan is notified. Only reads the availability history.
+    Args:
+        run_id: Run ID as returned by record_scan, or None if the scan could not be recorded.
+        config: ConfigParser object.
+        scheduled_date: Currently scheduled datetime or None.
+        target: Optional target name.
+    Returns:
+        True if the notification should be sent.
+    """
     # If FORCE_NOTIFY flag is set, send notification regardless of dates
     force_notify = config.getboolean("TELEGRAM", "FORCE_NOTIFY", fallback=False)
     if force_notify:
@@ -171,24 +1219,28 @@ def should_send_telegram(current_dates, config, scheduled_date=None):
 
     # If NOTIFY_ONLY_IF_EARLIER is set, notification is only send if there are new dates that
     # are earlier than the currently scheduled date
-    notify_only_if_earlier  = config.getboolean("TELEGRAM", "NOTIFY_ONLY_IF_EARLIER ", fallback=False)
+    notify_only_if_earlier = config.getboolean("TELEGRAM", "NOTIFY_ONLY_IF_EARLIER", fallback=False)
 
     # Check for new dates since last run
-    last_dates = load_last_dates()
-    new_dates = set(current_dates) - last_dates
-    if new_dates:
-        save_current_dates(current_dates)
-        if not notify_only_if_earlier:
+    if run_id is None:
+        print("Scan is not in the availability history. Sending message in case its dates are new.")
+        return True
+    target = target or "default"
+    db_path = config.get("STORAGE", "DB_PATH", fallback=None)
+    try:
+        if not notify_only_if_earlier and get_new_dates(run_id, target, path=db_path):
             return True # If NOTIFY_ONLY_IF_EARLIER is not set, send if there are any new dates
 
-    # If at least one of the new dates is earlier than the scheduled date, send a message
-    if scheduled_date:
-        earlier_dates = [dt for dt in new_dates if dt < scheduled_date]
-        if earlier_dates:
-            return True
-    else:
-        return True  # If no scheduled date, send if there are any new dates
-        
+        # If at least one of the new dates is earlier than the scheduled date, send a message
+        if scheduled_date:
+            if get_new_dates(run_id, target, earlier_than=scheduled_date, path=db_path):
+                return True
+        else:
+            return True  # If no scheduled date, send if there are any new dates
+    except sqlite3.Error as e:
+        print(f"Could not read the availability history: {e}. Sending message in case the dates are new.")
+        return True
+
     return False
 
 async def extract_scheduled_date(page):
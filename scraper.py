@@ -1,97 +1,441 @@
+import asyncio
 import re
+from collections import deque
 
-from datetime import datetime
+from datetime import datetime, date
 from utils.date_utils import month_mapping
+from utils.metrics_utils import step
+from utils.wait_utils import wait_for_text_change
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-async def find_test_dates(page, flag_selector):
+# Number of months scanned, starting with the month the calendar opens on
+DEFAULT_MONTHS = 3
+
+# A day whose offers could not be read is tried this often, by whichever tab takes it next
+MAX_DAY_ATTEMPTS = 2
+
+# Maximum month changes to bring a tab's calendar to the month of a day
+MAX_MONTH_CHANGES = 24
+
+# Maximum wait in milliseconds for the availability response of a month
+MONTH_RESPONSE_TIMEOUT = 10000
+
+# Day cells of the date navigator, in DOM order
+DAY_SELECTOR = "div.ngb-dp-day .day .simple-day"
+
+# Collects everything get_available_days needs in one round trip
+SNAPSHOT_SCRIPT = """
+    (nav, daySelector) => {
+        const monthName = nav.querySelector('.ngb-dp-month-name');
+        const days = Array.from(nav.querySelectorAll(daySelector)).map((el, index) => {
+            let label = null;
+            for (let node = el; node; node = node.parentElement) {
+                if (node.hasAttribute('aria-label')) {
+                    label = node.getAttribute('aria-label');
+                    break;
+                }
+            }
+            const cell = el.closest('div.ngb-dp-day');
+            const day = el.closest('.day');
+            return {
+                index: index,
+                label: label,
+                enabled: !cell.classList.contains('disabled') && !day.classList.contains('text-muted'),
+                has_offer: el.parentElement.querySelector('.available-offer-bubble') !== null,
+                text: el.innerText,
+            };
+        });
+        return {month_name: monthName ? monthName.innerText : '?', days: days};
+    }
+"""
+
+# Clicks a month navigation button and returns the month header from before the click,
+# or null if there is no enabled button
+CHANGE_MONTH_SCRIPT = """
+    title => {
+        const button = document.querySelector(`button[title='${title}']`);
+        if (!button || button.disabled) return null;
+        const monthName = document.querySelector('.ngb-dp-month-name');
+        const oldMonthName = monthName ? monthName.innerText : '';
+        button.click();
+        return oldMonthName;
+    }
+"""
+
+# Time text of every matched offer flag, extracted in one round trip
+OFFER_TIMES_SCRIPT = """
+    flags => flags.map(el => {
+        let parent = el.closest('.cuip-button-content');
+        if (!parent) return null;
+        let timeDiv = parent.querySelector('div.d-flex.align-items-center.justify-content-center');
+        return timeDiv ? timeDiv.childNodes[0].textContent.trim() : null;
+    })
+"""
+
+async def find_test_dates(page, flag_selector, open_calendar=None, page_pool_size=1, months=DEFAULT_MONTHS, cache=None):
     """
-    Finds available test dates on the page for the next 3 months.
+    Finds available test dates on the page for the next months.
     Args:
         page: Playwright page object.
         flag_selector: CSS selector for language flags.
+        open_calendar: Optional async callable taking a fresh page and bringing it to the
+            calendar. Required for page_pool_size > 1.
+        page_pool_size: Number of tabs used to extract the offers of the available days.
+        months: Number of months to scan.
+        cache: Optional ScanCache. Days whose offers are cached are not opened.
     Returns:
         List of datetime objects for available test dates.
     """
+    if page_pool_size > 1 and open_calendar:
+        return await find_test_dates_parallel(page, flag_selector, open_calendar, page_pool_size, months, cache)
+
     available_dates = []
+    try:
+        async for dt in iter_test_dates(page, flag_selector, months, cache):
+            available_dates.append(dt)
+        return available_dates
+    except Exception as e:
+        print(f"Error finding test dates: {e}")
+        return []
+
+async def iter_test_dates(page, flag_selector, months=DEFAULT_MONTHS, cache=None, stop_after=None):
+    """
+    Yields the available test dates on the page as they are found, day by day and month
+    by month. While the slots of an opened day are yielded, its offers are still shown.
+    Args:
+        page: Playwright page object.
+        flag_selector: CSS selector for language flags.
+        months: Number of months to scan.
+        cache: Optional ScanCache. Days whose offers are cached are not opened.
+        stop_after: Optional datetime. The scan stops before the first day after it.
+    Yields:
+        datetime objects for available test dates.
+    Raises:
+        Playwright errors if the calendar cannot be read.
+    """
+    date_nav = page.locator("app-date-navigator")
+    await date_nav.wait_for(state="visible", timeout=10000)
+
+    for month_offset in range(months):
+        with step("month"):
+            snapshot = await get_calendar_snapshot(date_nav)
+            year, current_month = parse_month_name(snapshot["month_name"])
+            available_days = get_available_days(snapshot, current_month)
+            if cache and current_month:
+                cache.update_month(year, current_month, [day_number for _, day_number in available_days])
+        for index, day_number in available_days:
+            if stop_after and date(year, current_month, int(day_number)) > stop_after.date():
+                return
+            offer_times = get_cached_offer_times(cache, year, current_month, day_number)
+            opened = offer_times is None
+            if opened:
+                with step("day"):
+                    day = date_nav.locator(DAY_SELECTOR).nth(index)
+                    offer_times = await extract_offer_times(page, day, year, current_month, day_number, flag_selector)
+                    if cache:
+                        cache.put_day(year, current_month, day_number, offer_times)
+            for dt in offer_times:
+                yield dt
+            # The day is closed only when the next one is asked for, so a consumer that
+            # stops at one of its slots finds the offers still open
+            if opened:
+                with step("close_day"):
+                    await date_nav.click()
+                    await date_nav.wait_for(state="visible", timeout=5000)
+        if month_offset == months - 1:
+            return
+        if stop_after and current_month and (year, current_month) >= (stop_after.year, stop_after.month):
+            return
+        await click_next_month(page)
+
+async def find_test_dates_parallel(page, flag_selector, open_calendar, page_pool_size, months=DEFAULT_MONTHS, cache=None):
+    """
+    Finds available test dates for the next months, extracting the offers of the
+    available days on a pool of tabs in the same browser context.
+    Args:
+        page: Playwright page object showing the calendar.
+        flag_selector: CSS selector for language flags.
+        open_calendar: Async callable taking a fresh page and bringing it to the calendar.
+        page_pool_size: Maximum number of tabs, including page.
+        months: Number of months to scan.
+        cache: Optional ScanCache. Days whose offers are cached are not opened.
+    Returns:
+        Sorted list of unique datetime objects for available test dates.
+    """
+    cached_dates = []
     try:
         date_nav = page.locator("app-date-navigator")
         await date_nav.wait_for(state="visible", timeout=10000)
 
-        for _ in range(3):  # Next 3 months
-            year, current_month = await get_month_info(date_nav)
-            day_cells = await get_available_days(date_nav, current_month)
-            for day, day_number in day_cells:
-                offer_times = await extract_offer_times(page, day, year, current_month, day_number, flag_selector)
-                available_dates.extend(offer_times)
-                await date_nav.click()
-                await page.locator("app-date-navigator").wait_for(state="visible", timeout=5000)
-            await click_next_month(page)
-        return available_dates
+        # Collect the available days of all months on the main page first
+        jobs = deque()
+        for month_offset in range(months):
+            with step("month"):
+                snapshot = await get_calendar_snapshot(date_nav)
+            year, current_month = parse_month_name(snapshot["month_name"])
+            for _, day_number in get_uncached_days(snapshot, year, current_month, cache, cached_dates):
+                jobs.append((year, current_month, day_number, 0))
+            if month_offset < months - 1:
+                await click_next_month(page)
     except Exception as e:
         print(f"Error finding test dates: {e}")
         return []
 
-async def get_month_info(date_nav):
+    # The main page is already at the last month, so it works through the days from the
+    # end, while the new tabs open on the first month and start from the front
+    extra_tabs = min(page_pool_size, len(jobs)) - 1
+    tabs = [await page.context.new_page() for _ in range(max(extra_tabs, 0))]
+    try:
+        results = await asyncio.gather(
+            extract_offer_times_worker(page, jobs, flag_selector, cache=cache, from_end=True),
+            *(extract_offer_times_worker(tab, jobs, flag_selector, open_calendar, cache) for tab in tabs)
+        )
+    finally:
+        for tab in tabs:
+            await tab.close()
+    return sorted(set(cached_dates) | set(dt for times in results for dt in times))
+
+async def extract_offer_times_worker(page, jobs, flag_selector, open_calendar=None, cache=None, from_end=False):
     """
-    Extracts the current month and year from the date navigator.
+    Extracts offer times for queued days until the queue is empty. Before each day, the
+    calendar is brought to the day's month as shown in its header. A day that fails is
+    put back once, at the other end of the queue, so another tab is likely to take it.
+    Args:
+        page: Playwright page object.
+        jobs: deque of (year, month, day_number, attempt) tuples, shared by all workers.
+        flag_selector: CSS selector for language flags.
+        open_calendar: Optional async callable bringing the page to the calendar first.
+        cache: Optional ScanCache the offers are stored in.
+        from_end: Take days from the end of the queue instead of the front.
+    Returns:
+        List of datetime objects for available offer times.
+    """
+    times = []
+    try:
+        if open_calendar:
+            await open_calendar(page)
+        date_nav = page.locator("app-date-navigator")
+        await date_nav.wait_for(state="visible", timeout=10000)
+    except Exception as e:
+        print(f"Could not open calendar in worker tab: {e}")
+        return times
+
+    while jobs:
+        year, month, day_number, attempt = jobs.pop() if from_end else jobs.popleft()
+        try:
+            snapshot = await show_month(page, date_nav, year, month)
+            index = next((index for index, number in get_available_days(snapshot, month) if number == day_number), None)
+            if index is None:
+                print(f"{day_number}.{month}.{year} is not available anymore.")
+                continue
+            with step("day"):
+                day = date_nav.locator(DAY_SELECTOR).nth(index)
+                offer_times = await extract_offer_times(page, day, year, month, day_number, flag_selector)
+                times.extend(offer_times)
+                if cache:
+                    cache.put_day(year, month, day_number, offer_times)
+                await date_nav.click()
+                await date_nav.wait_for(state="visible", timeout=5000)
+        except Exception as e:
+            if attempt + 1 < MAX_DAY_ATTEMPTS:
+                print(f"Could not extract offer times for {day_number}.{month}.{year}, retrying: {e}")
+                job = (year, month, day_number, attempt + 1)
+                if from_end:
+                    jobs.appendleft(job)
+                else:
+                    jobs.append(job)
+            else:
+                print(f"Could not extract offer times for {day_number}.{month}.{year}: {e}")
+    return times
+
+async def show_month(page, date_nav, year, month):
+    """
+    Brings the calendar to a month, going by the month its header shows.
     Args:
+        page: Playwright page object.
         date_nav: Playwright locator for the date navigator.
+        year: Integer year.
+        month: Integer month.
     Returns:
-        Tuple (year, current_month) as integers.
+        Calendar snapshot of the month, as returned by get_calendar_snapshot.
+    Raises:
+        ValueError: If the header cannot be read or the month is not reached.
+    """
+    for _ in range(MAX_MONTH_CHANGES + 1):
+        snapshot = await get_calendar_snapshot(date_nav)
+        shown = parse_month_name(snapshot["month_name"])
+        if shown == (year, month):
+            return snapshot
+        if not shown[1]:
+            raise ValueError(f"Unknown month {snapshot['month_name']!r} in the calendar")
+        if shown < (year, month):
+            await click_next_month(page)
+        else:
+            await click_previous_month(page)
+    raise ValueError(f"Could not bring the calendar to {month}.{year}")
+
+async def find_test_dates_from_responses(page, collector, date_languages, months=DEFAULT_MONTHS):
     """
-    month_name_elem = date_nav.locator(".ngb-dp-month-name")
-    month_name = (await month_name_elem.first.inner_text()).strip().lower() if await month_name_elem.count() > 0 else "?"
+    Finds available test dates for the next months from the captured availability
+    responses instead of the DOM. Only the month navigation is clicked, and every click
+    has to bring in an availability response of its own.
+    Args:
+        page: Playwright page object showing the calendar.
+        collector: SlotResponseCollector attached to page before the booking flow.
+        date_languages: List of language codes, e.g. ["de", "fr"].
+        months: Number of months to scan.
+    Returns:
+        Sorted list of datetime objects, or None if the responses do not contain offer
+        times and the DOM has to be scraped instead.
+    """
+    try:
+        date_nav = page.locator("app-date-navigator")
+        await date_nav.wait_for(state="visible", timeout=10000)
+        year, first_month = await get_month_info(date_nav)
+        if not first_month:
+            return None
+        if not collector.matched:
+            # The response of the first month may still be on its way
+            await page.wait_for_event("response", collector.matches, timeout=MONTH_RESPONSE_TIMEOUT)
+        for _ in range(months - 1):  # Load the remaining months
+            async with page.expect_response(collector.matches, timeout=MONTH_RESPONSE_TIMEOUT):
+                await click_next_month(page)
+        await collector.drain()
+    except PlaywrightTimeoutError:
+        print("A month did not load an availability response.")
+        return None
+    except Exception as e:
+        print(f"Error capturing availability responses: {e}")
+        return None
+
+    if not collector.payloads:
+        print("No availability responses captured.")
+        return None
+    slots, days = collector.slots(date_languages)
+    if days - {dt.date() for dt in slots}:
+        print("Availability responses contain days without offer times.")
+        return None
+
+    start = datetime(year, first_month, 1)
+    end = datetime(year + (first_month + months - 1) // 12, (first_month + months - 1) % 12 + 1, 1)
+    return sorted(dt for dt in slots if start <= dt < end)
+
+async def get_calendar_snapshot(date_nav):
+    """
+    Reads the month name and all day cells of the date navigator in a single in-page evaluation.
+    Args:
+        date_nav: Playwright locator for the date navigator.
+    Returns:
+        Dict with "month_name" (string) and "days" (list of dicts with "index", "label",
+        "enabled", "has_offer" and "text" for every day cell, in DOM order).
+    """
+    return await date_nav.evaluate(SNAPSHOT_SCRIPT, DAY_SELECTOR)
+
+def parse_month_name(month_name):
+    """
+    Parses the month header of the date navigator.
+    Args:
+        month_name: Header text, e.g. "Oktober 2025".
+    Returns:
+        Tuple (year, current_month) as integers. current_month is 0 if the month is unknown.
+    """
+    month_name = (month_name or "?").strip().lower()
     match = re.search(r"([a-zäöüéèêûôîç]+)\s+(\d{4})", month_name)
     if match:
         month_str = match.group(1)
         year = int(match.group(2))
     else:
-        month_str = month_name.split()[0]
+        month_str = month_name.split()[0] if month_name.split() else "?"
         year = datetime.now().year
     current_month = month_mapping.get(month_str, 0)
     return year, current_month
 
-async def get_available_days(date_nav, current_month):
+async def get_month_info(date_nav):
     """
-    Returns a list of tuples (day_element, day_number) for available days in the current month.
+    Extracts the current month and year from the date navigator.
     Args:
         date_nav: Playwright locator for the date navigator.
+    Returns:
+        Tuple (year, current_month) as integers.
+    """
+    snapshot = await get_calendar_snapshot(date_nav)
+    return parse_month_name(snapshot["month_name"])
+
+def get_available_days(snapshot, current_month):
+    """
+    Returns the available days of the current month from a calendar snapshot.
+    Args:
+        snapshot: Dict as returned by get_calendar_snapshot.
         current_month: Integer month to filter days.
     Returns:
-        List of tuples (day_element, day_number).
+        List of tuples (day_index, day_number), where day_index is the position of the
+        day cell among DAY_SELECTOR matches and day_number is the day as string.
     """
-    day_cells = await date_nav.locator("div.ngb-dp-day:not(.disabled) .day:not(.text-muted) .simple-day").element_handles()
     result = []
-    for day in day_cells:
-        date_of_day_element = await day.evaluate("""
-            el => {
-                while (el) {
-                    if (el.hasAttribute('aria-label')) {
-                        return el.getAttribute('aria-label');
-                    }
-                    el = el.parentElement;
-                }
-                return null;
-            }
-        """)
-        month_of_day_element = int(date_of_day_element.split("/")[1])
-        if current_month != month_of_day_element:
+    if not current_month:
+        return result
+    for day in snapshot["days"]:
+        if not day["enabled"] or not day["has_offer"] or not day["label"]:
             continue
-        has_offer = await day.evaluate(
-            "el => el.parentElement.querySelector('.available-offer-bubble') !== null"
-        )
-        if not has_offer or not current_month:
+        try:
+            month_of_day_element = int(day["label"].split("/")[1])
+        except (IndexError, ValueError):
+            continue
+        if current_month != month_of_day_element:
             continue
-        day_number = (await day.inner_text()).strip()
-        result.append((day, day_number))
+        result.append((day["index"], day["text"].strip()))
     return result
 
+def get_uncached_days(snapshot, year, current_month, cache, cached_dates):
+    """
+    Returns the available days of the current month that have to be opened. The offers of
+    the other available days are taken from the cache.
+    Args:
+        snapshot: Dict as returned by get_calendar_snapshot.
+        year: Integer year.
+        current_month: Integer month to filter days.
+        cache: ScanCache or None, in which case all available days are returned.
+        cached_dates: List the cached offers are appended to, as datetime objects.
+    Returns:
+        List of tuples (day_index, day_number) as returned by get_available_days.
+    """
+    available_days = get_available_days(snapshot, current_month)
+    if cache is None or not current_month:
+        return available_days
+    cache.update_month(year, current_month, [day_number for _, day_number in available_days])
+    uncached_days = []
+    for index, day_number in available_days:
+        times = get_cached_offer_times(cache, year, current_month, day_number)
+        if times is None:
+            uncached_days.append((index, day_number))
+        else:
+            cached_dates.extend(times)
+    return uncached_days
+
+def get_cached_offer_times(cache, year, month, day_number):
+    """
+    Args:
+        cache: ScanCache or None.
+        year: Integer year.
+        month: Integer month.
+        day_number: Day number string.
+    Returns:
+        List of datetime objects of the cached offers of the day, or None if the day has
+        to be opened.
+    """
+    if cache is None:
+        return None
+    times = cache.get_day(year, month, day_number)
+    if times is None:
+        return None
+    return [datetime(year, month, int(day_number), int(t[:2]), int(t[3:5])) for t in times]
+
 async def extract_offer_times(page, day, year, month, day_number, flag_selector):
     """
     Extracts available offer times for a given day.
     Args:
         page: Playwright page object.
-        day: Playwright element handle for the day.
+        day: Playwright locator or element handle for the day.
         year: Integer year.
         month: Integer month.
         day_number: String day number.
@@ -102,16 +446,8 @@ async def extract_offer_times(page, day, year, month, day_number, flag_selector)
     times = []
     await day.click()
     await page.locator(".sites-offers").wait_for(state="visible", timeout=5000)
-    offer_buttons = await page.locator(f"app-offer-button {flag_selector}").element_handles()
-    for offer_btn in offer_buttons:
-        time_text = await offer_btn.evaluate("""
-            el => {
-                let parent = el.closest('.cuip-button-content');
-                if (!parent) return null;
-                let timeDiv = parent.querySelector('div.d-flex.align-items-center.justify-content-center');
-                return timeDiv ? timeDiv.childNodes[0].textContent.trim() : null;
-            }
-        """)
+    time_texts = await page.locator(f"app-offer-button {flag_selector}").evaluate_all(OFFER_TIMES_SCRIPT)
+    for time_text in time_texts:
         if time_text:
             try:
                 dt = datetime(year, month, int(day_number), int(time_text[:2]), int(time_text[3:5]))
@@ -126,7 +462,29 @@ async def click_next_month(page):
     Args:
         page: Playwright page object.
     """
-    next_month_btn = page.locator("button[title='Next month']")
-    if await next_month_btn.count() > 0:
-        await next_month_btn.first.click()
-        await page.wait_for_timeout(1000)
+    with step("next_month"):
+        await change_month(page, "Next month")
+
+async def click_previous_month(page):
+    """
+    Clicks the previous month button if available.
+    Args:
+        page: Playwright page object.
+    """
+    with step("previous_month"):
+        await change_month(page, "Previous month")
+
+async def change_month(page, button_title):
+    """
+    Clicks a month navigation button and waits until the month header shows the new month.
+    Args:
+        page: Playwright page object.
+        button_title: Title of the button, "Next month" or "Previous month".
+    """
+    old_month_name = await page.evaluate(CHANGE_MONTH_SCRIPT, button_title)
+    if old_month_name is None:
+        return
+    try:
+        await wait_for_text_change(page, ".ngb-dp-month-name", old_month_name)
+    except PlaywrightTimeoutError:
+        print(f"Month header did not change after clicking '{button_title}'.")
@@ -0,0 +1,92 @@
+import json
+import threading
+import unittest
+from datetime import datetime, date
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from api_scraper import AvailabilityClient
+
+AVAILABILITY_PATH = "/api/booking/{booking_id}/sites/{site_id}/availabilities?from={start}&to={end}&token={token}"
+OFFERS_PATH = "/api/booking/{booking_id}/sites/{site_id}/offers?date={date}&token={token}"
+
+class StandInPortal(BaseHTTPRequestHandler):
+    """
+    Minimal stand-in for the booking portal: sets a session cookie on the booking page and
+    only answers API requests that carry it.
+    """
+    sessions_started = 0
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if parts.path == "/public/booking/abc":
+            StandInPortal.sessions_started += 1
+            self.send_response(200)
+            self.send_header("Set-Cookie", "SESSION=ok; Path=/")
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            self.wfile.write(b"<html></html>")
+            return
+        if "SESSION=ok" not in self.headers.get("Cookie", ""):
+            self.send_response(401)
+            self.end_headers()
+            return
+        query = parse_qs(parts.query)
+        if query.get("token") != ["secret"]:
+            self.send_response(403)
+            self.end_headers()
+            return
+        if parts.path.endswith("/availabilities"):
+            body = [
+                {"date": "2025-10-14", "offers": [{"startTime": "2025-10-14T08:30:00", "language": "de"}]},
+                {"date": "2025-10-20"},
+                {"date": "2026-03-01", "offers": [{"startTime": "2026-03-01T08:30:00", "language": "de"}]},
+            ]
+        elif parts.path.endswith("/offers"):
+            body = {"offers": [
+                {"startTime": query["date"][0] + "T13:00:00", "language": "fr"},
+                {"startTime": query["date"][0] + "T14:00:00", "language": "de"},
+            ]}
+        else:
+            self.send_response(404)
+            self.end_headers()
+            return
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+class TestAvailabilityClient(unittest.IsolatedAsyncioTestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StandInPortal)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.booking_url = f"http://127.0.0.1:{cls.server.server_port}/public/booking/abc?token=secret"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    async def test_find_test_dates(self):
+        client = AvailabilityClient(self.booking_url, AVAILABILITY_PATH, offers_path=OFFERS_PATH, horizon_days=90)
+        async with client:
+            dates = await client.find_test_dates(["de"], today=date(2025, 10, 1))
+        self.assertEqual(dates, [datetime(2025, 10, 14, 8, 30), datetime(2025, 10, 20, 14, 0)])
+
+    async def test_session_is_bootstrapped_again(self):
+        client = AvailabilityClient(self.booking_url, AVAILABILITY_PATH, horizon_days=200)
+        async with client:
+            started = StandInPortal.sessions_started
+            client.client.cookies.clear()
+            dates = await client.find_test_dates(["de"], today=date(2025, 10, 1))
+            self.assertEqual(StandInPortal.sessions_started, started + 1)
+        self.assertEqual(dates, [datetime(2025, 10, 14, 8, 30), datetime(2026, 3, 1, 8, 30)])
+
+if __name__ == "__main__":
+    unittest.main()
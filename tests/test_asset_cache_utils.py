@@ -0,0 +1,106 @@
+import configparser
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from utils.asset_cache_utils import AssetCache, get_max_age
+
+URL = "https://rendezvous.permisconduire.be/main.3f2a.js"
+
+def make_route(resource_type, url=URL, method="GET"):
+    route = MagicMock()
+    route.request.resource_type = resource_type
+    route.request.url = url
+    route.request.method = method
+    route.request.headers = {"accept": "*/*"}
+    route.fallback = AsyncMock()
+    route.fulfill = AsyncMock()
+    return route
+
+def make_response(status=200, headers=None, body=b""):
+    response = MagicMock(status=status, headers=headers or {})
+    response.body = AsyncMock(return_value=body)
+    return response
+
+class TestAssetCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = os.path.join(self.tmp.name, "assets")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_get_max_age(self):
+        self.assertEqual(get_max_age("public, max-age=31536000, immutable", 60), 31536000)
+        self.assertEqual(get_max_age(None, 60), 60)
+        self.assertEqual(get_max_age("no-cache", 60), 0)
+        self.assertIsNone(get_max_age("private, no-store", 60))
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        self.assertIsNone(AssetCache.from_config(config))
+        config.read_string(f"[ASSET_CACHE]\nENABLED = true\nDIRECTORY = {self.directory}\nMAX_SIZE_MB = 2\n"
+                           "RESOURCE_TYPES = script\n")
+        cache = AssetCache.from_config(config)
+        self.assertEqual(cache.max_size_bytes, 2 * 2**20)
+        self.assertEqual(cache.resource_types, {"script"})
+
+    async def test_miss_then_hit_in_next_run(self):
+        cache = AssetCache(self.directory)
+        route = make_route("script")
+        route.fetch = AsyncMock(return_value=make_response(
+            headers={"content-type": "text/javascript", "content-encoding": "gzip", "cache-control": "max-age=3600"},
+            body=b"console.log(1)"))
+        await cache._handle_route(route)
+        route.fulfill.assert_awaited_once()
+        self.assertNotIn("content-encoding", route.fulfill.await_args.kwargs["headers"])
+        self.assertEqual(cache.summary()["misses"], 1)
+        cache.save()
+
+        cache = AssetCache(self.directory)
+        route = make_route("script")
+        route.fetch = AsyncMock()
+        await cache._handle_route(route)
+        route.fetch.assert_not_awaited()
+        self.assertEqual(route.fulfill.await_args.kwargs["body"], b"console.log(1)")
+        summary = cache.summary()
+        self.assertEqual((summary["hits"], summary["misses"], summary["hit_rate"]), (1, 0, 1.0))
+        self.assertEqual(summary["bytes_from_disk"], 14)
+
+    async def test_expired_entry_is_revalidated(self):
+        cache = AssetCache(self.directory)
+        cache.store(URL, 200, {"ETag": '"v1"', "Cache-Control": "no-cache"}, b"body")
+        route = make_route("stylesheet")
+        route.fetch = AsyncMock(return_value=make_response(status=304))
+        await cache._handle_route(route)
+        self.assertEqual(route.fetch.await_args.kwargs["headers"]["if-none-match"], '"v1"')
+        self.assertEqual(route.fulfill.await_args.kwargs["body"], b"body")
+        self.assertEqual(cache.summary()["revalidated"], 1)
+
+    async def test_other_requests_fall_back(self):
+        cache = AssetCache(self.directory)
+        for route in (make_route("document"), make_route("xhr"), make_route("script", method="POST")):
+            await cache._handle_route(route)
+            route.fallback.assert_awaited_once()
+        self.assertIsNone(cache.summary()["hit_rate"])
+
+    def test_no_store_is_not_stored(self):
+        cache = AssetCache(self.directory)
+        self.assertFalse(cache.store(URL, 200, {"Cache-Control": "no-store"}, b"body"))
+        self.assertFalse(cache.store(URL, 404, {}, b"body"))
+        self.assertEqual(cache.entries, {})
+
+    def test_save_evicts_least_recently_used(self):
+        cache = AssetCache(self.directory, max_size_bytes=25)
+        now = time.time()
+        cache.store("https://example.com/a.js", 200, {}, b"a" * 10, now=now - 30)
+        cache.store("https://example.com/b.js", 200, {}, b"b" * 10, now=now - 20)
+        cache.store("https://example.com/c.js", 200, {}, b"c" * 10, now=now - 10)
+        cache.save()
+        self.assertEqual(sorted(cache.entries), ["https://example.com/b.js", "https://example.com/c.js"])
+        self.assertFalse(os.path.exists(cache.body_path("https://example.com/a.js")))
+        self.assertEqual(sorted(AssetCache(self.directory).entries), sorted(cache.entries))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from utils.cache_utils import ScanCache, fingerprint
+
+class TestScanCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "cache")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint(["14", "2"]), fingerprint([2, 14]))
+        self.assertNotEqual(fingerprint(["14"]), fingerprint(["14", "15"]))
+
+    def test_unchanged_month_uses_cache(self):
+        cache = ScanCache(ttl_seconds=60)
+        self.assertFalse(cache.update_month(2025, 10, ["14", "15"]))
+        self.assertIsNone(cache.get_day(2025, 10, "14", now=1000))
+        cache.put_day(2025, 10, "14", [datetime(2025, 10, 14, 8, 30)], now=1000)
+        cache.put_day(2025, 10, "15", [], now=1000)
+        self.assertTrue(cache.update_month(2025, 10, ["15", "14"]))
+        self.assertEqual(cache.get_day(2025, 10, "14", now=1030), ["08:30"])
+        self.assertEqual(cache.get_day(2025, 10, "15", now=1030), [])
+        self.assertIsNone(cache.get_day(2025, 10, "14", now=1061))
+        self.assertEqual(cache.summary(), {"days_cached": 2, "days_opened": 2})
+
+    def test_changed_bubbles_are_opened_again(self):
+        cache = ScanCache(ttl_seconds=60)
+        cache.update_month(2025, 10, ["14", "15"])
+        cache.put_day(2025, 10, "14", [datetime(2025, 10, 14, 8, 30)], now=1000)
+        cache.put_day(2025, 10, "15", [datetime(2025, 10, 15, 9, 15)], now=1000)
+        self.assertFalse(cache.update_month(2025, 10, ["15", "16"]))
+        self.assertIsNone(cache.get_day(2025, 10, "14", now=1010))
+        self.assertEqual(cache.get_day(2025, 10, "15", now=1010), ["09:15"])
+        self.assertIsNone(cache.get_day(2025, 10, "16", now=1010))
+
+    def test_save_and_load(self):
+        now = datetime(2025, 10, 1).timestamp()
+        cache = ScanCache(60, "span.flag-icon-de")
+        cache.update_month(2025, 10, ["14"])
+        cache.update_month(2025, 9, ["30"])
+        cache.put_day(2025, 10, "14", [datetime(2025, 10, 14, 8, 30)], now=now)
+        cache.put_day(2025, 10, "15", [], now=now - 120)
+        cache.save("default", self.dir, now=now)
+
+        loaded = ScanCache.load("default", 60, "span.flag-icon-de", self.dir)
+        self.assertEqual(list(loaded.months), ["2025-10"])
+        self.assertEqual(list(loaded.days), ["2025-10-14"])
+        self.assertEqual(ScanCache.load("default", 60, "span.flag-icon-fr", self.dir).days, {})
+        self.assertEqual(ScanCache.load("other", 60, "span.flag-icon-de", self.dir).days, {})
+
+if __name__ == "__main__":
+    unittest.main()
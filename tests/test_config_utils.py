@@ -1,13 +1,38 @@
+import configparser
 import unittest
-from utils.config_utils import load_config
+from unittest.mock import patch
+from utils.config_utils import load_config, load_targets, Target
 
 class TestConfigUtils(unittest.TestCase):
     def test_load_config(self):
-        config = load_config()
+        # config.ini holds the user's secrets and is not in the repository
+        with patch("utils.config_utils.CONFIG_PATH", "config.ini.sample"):
+            config = load_config()
         self.assertIn("DEFAULT", config)
         self.assertIn("TELEGRAM", config)
         self.assertTrue(config["DEFAULT"].get("URL"))
         self.assertTrue(config["TELEGRAM"].get("ENABLED"))
 
+    def test_load_targets_default(self):
+        config = configparser.ConfigParser()
+        config.read_string("[DEFAULT]\nURL = https://example.com/public/booking/1?token=a\n")
+        self.assertEqual(load_targets(config), [
+            Target("default", "https://example.com/public/booking/1?token=a", "4731", "Führerscheinzentrum Eupen (1029)", "1029"),
+        ])
+
+    def test_load_targets_sections(self):
+        config = configparser.ConfigParser()
+        config.read_string(
+            "[DEFAULT]\nURL = https://example.com/public/booking/1?token=a\n"
+            "[TARGET anna]\n"
+            "[TARGET ben]\nURL = https://example.com/public/booking/2?token=b\n"
+            "POSTAL_CODE = 4700\nCENTER = Führerscheinzentrum Kelmis (1031)\n"
+        )
+        targets = load_targets(config)
+        self.assertEqual([t.name for t in targets], ["anna", "ben"])
+        self.assertEqual(targets[0].url, "https://example.com/public/booking/1?token=a")
+        self.assertEqual(targets[1].postal_code, "4700")
+        self.assertEqual(targets[1].site_id, "1031")
+
 if __name__ == "__main__":
     unittest.main()
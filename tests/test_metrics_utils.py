@@ -0,0 +1,94 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from utils.metrics_utils import ScanMetrics, step, add_bytes, current_metrics, install_call_counter, write_json, write_prometheus, escape_label_value
+
+class TestMetricsUtils(unittest.IsolatedAsyncioTestCase):
+    async def test_steps_are_recorded_per_task(self):
+        async def scan(name):
+            metrics = ScanMetrics(name).activate()
+            with step("month"):
+                await asyncio.sleep(0.01)
+            with step("month"):
+                pass
+            add_bytes(received=100, sent=10)
+            metrics.calls["evaluateExpression"] += 2
+            metrics.calls["click"] += 1
+            await metrics.finish()
+            return metrics.summary()
+
+        first, second = await asyncio.gather(scan("anna"), scan("ben"))
+        self.assertIsNone(current_metrics.get())
+        self.assertEqual(first["name"], "anna")
+        self.assertEqual(second["name"], "ben")
+        self.assertEqual(first["steps"]["month"]["count"], 2)
+        self.assertGreaterEqual(first["steps"]["month"]["seconds"], 0.01)
+        self.assertEqual(first["playwright_calls"], 3)
+        self.assertEqual(first["evaluations"], 2)
+        self.assertEqual(first["bytes_received"], 100)
+        self.assertEqual(first["requests"], 1)
+
+    async def test_finish_detaches_from_context(self):
+        context = MagicMock()
+        metrics = ScanMetrics("anna")
+        metrics.attach(context)
+        callback = context.on.call_args.args[1]
+        await metrics.finish()
+        context.remove_listener.assert_called_once_with("requestfinished", callback)
+        metrics.detach()
+        context.remove_listener.assert_called_once()
+
+    def test_step_without_metrics(self):
+        with step("noop"):
+            pass
+        add_bytes(received=1)
+
+    def test_install_call_counter_is_idempotent(self):
+        from playwright._impl._connection import Connection
+        with patch.object(Connection, "_send_message_to_server", Connection._send_message_to_server):
+            install_call_counter()
+            wrapped = Connection._send_message_to_server
+            install_call_counter()
+            self.assertIs(Connection._send_message_to_server, wrapped)
+
+    def test_call_counter_checks_signature(self):
+        from playwright._impl._connection import Connection
+
+        def send(self, message):
+            pass
+
+        with patch.object(Connection, "_send_message_to_server", send), patch("builtins.print") as mock_print:
+            self.assertFalse(install_call_counter())
+            self.assertFalse(install_call_counter())
+            self.assertIs(Connection._send_message_to_server, send)
+        mock_print.assert_called_once()
+
+    def test_prometheus_labels_are_escaped(self):
+        self.assertEqual(escape_label_value('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+        metrics = ScanMetrics('Anna "A" \\ B')
+        metrics.add_step("goto", 1.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            prom_path = os.path.join(tmp, "autosecurite.prom")
+            write_prometheus([metrics.summary()], prom_path)
+            with open(prom_path) as f:
+                self.assertIn('autosecurite_scan_step_count{target="Anna \\"A\\" \\\\ B",step="goto"} 1', f.read())
+
+    def test_write_outputs(self):
+        metrics = ScanMetrics("default")
+        metrics.add_step("goto", 1.5)
+        summaries = [metrics.summary()]
+        with tempfile.TemporaryDirectory() as tmp:
+            json_path = os.path.join(tmp, "scan_metrics.json")
+            prom_path = os.path.join(tmp, "autosecurite.prom")
+            write_json(summaries, json_path)
+            write_prometheus(summaries, prom_path)
+            with open(json_path) as f:
+                self.assertEqual(json.load(f)["scans"][0]["steps"]["goto"]["seconds"], 1.5)
+            with open(prom_path) as f:
+                self.assertIn('autosecurite_scan_step_seconds{target="default",step="goto"} 1.5', f.read())
+
+if __name__ == "__main__":
+    unittest.main()
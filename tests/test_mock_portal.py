@@ -0,0 +1,75 @@
+import json
+import unittest
+import urllib.error
+import urllib.request
+from datetime import date
+from benchmarks.mock_portal import MockPortal, generate_offers
+from api_scraper import AvailabilityClient
+
+class TestGenerateOffers(unittest.TestCase):
+    def test_calendar_size(self):
+        offers = generate_offers(date(2025, 10, 1), 12, 10, 4)
+        self.assertEqual(len(offers), 120)
+        self.assertTrue(all(len(times) == 4 for times in offers.values()))
+        self.assertTrue(all(day.weekday() < 5 for day in offers))
+        self.assertEqual(min(offers).month, 10)
+        self.assertEqual(max(offers), max(d for d in offers if d.year == 2026 and d.month == 9))
+
+    def test_deterministic(self):
+        self.assertEqual(generate_offers(date(2025, 10, 1), 3, 5, 2, seed=7), generate_offers(date(2025, 10, 1), 3, 5, 2, seed=7))
+
+    def test_empty(self):
+        self.assertEqual(generate_offers(date(2025, 10, 1), 3, 0, 0), {})
+
+class TestMockPortal(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.portal = MockPortal(months=3, days_per_month=4, slots_per_day=3, start=date(2025, 10, 1)).start_server()
+
+    def tearDown(self):
+        self.portal.stop_server()
+
+    def test_booking_page_starts_session(self):
+        with urllib.request.urlopen(self.portal.booking_url) as response:
+            self.assertIn("SESSION=", response.headers["Set-Cookie"])
+            page = response.read().decode()
+        self.assertIn('"bookingId": "benchmark"', page)
+        self.assertIn("/assets/main.js", page)
+
+    def test_api_requires_session(self):
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(f"{self.portal.base_url}/api/public/sites?query=4731&token=secret")
+        self.assertEqual(cm.exception.code, 401)
+
+    def test_site_search(self):
+        request = urllib.request.Request(f"{self.portal.base_url}/api/public/sites?query=4731&token=secret",
+                                         headers={"Cookie": "SESSION=1"})
+        with urllib.request.urlopen(request) as response:
+            names = [site["name"] for site in json.load(response)]
+        self.assertEqual(names[0], self.portal.center)
+
+    def test_reschedule(self):
+        slot = self.portal.expected_dates()[0]
+
+        def post(start_time):
+            request = urllib.request.Request(
+                f"{self.portal.base_url}/api/public/booking/benchmark/reschedule?token=secret",
+                data=json.dumps({"startTime": start_time.isoformat()}).encode(),
+                headers={"Cookie": "SESSION=1", "Content-Type": "application/json"})
+            with urllib.request.urlopen(request) as response:
+                return json.load(response)
+
+        self.assertEqual(post(slot), {"offer": {"startTime": slot.isoformat()}})
+        self.assertEqual(self.portal.scheduled_date, slot)
+        self.assertNotIn(slot, self.portal.expected_dates())
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            post(slot)
+        self.assertEqual(cm.exception.code, 409)
+
+    async def test_availability_client(self):
+        async with AvailabilityClient(self.portal.booking_url, horizon_days=92) as client:
+            dates = await client.find_test_dates(["de"], today=date(2025, 10, 1))
+        self.assertEqual(dates, self.portal.expected_dates(["de"]))
+        self.assertTrue(dates)
+
+if __name__ == "__main__":
+    unittest.main()
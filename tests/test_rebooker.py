@@ -0,0 +1,99 @@
+import asyncio
+import configparser
+import unittest
+from datetime import date, datetime, time
+from unittest.mock import AsyncMock, MagicMock
+from playwright.async_api import async_playwright
+from benchmarks.mock_portal import MockPortal
+from rebooker import Rebooker, parse_weekdays, BOOKED, DRY_RUN
+from scrape import open_calendar_page
+from utils.config_utils import Target
+
+class TestRebooker(unittest.TestCase):
+    def setUp(self):
+        self.scheduled = datetime(2025, 12, 15, 7, 30)
+        self.now = datetime(2025, 10, 1, 12, 0)
+
+    def test_parse_weekdays(self):
+        self.assertEqual(parse_weekdays("mon, Tuesday,fri"), {0, 1, 4})
+        self.assertEqual(parse_weekdays(""), set(range(7)))
+        with self.assertRaises(ValueError):
+            parse_weekdays("someday")
+
+    def test_only_earlier_slots(self):
+        rebooker = Rebooker(["de"])
+        self.assertTrue(rebooker.accepts(datetime(2025, 11, 3, 9, 0), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(self.scheduled, self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 11, 3, 9, 0), None, self.now))
+
+    def test_filters(self):
+        rebooker = Rebooker(["de"], weekdays={0, 1}, earliest_time=time(8, 0), latest_time=time(12, 0),
+                            latest_date=date(2025, 11, 30), min_notice_hours=48)
+        self.assertTrue(rebooker.accepts(datetime(2025, 11, 3, 9, 0), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 11, 5, 9, 0), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 11, 3, 7, 30), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 11, 3, 12, 15), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 12, 1, 9, 0), self.scheduled, self.now))
+        self.assertFalse(rebooker.accepts(datetime(2025, 10, 2, 9, 0), self.scheduled, self.now))
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict({
+            "DEFAULT": {"DATE_LANGUAGES": "de,fr"},
+            "REBOOK": {"ENABLED": "true", "WEEKDAYS": "sat", "LATEST_TIME": "10:00", "LATEST_DATE": "2025-11-30",
+                       "DRY_RUN": "true"},
+        })
+        rebooker = Rebooker.from_config(config)
+        self.assertEqual(rebooker.flag_selector, "span.flag-icon-de, span.flag-icon-fr")
+        self.assertEqual(rebooker.weekdays, {5})
+        self.assertEqual(rebooker.latest_time, time(10, 0))
+        self.assertEqual(rebooker.latest_date, date(2025, 11, 30))
+        self.assertTrue(rebooker.dry_run)
+        config["REBOOK"]["ENABLED"] = "false"
+        self.assertIsNone(Rebooker.from_config(config))
+
+    def test_offer_shown(self):
+        rebooker = Rebooker(["fr"])
+        page = MagicMock()
+        page.evaluate = AsyncMock(side_effect=["found", "missing", None, False])
+        slot = datetime(2025, 11, 3, 9, 0)
+        self.assertEqual([asyncio.run(rebooker.offer_shown(page, slot)) for _ in range(4)], [True, False, None, None])
+        self.assertEqual(page.evaluate.await_args.args[1], ["09:00", "span.flag-icon-fr", False])
+
+class TestRebookerOnMockPortal(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.portal = MockPortal(months=2, days_per_month=3, slots_per_day=2, languages=("de",)).start_server()
+        self.playwright = await async_playwright().start()
+        try:
+            self.browser = await self.playwright.chromium.launch()
+        except Exception as e:
+            await self.playwright.stop()
+            self.portal.stop_server()
+            self.skipTest(f"Chromium is not available: {e}")
+
+    async def asyncTearDown(self):
+        await self.browser.close()
+        await self.playwright.stop()
+        self.portal.stop_server()
+
+    async def book(self, dry_run=False):
+        page = await self.browser.new_page()
+        target = Target("default", self.portal.booking_url, self.portal.postal_code, self.portal.center, self.portal.site_id)
+        await open_calendar_page(page, target)
+        slot = self.portal.expected_dates()[0]
+        return slot, await Rebooker(["de"], dry_run=dry_run).book(page, slot)
+
+    async def test_books_slot(self):
+        slot, (outcome, detail) = await self.book()
+        self.assertEqual(outcome, BOOKED, detail)
+        self.assertEqual(self.portal.scheduled_date, slot)
+        self.assertNotIn(slot, self.portal.expected_dates())
+
+    async def test_dry_run_does_not_confirm(self):
+        scheduled = self.portal.scheduled_date
+        _, (outcome, _) = await self.book(dry_run=True)
+        self.assertEqual(outcome, DRY_RUN)
+        self.assertEqual(self.portal.scheduled_date, scheduled)
+
+if __name__ == "__main__":
+    unittest.main()
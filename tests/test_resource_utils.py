@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from utils.resource_utils import get_child_pids, get_rss_bytes, kill_processes, ResourceMonitor, OverlapLock
+
+@unittest.skipUnless(os.path.isdir("/proc"), "needs /proc")
+class TestProcesses(unittest.TestCase):
+    def setUp(self):
+        self.child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+
+    def tearDown(self):
+        if self.child.poll() is None:
+            self.child.kill()
+            self.child.wait()
+
+    def test_child_pids_and_rss(self):
+        self.assertIn(self.child.pid, get_child_pids(os.getpid()))
+        self.assertGreater(get_rss_bytes([os.getpid()]), 0)
+
+    def test_kill_processes_reaps(self):
+        self.assertEqual(kill_processes([self.child.pid]), [self.child.pid])
+        with self.assertRaises(ProcessLookupError):
+            os.kill(self.child.pid, 0)
+
+    @patch("utils.resource_utils.become_subreaper")
+    def test_monitor_kills_browser_after_budget(self, mock_subreaper):
+        with patch("utils.resource_utils.find_browser_pids", return_value=[self.child.pid]):
+            with ResourceMonitor(budget_seconds=0.1, sample_seconds=0.05, grace_seconds=0) as monitor:
+                time.sleep(0.5)
+        self.assertEqual(monitor.killed, [self.child.pid])
+        self.assertGreater(monitor.peak_rss_bytes, 0)
+
+    def test_monitor_without_budget_kills_nothing(self):
+        with ResourceMonitor(sample_seconds=0.05) as monitor:
+            time.sleep(0.2)
+        self.assertEqual(monitor.killed, [])
+        self.assertIsNone(self.child.poll())
+
+class TestOverlapLock(unittest.TestCase):
+    def test_second_lock_fails(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "scrape.lock")
+            first, second = OverlapLock(path), OverlapLock(path)
+            self.assertTrue(first.acquire())
+            self.assertFalse(second.acquire())
+            first.release()
+            self.assertTrue(second.acquire())
+            second.release()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from datetime import datetime, date
+from utils.response_utils import parse_portal_datetime, extract_slots, extract_booked_date, SlotResponseCollector
+
+class TestResponseUtils(unittest.TestCase):
+    def test_parse_portal_datetime(self):
+        self.assertEqual(parse_portal_datetime("2025-10-14T08:30:00"), datetime(2025, 10, 14, 8, 30))
+        self.assertEqual(parse_portal_datetime("2025-10-14T06:30:00Z"), datetime(2025, 10, 14, 8, 30))
+        self.assertEqual(parse_portal_datetime("2025-10-14"), date(2025, 10, 14))
+        self.assertIsNone(parse_portal_datetime("08:30"))
+        self.assertIsNone(parse_portal_datetime(42))
+
+    def test_extract_slots(self):
+        payload = {
+            "siteId": 1029,
+            "days": [
+                {"date": "2025-10-14", "offers": [
+                    {"startTime": "2025-10-14T08:30:00", "language": "DE"},
+                    {"startTime": "2025-10-14T09:15:00", "languages": ["fr"]},
+                ]},
+                {"date": "2025-10-15", "offers": [{"date": "2025-10-15", "time": "13:00"}]},
+                {"date": "2025-10-20"},
+            ],
+        }
+        slots, days = extract_slots(payload, ["de"])
+        self.assertEqual(slots, {datetime(2025, 10, 14, 8, 30), datetime(2025, 10, 15, 13, 0)})
+        self.assertEqual(days, {date(2025, 10, 14), date(2025, 10, 15), date(2025, 10, 20)})
+
+    def test_booking_appointment_is_not_a_slot(self):
+        booking = {
+            "id": "b-1",
+            "status": "CONFIRMED",
+            "offer": {"startTime": "2025-11-19T07:30:00", "language": "de"},
+            "site": {"id": 1029, "openingHours": [{"startTime": "2025-10-14T08:00:00"}]},
+        }
+        self.assertEqual(extract_slots(booking, ["de"]), (set(), set()))
+        self.assertEqual(extract_booked_date(booking), datetime(2025, 11, 19, 7, 30))
+        self.assertEqual(extract_booked_date({"offer": {"startTime": "2025-11-19T07:30:00"}}), datetime(2025, 11, 19, 7, 30))
+        wrapped = {
+            "booking": {"offers": [{"startTime": "2025-11-19T07:30:00"}]},
+            "availabilities": [{"startTime": "2025-10-14T08:30:00"}],
+        }
+        self.assertEqual(extract_slots(wrapped)[0], {datetime(2025, 10, 14, 8, 30)})
+
+    def test_collector_merges_payloads(self):
+        collector = SlotResponseCollector("availabilit")
+        collector.payloads = [
+            [{"startTime": "2025-10-14T08:30:00"}],
+            [{"startTime": "2025-11-03T10:00:00"}],
+        ]
+        slots, days = collector.slots()
+        self.assertEqual(slots, {datetime(2025, 10, 14, 8, 30), datetime(2025, 11, 3, 10, 0)})
+        self.assertEqual(days, set())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import configparser
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from utils.route_utils import ResourceBlocker, split_list
+
+def make_route(resource_type, url):
+    route = MagicMock()
+    route.request.resource_type = resource_type
+    route.request.url = url
+    route.abort = AsyncMock()
+    route.fallback = AsyncMock()
+    return route
+
+class TestRouteUtils(unittest.IsolatedAsyncioTestCase):
+    def test_should_block_defaults(self):
+        blocker = ResourceBlocker()
+        self.assertTrue(blocker.should_block("image", "https://rendezvous.permisconduire.be/assets/logo.png"))
+        self.assertTrue(blocker.should_block("script", "https://www.googletagmanager.com/gtag/js"))
+        self.assertFalse(blocker.should_block("script", "https://rendezvous.permisconduire.be/main.js"))
+        self.assertFalse(blocker.should_block("stylesheet", "https://rendezvous.permisconduire.be/styles.css"))
+        self.assertFalse(blocker.should_block("xhr", "https://rendezvous.permisconduire.be/api/availabilities"))
+
+    def test_allow_patterns_win(self):
+        blocker = ResourceBlocker(["image"], [], [r"/assets/flags/"])
+        self.assertFalse(blocker.should_block("image", "https://example.com/assets/flags/de.svg"))
+        self.assertTrue(blocker.should_block("image", "https://example.com/assets/logo.png"))
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        self.assertIsNone(ResourceBlocker.from_config(config))
+        config.read_string("[BLOCKING]\nENABLED = true\nRESOURCE_TYPES = image, media\nALLOW_PATTERNS = flags\n")
+        blocker = ResourceBlocker.from_config(config)
+        self.assertEqual(blocker.blocked_types, {"image", "media"})
+        self.assertTrue(blocker.blocked_patterns)
+        self.assertEqual(split_list(" a, ,b "), ["a", "b"])
+
+    async def test_handle_route_counts(self):
+        blocker = ResourceBlocker()
+        blocked = make_route("font", "https://example.com/font.woff2")
+        allowed = make_route("document", "https://example.com/")
+        await blocker._handle_route(blocked)
+        await blocker._handle_route(allowed)
+        blocked.abort.assert_awaited_once_with("blockedbyclient")
+        allowed.fallback.assert_awaited_once()
+        request = MagicMock(resource_type="document")
+        request.sizes = AsyncMock(return_value={"responseBodySize": 1000, "responseHeadersSize": 24})
+        blocker._on_request_finished(request)
+        summary = await blocker.summary()
+        self.assertEqual(summary["requests_blocked"], 1)
+        self.assertEqual(summary["requests_allowed"], 1)
+        self.assertEqual(summary["bytes_allowed"], 1024)
+        self.assertEqual(summary["blocked_by_type"], {"font": 1})
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import configparser
+import json
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from utils.schedule_utils import AdaptiveScheduler
+from utils.storage_utils import record_scan, get_churn_stats
+
+# Monday, 8 o'clock
+NOW = datetime(2025, 10, 13, 8, 20)
+
+class TestAdaptiveScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = AdaptiveScheduler(300, min_interval=60, max_interval=1800)
+
+    def test_base_interval_without_history(self):
+        decision = self.scheduler.interval_for({(0, 8): (2, 5, None)}, NOW)
+        self.assertEqual(decision.interval, 300)
+        self.assertEqual(decision.reason, "not enough history")
+
+    def test_quiet_hour(self):
+        self.assertEqual(self.scheduler.interval_for({(0, 8): (4, 0, None)}, NOW).interval, 1800)
+
+    def test_busy_hour(self):
+        # 2 slots per hour, checked so that half a slot appears between two checks
+        self.assertEqual(self.scheduler.interval_for({(0, 8): (4, 8, None)}, NOW).interval, 900)
+        # Slots lasting 10 minutes are checked every 5 minutes
+        self.assertEqual(self.scheduler.interval_for({(0, 8): (4, 8, 600)}, NOW).interval, 300)
+
+    def test_floor(self):
+        decision = self.scheduler.interval_for({(0, 8): (4, 400, 30)}, NOW, new_slots=3)
+        self.assertEqual(decision.interval, 60)
+
+    def test_burst(self):
+        self.assertEqual(self.scheduler.interval_for({(0, 8): (4, 8, None)}, NOW, new_slots=1).interval, 450)
+
+    def test_falls_back_to_same_hour_of_other_days(self):
+        stats = {(0, 8): (1, 0, None), (1, 8): (2, 4, None), (2, 8): (1, 0, None), (1, 9): (5, 50, None)}
+        decision = self.scheduler.interval_for(stats, NOW)
+        self.assertEqual(decision.interval, 1800)
+        self.assertIn("all days 08h", decision.reason)
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        config.read_dict({"DAEMON": {"ADAPTIVE": "false"}})
+        self.assertIsNone(AdaptiveScheduler.from_config(config, 300, 60))
+        config["DAEMON"]["ADAPTIVE"] = "true"
+        config["DAEMON"]["MIN_INTERVAL_SECONDS"] = "120"
+        scheduler = AdaptiveScheduler.from_config(config, 300, 60)
+        self.assertEqual((scheduler.min_interval, scheduler.jitter, scheduler.log_path), (120, 60, None))
+
+class TestSchedulerHistory(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "availability.db")
+        self.log_path = os.path.join(self.tmp.name, "decisions.jsonl")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record_mondays(self):
+        # Every Monday at 8, a slot appears at 8:05 and is taken at 8:15
+        slot = datetime(2026, 1, 5, 9, 0)
+        for week in range(4):
+            day = NOW.replace(hour=8, minute=0) - timedelta(weeks=4 - week)
+            record_scan([], now=day, path=self.db_path)
+            record_scan([slot + timedelta(weeks=week)], now=day + timedelta(minutes=5), path=self.db_path)
+            record_scan([], now=day + timedelta(minutes=15), path=self.db_path)
+
+    def test_churn_stats(self):
+        self.record_mondays()
+        days, appeared, lifetime = get_churn_stats(NOW - timedelta(days=35), self.db_path)[(0, 8)]
+        self.assertEqual((days, appeared), (4, 4))
+        self.assertAlmostEqual(lifetime, 600, delta=1)
+
+    def test_decide_logs_decision(self):
+        self.record_mondays()
+        scheduler = AdaptiveScheduler(300, min_interval=60, jitter=10, db_path=self.db_path, log_path=self.log_path,
+                                      rng=random.Random(0))
+        decision = scheduler.decide(NOW)
+        self.assertAlmostEqual(decision.interval, 300, places=3)
+        self.assertTrue(decision.interval <= decision.delay <= decision.interval + 10)
+        with open(self.log_path) as f:
+            entry = json.loads(f.readline())
+        self.assertEqual(entry["interval"], decision.interval)
+        self.assertEqual(entry["expected_latency_seconds"], round(decision.delay / 2, 1))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,297 @@
+import asyncio
+import configparser
+import os
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from unittest.mock import patch, AsyncMock, MagicMock
+from collections import Counter
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from scrape import OTHER_AVAILABILITY_SELECTOR, parse_args, build_flag_selector, get_scan_budget, run_api_daemon, return_to_calendar, run_limited, open_site_calendar, reach_calendar, stream_calendar
+from utils.storage_utils import record_scan, get_rebookings
+from rebooker import Rebooker, BOOKED, OFFER_NOT_FOUND
+from utils.config_utils import Target
+
+class TestScrape(unittest.TestCase):
+    def test_parse_args(self):
+        self.assertFalse(parse_args([]).daemon)
+        self.assertTrue(parse_args(["--daemon"]).daemon)
+        self.assertTrue(parse_args(["--serve"]).serve)
+
+    def test_build_flag_selector(self):
+        self.assertEqual(build_flag_selector(["de", "fr"]), "span.flag-icon-de, span.flag-icon-fr")
+        self.assertEqual(build_flag_selector(["fr"]), "span.flag-icon-fr")
+
+    def test_scan_budget(self):
+        config = configparser.ConfigParser()
+        config.read_dict({"RESOURCES": {"LOW_MEMORY": "false", "SCAN_TIMEOUT_SECONDS": ""}})
+        self.assertIsNone(get_scan_budget(config))
+        config["RESOURCES"]["LOW_MEMORY"] = "true"
+        self.assertEqual(get_scan_budget(config), 300)
+        config["RESOURCES"]["SCAN_TIMEOUT_SECONDS"] = "120"
+        self.assertEqual(get_scan_budget(config), 120)
+
+class TestRunApiDaemon(unittest.IsolatedAsyncioTestCase):
+    @patch("scrape.asyncio.sleep", new_callable=AsyncMock)
+    @patch("scrape.run_api_checks", new_callable=AsyncMock)
+    async def test_keeps_checking_on_the_interval(self, mock_checks, mock_sleep):
+        config = configparser.ConfigParser()
+        config.read_dict({"DAEMON": {"INTERVAL_SECONDS": "120", "JITTER_SECONDS": "0"}})
+        mock_checks.side_effect = [ValueError("portal down"), None]
+        mock_sleep.side_effect = [None, asyncio.CancelledError()]
+        with patch("builtins.print"), self.assertRaises(asyncio.CancelledError):
+            await run_api_daemon(config, [], ["de"], True)
+        self.assertEqual(mock_checks.await_count, 2)
+        self.assertEqual([c.args[0] for c in mock_sleep.await_args_list], [120, 120])
+
+class TestReturnToCalendar(unittest.IsolatedAsyncioTestCase):
+    @patch("scrape.click_previous_month", new_callable=AsyncMock)
+    @patch("scrape.get_month_info", new_callable=AsyncMock)
+    async def test_goes_back_to_current_month(self, mock_month_info, mock_previous):
+        today = datetime.now()
+        mock_month_info.side_effect = [(today.year + 1, 1), (today.year, 12), (today.year, today.month)]
+        page = MagicMock()
+        page.locator.return_value.wait_for = AsyncMock()
+        self.assertTrue(await return_to_calendar(page))
+        self.assertEqual(mock_previous.await_count, 2 if today.month < 12 else 1)
+
+    async def test_calendar_gone(self):
+        page = MagicMock()
+        page.locator.return_value.wait_for = AsyncMock(side_effect=TimeoutError("timeout"))
+        self.assertFalse(await return_to_calendar(page))
+
+class TimedPage:
+    """
+    Booking flow whose clicked elements only go away a while after the click, like during
+    an Angular route change.
+    """
+    def __init__(self, visible, transitions, delay=0.1):
+        self.visible = set(visible)
+        self.transitions = transitions
+        self.delay = delay
+        self.clicks = Counter()
+
+    def locator(self, selector):
+        return TimedLocator(self, [selector])
+
+    def click(self, selector):
+        self.clicks[selector] += 1
+        asyncio.get_running_loop().call_later(self.delay, self.advance, selector)
+
+    def advance(self, selector):
+        self.visible.discard(selector)
+        self.visible.add(self.transitions[selector])
+
+class TimedLocator:
+    def __init__(self, page, selectors):
+        self.page = page
+        self.selectors = selectors
+
+    @property
+    def first(self):
+        return self
+
+    def or_(self, other):
+        return TimedLocator(self.page, self.selectors + other.selectors)
+
+    async def is_visible(self):
+        return any(selector in self.page.visible for selector in self.selectors)
+
+    async def wait_for(self, state="visible", timeout=5000):
+        deadline = asyncio.get_running_loop().time() + timeout / 1000
+        while await self.is_visible() != (state == "visible"):
+            if asyncio.get_running_loop().time() > deadline:
+                raise PlaywrightTimeoutError("timeout")
+            await asyncio.sleep(0.01)
+
+    async def click(self):
+        self.page.click(self.selectors[0])
+
+class TestOpenSiteCalendar(unittest.IsolatedAsyncioTestCase):
+    def make_page(self):
+        page = MagicMock()
+        locator = page.locator.return_value
+        locator.click = AsyncMock()
+        locator.count = AsyncMock(return_value=1)
+        locator.first.click = AsyncMock()
+        locator.first.fill = AsyncMock()
+        locator.locator.return_value.count = AsyncMock(return_value=1)
+        locator.locator.return_value.first.click = AsyncMock()
+        return page
+
+    @patch("scrape.wait_for_state_to_pass", new_callable=AsyncMock, return_value=True)
+    @patch("scrape.wait_for_any", new_callable=AsyncMock)
+    async def test_handles_states_until_calendar(self, mock_wait, mock_pass):
+        mock_wait.side_effect = ["change_reservation", "change_appointment", "other_availability",
+                                 "site_input", "site_option", "calendar"]
+        page = self.make_page()
+        await open_site_calendar(page, "4700", "Führerscheinzentrum Eupen (1029)")
+        self.assertEqual(mock_wait.await_count, 6)
+        page.locator.return_value.first.fill.assert_awaited_once_with("4700")
+        page.locator.assert_any_call("div.ng-option .site-text:text('Führerscheinzentrum Eupen (1029)')")
+
+    @patch("scrape.wait_for_state_to_pass", new_callable=AsyncMock, return_value=True)
+    @patch("scrape.wait_for_any", new_callable=AsyncMock)
+    async def test_skipped_steps_cost_nothing(self, mock_wait, mock_pass):
+        mock_wait.side_effect = ["site_input", "site_option", "calendar"]
+        page = self.make_page()
+        await open_site_calendar(page)
+        self.assertEqual(mock_wait.await_count, 3)
+        page.locator.return_value.first.fill.assert_awaited_once_with("4731")
+
+    @patch("scrape.wait_for_state_to_pass", new_callable=AsyncMock, return_value=True)
+    @patch("scrape.wait_for_any", new_callable=AsyncMock)
+    async def test_gives_up_on_repeated_step(self, mock_wait, mock_pass):
+        mock_wait.return_value = "other_availability"
+        page = self.make_page()
+        await open_site_calendar(page)
+        self.assertEqual(mock_wait.await_count, 3)
+        self.assertEqual(page.locator.return_value.click.await_count, 2)
+
+    async def test_waits_for_clicked_step_to_go_away(self):
+        page = TimedPage({OTHER_AVAILABILITY_SELECTOR}, {OTHER_AVAILABILITY_SELECTOR: "app-date-navigator"})
+        await open_site_calendar(page)
+        self.assertEqual(page.clicks[OTHER_AVAILABILITY_SELECTOR], 1)
+        self.assertIn("app-date-navigator", page.visible)
+
+class TestReachCalendar(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.target = Target("default", "https://example.com/public/booking/1?token=a", "4731",
+                             "Führerscheinzentrum Eupen (1029)", "1029")
+        self.config = configparser.ConfigParser()
+        self.config.read_string("[SESSION]\nENABLED = true\n")
+        self.saved_session = {"calendar_url": "https://example.com/calendar", "storage_state": {},
+                              "scheduled_date": datetime(2025, 11, 19, 7, 30)}
+
+    @patch("scrape.open_calendar_page", new_callable=AsyncMock)
+    @patch("scrape.open_calendar_shortcut", new_callable=AsyncMock, return_value=True)
+    async def test_shortcut(self, mock_shortcut, mock_full_flow):
+        scheduled_date = await reach_calendar(MagicMock(), self.config, self.target, MagicMock(), self.saved_session)
+        self.assertEqual(scheduled_date, datetime(2025, 11, 19, 7, 30))
+        mock_shortcut.assert_awaited_once()
+        mock_full_flow.assert_not_awaited()
+
+    @patch("scrape.clear_session")
+    @patch("scrape.save_session")
+    @patch("scrape.open_calendar_page", new_callable=AsyncMock, return_value=datetime(2025, 12, 1, 8, 0))
+    @patch("scrape.open_calendar_shortcut", new_callable=AsyncMock, return_value=False)
+    async def test_fallback_saves_new_session(self, mock_shortcut, mock_full_flow, mock_save, mock_clear):
+        page = MagicMock()
+        page.url = "https://example.com/calendar2"
+        page.locator.return_value.is_visible = AsyncMock(return_value=True)
+        context = MagicMock()
+        context.storage_state = AsyncMock(return_value={"cookies": []})
+        scheduled_date = await reach_calendar(page, self.config, self.target, context, self.saved_session)
+        self.assertEqual(scheduled_date, datetime(2025, 12, 1, 8, 0))
+        mock_clear.assert_called_once()
+        mock_save.assert_called_once_with("default", self.target.url, "https://example.com/calendar2",
+                                          {"cookies": []}, datetime(2025, 12, 1, 8, 0), None)
+
+class TestStreamCalendar(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = configparser.ConfigParser()
+        self.config.read_dict({
+            "STORAGE": {"DB_PATH": os.path.join(self.tmp.name, "availability.db")},
+            "TELEGRAM": {"ENABLED": "true", "NOTIFY_ONLY_IF_EARLIER": "true"},
+        })
+        self.target = Target("default", "https://example.com/public/booking/1?token=a", "4731", "Eupen", "1029")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch("scrape.iter_test_dates")
+    async def test_alerts_new_earlier_dates_while_scanning(self, mock_iter):
+        record_scan([datetime(2025, 10, 14, 8, 0)], path=self.config["STORAGE"]["DB_PATH"])
+        found = [datetime(2025, 10, 14, 8, 0), datetime(2025, 10, 20, 9, 0), datetime(2025, 11, 19, 9, 0)]
+
+        async def iter_dates(page, flag_selector, cache=None, stop_after=None):
+            for dt in found:
+                yield dt
+        mock_iter.side_effect = iter_dates
+        notifier = MagicMock()
+        notifier.notify = AsyncMock()
+
+        dates, scanned_until, booked_slot = await stream_calendar(MagicMock(), self.config, self.target, ["de"],
+                                                     datetime(2025, 11, 19, 7, 30), notifier)
+
+        self.assertEqual(dates, found)
+        self.assertEqual(scanned_until, datetime(2025, 11, 20))
+        self.assertIsNone(booked_slot)
+        self.assertEqual(mock_iter.call_args.kwargs["stop_after"], datetime(2025, 11, 19, 7, 30))
+        notifier.notify.assert_awaited_once()
+        self.assertIn("20.10.2025 09:00", notifier.notify.await_args.args[0])
+
+    @patch("scrape.iter_test_dates")
+    async def test_books_first_accepted_slot(self, mock_iter):
+        day = datetime.combine(date.today() + timedelta(days=30), time.min)
+        found = [day.replace(hour=8), day.replace(hour=9), day.replace(hour=9, minute=45)]
+        scheduled = day + timedelta(days=30)
+
+        async def iter_dates(page, flag_selector, cache=None, stop_after=None):
+            for dt in found:
+                yield dt
+        mock_iter.side_effect = iter_dates
+        rebooker = Rebooker(["de"], earliest_time=time(9, 0))
+        rebooker.offer_shown = AsyncMock(return_value=True)
+        rebooker.book = AsyncMock(return_value=(BOOKED, None))
+
+        dates, scanned_until, booked_slot = await stream_calendar(MagicMock(), self.config, self.target, ["de"],
+                                                                  scheduled, rebooker=rebooker)
+
+        self.assertEqual(dates, found[:2])
+        self.assertEqual(booked_slot, found[1])
+        self.assertEqual(scanned_until, day)
+        attempts = get_rebookings(path=self.config["STORAGE"]["DB_PATH"])
+        self.assertEqual([(a["slot"], a["previous_slot"], a["outcome"]) for a in attempts],
+                         [(found[1].isoformat(), scheduled.isoformat(), BOOKED)])
+
+    @patch("scrape.iter_test_dates")
+    async def test_keeps_scanning_past_slots_it_cannot_book(self, mock_iter):
+        day = datetime.combine(date.today() + timedelta(days=30), time.min)
+        found = [day.replace(hour=9), day.replace(hour=10), day.replace(hour=11)]
+        scheduled = day + timedelta(days=30)
+
+        async def iter_dates(page, flag_selector, cache=None, stop_after=None):
+            for dt in found:
+                yield dt
+        mock_iter.side_effect = iter_dates
+        rebooker = Rebooker(["de"])
+        # Only offered in French, then the offer is gone, then booked
+        rebooker.offer_shown = AsyncMock(side_effect=[False, True, None])
+        rebooker.book = AsyncMock(side_effect=[(OFFER_NOT_FOUND, None), (BOOKED, None)])
+        notifier = MagicMock()
+        notifier.notify = AsyncMock()
+
+        dates, scanned_until, booked_slot = await stream_calendar(MagicMock(), self.config, self.target, ["de", "fr"],
+                                                                  scheduled, notifier, rebooker=rebooker)
+
+        self.assertEqual(dates, found)
+        self.assertEqual(booked_slot, found[2])
+        self.assertEqual(scanned_until, day)
+        self.assertEqual([c.args[1] for c in rebooker.book.await_args_list], found[1:])
+        attempts = get_rebookings(path=self.config["STORAGE"]["DB_PATH"])
+        self.assertEqual(sorted(a["outcome"] for a in attempts), [BOOKED, OFFER_NOT_FOUND])
+        self.assertIn("09:00", notifier.notify.await_args_list[0].args[0])
+
+class TestRunLimited(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_concurrency(self):
+        running = []
+        peak = []
+
+        async def job(i):
+            running.append(i)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(i)
+            if i == 3:
+                raise ValueError("failed")
+            return i
+
+        results = await run_limited([job(i) for i in range(5)], 2)
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(results[:3], [0, 1, 2])
+        self.assertIsInstance(results[3], ValueError)
+
+if __name__ == "__main__":
+    unittest.main()
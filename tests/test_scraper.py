@@ -0,0 +1,222 @@
+import unittest
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime
+from unittest.mock import patch, AsyncMock, MagicMock
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from scraper import parse_month_name, get_available_days, get_uncached_days, extract_offer_times_worker, iter_test_dates, find_test_dates_from_responses
+from utils.response_utils import SlotResponseCollector
+from utils.cache_utils import ScanCache
+
+def make_day(index, label, text, enabled=True, has_offer=True):
+    return {"index": index, "label": label, "enabled": enabled, "has_offer": has_offer, "text": text}
+
+class TestScraper(unittest.TestCase):
+    def test_parse_month_name(self):
+        self.assertEqual(parse_month_name("Oktober 2025"), (2025, 10))
+        self.assertEqual(parse_month_name(" Décembre 2026 "), (2026, 12))
+        self.assertEqual(parse_month_name("?")[1], 0)
+
+    def test_get_available_days(self):
+        snapshot = {
+            "month_name": "Oktober 2025",
+            "days": [
+                make_day(0, "30/9/2025", "30"),                   # previous month
+                make_day(1, "1/10/2025", "1"),
+                make_day(2, "2/10/2025", "2", has_offer=False),
+                make_day(3, "3/10/2025", "3", enabled=False),
+                make_day(4, "14/10/2025", " 14 "),
+                make_day(5, None, "15"),
+            ],
+        }
+        self.assertEqual(get_available_days(snapshot, 10), [(1, "1"), (4, "14")])
+        self.assertEqual(get_available_days(snapshot, 0), [])
+
+    def test_get_uncached_days(self):
+        snapshot = {
+            "month_name": "Oktober 2025",
+            "days": [make_day(0, "1/10/2025", "1"), make_day(1, "14/10/2025", "14")],
+        }
+        cache = ScanCache(ttl_seconds=3600)
+        cached_dates = []
+        self.assertEqual(get_uncached_days(snapshot, 2025, 10, cache, cached_dates), [(0, "1"), (1, "14")])
+        cache.put_day(2025, 10, "14", [datetime(2025, 10, 14, 8, 30), datetime(2025, 10, 14, 9, 15)])
+        self.assertEqual(get_uncached_days(snapshot, 2025, 10, cache, cached_dates), [(0, "1")])
+        self.assertEqual(cached_dates, [datetime(2025, 10, 14, 8, 30), datetime(2025, 10, 14, 9, 15)])
+        self.assertEqual(get_uncached_days(snapshot, 2025, 10, None, []), [(0, "1"), (1, "14")])
+
+MONTH_NAMES = {10: "Oktober 2025", 11: "November 2025", 12: "Dezember 2025"}
+
+class FakeCalendar:
+    """
+    Month navigation of a calendar for the worker tests. Clicks can be made to fail.
+    """
+    def __init__(self, month, days):
+        self.month = month
+        self.days = days
+        self.failing_clicks = 0
+
+    async def snapshot(self, date_nav):
+        return {"month_name": MONTH_NAMES[self.month], "days": self.days.get(self.month, [])}
+
+    async def next(self, page):
+        self.change(1)
+
+    async def previous(self, page):
+        self.change(-1)
+
+    def change(self, step):
+        if self.failing_clicks:
+            self.failing_clicks -= 1
+            raise RuntimeError("Navigation interrupted")
+        self.month += step
+
+class TestExtractOfferTimesWorker(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.page = MagicMock()
+        date_nav = MagicMock()
+        date_nav.wait_for = AsyncMock()
+        date_nav.click = AsyncMock()
+        self.page.locator.return_value = date_nav
+        self.calendar = FakeCalendar(12, {
+            10: [make_day(0, "30/9/2025", "30"), make_day(1, "14/10/2025", "14")],
+            12: [make_day(0, "1/12/2025", "1"), make_day(1, "2/12/2025", "2")],
+        })
+        extract_patch = patch("scraper.extract_offer_times", new_callable=AsyncMock)
+        patches = [
+            patch("scraper.get_calendar_snapshot", side_effect=self.calendar.snapshot),
+            patch("scraper.click_next_month", side_effect=self.calendar.next),
+            patch("scraper.click_previous_month", side_effect=self.calendar.previous),
+            extract_patch,
+        ]
+        mocks = {}
+        for p in patches:
+            mocks[p] = p.start()
+            self.addCleanup(p.stop)
+        self.mock_extract = mocks[extract_patch]
+        self.mock_extract.side_effect = lambda page, day, year, month, day_number, flags: [
+            datetime(year, month, int(day_number), 8, 0)
+        ]
+
+    async def test_worker_drains_queue(self):
+        jobs = deque([(2025, 10, "14", 0), (2025, 12, "2", 0)])
+        open_calendar = AsyncMock()
+
+        times = await extract_offer_times_worker(self.page, jobs, "span.flag-icon-de", open_calendar)
+
+        open_calendar.assert_awaited_once_with(self.page)
+        self.assertEqual(times, [datetime(2025, 10, 14, 8, 0), datetime(2025, 12, 2, 8, 0)])
+        # Days are opened by their cell in the shown month, not by a stored index
+        self.page.locator.return_value.locator.return_value.nth.assert_any_call(1)
+        self.assertFalse(jobs)
+
+    async def test_failed_navigation_is_retried_from_the_shown_month(self):
+        self.calendar.failing_clicks = 1
+        jobs = deque([(2025, 10, "14", 0)])
+
+        times = await extract_offer_times_worker(self.page, jobs, "span.flag-icon-de", from_end=True)
+
+        self.assertEqual(times, [datetime(2025, 10, 14, 8, 0)])
+        self.assertEqual(self.calendar.month, 10)
+        self.mock_extract.assert_awaited_once()
+        self.assertEqual(self.mock_extract.await_args.args[2:5], (2025, 10, "14"))
+
+    async def test_day_is_given_up_after_second_failure(self):
+        self.mock_extract.side_effect = RuntimeError("Offers did not load")
+        jobs = deque([(2025, 12, "2", 0)])
+
+        times = await extract_offer_times_worker(self.page, jobs, "span.flag-icon-de")
+
+        self.assertEqual(times, [])
+        self.assertEqual(self.mock_extract.await_count, 2)
+        self.assertFalse(jobs)
+
+    async def test_day_no_longer_available_is_skipped(self):
+        jobs = deque([(2025, 12, "5", 0)])
+
+        times = await extract_offer_times_worker(self.page, jobs, "span.flag-icon-de")
+
+        self.assertEqual(times, [])
+        self.mock_extract.assert_not_awaited()
+
+class TestIterTestDates(unittest.IsolatedAsyncioTestCase):
+    @patch("scraper.click_next_month", new_callable=AsyncMock)
+    @patch("scraper.extract_offer_times", new_callable=AsyncMock)
+    @patch("scraper.get_calendar_snapshot", new_callable=AsyncMock)
+    async def test_stops_after_date(self, mock_snapshot, mock_extract, mock_next):
+        page = MagicMock()
+        date_nav = MagicMock()
+        date_nav.wait_for = AsyncMock()
+        date_nav.click = AsyncMock()
+        page.locator.return_value = date_nav
+        mock_snapshot.side_effect = [
+            {"month_name": "Oktober 2025", "days": [make_day(0, "14/10/2025", "14"), make_day(1, "20/10/2025", "20")]},
+            {"month_name": "November 2025", "days": [make_day(0, "3/11/2025", "3"), make_day(1, "25/11/2025", "25")]},
+        ]
+        mock_extract.side_effect = lambda page, day, year, month, day_number, flags: [
+            datetime(year, month, int(day_number), 8, 0)
+        ]
+
+        dates = [dt async for dt in iter_test_dates(page, "span.flag-icon-de", stop_after=datetime(2025, 11, 10, 7, 30))]
+
+        self.assertEqual(dates, [datetime(2025, 10, 14, 8, 0), datetime(2025, 10, 20, 8, 0), datetime(2025, 11, 3, 8, 0)])
+        self.assertEqual(mock_extract.await_count, 3)
+        self.assertEqual(mock_next.await_count, 1)
+
+    @patch("scraper.click_next_month", new_callable=AsyncMock)
+    @patch("scraper.extract_offer_times", new_callable=AsyncMock)
+    @patch("scraper.get_calendar_snapshot", new_callable=AsyncMock)
+    async def test_cached_days_are_not_opened(self, mock_snapshot, mock_extract, mock_next):
+        page = MagicMock()
+        page.locator.return_value.wait_for = AsyncMock()
+        page.locator.return_value.click = AsyncMock()
+        mock_snapshot.return_value = {"month_name": "Oktober 2025", "days": [make_day(0, "14/10/2025", "14")]}
+        mock_extract.return_value = [datetime(2025, 10, 14, 8, 0)]
+        cache = ScanCache(ttl_seconds=3600)
+
+        first = [dt async for dt in iter_test_dates(page, "span.flag-icon-de", months=1, cache=cache)]
+        second = [dt async for dt in iter_test_dates(page, "span.flag-icon-de", months=1, cache=cache)]
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_extract.await_count, 1)
+        mock_next.assert_not_awaited()
+
+class ResponsePage:
+    """
+    Page whose month clicks bring in one availability payload each, or none for None.
+    """
+    def __init__(self, collector, payloads):
+        self.collector = collector
+        self.payloads = list(payloads)
+        self.locator = MagicMock(return_value=MagicMock(wait_for=AsyncMock()))
+
+    @asynccontextmanager
+    async def expect_response(self, predicate, timeout=None):
+        yield
+        payload = self.payloads.pop(0)
+        if payload is None:
+            raise PlaywrightTimeoutError("Timeout")
+        self.collector.payloads.append(payload)
+        self.collector.matched += 1
+
+@patch("scraper.click_next_month", new_callable=AsyncMock)
+@patch("scraper.get_month_info", new_callable=AsyncMock, return_value=(2025, 10))
+class TestFindTestDatesFromResponses(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.collector = SlotResponseCollector("availabilit")
+        self.collector.payloads.append([{"startTime": "2025-10-14T08:30:00"}])
+        self.collector.matched = 1
+
+    async def test_waits_for_a_response_per_month(self, mock_month_info, mock_next_month):
+        page = ResponsePage(self.collector, [[{"startTime": "2025-11-03T10:00:00"}], [{"startTime": "2026-01-05T10:00:00"}]])
+        dates = await find_test_dates_from_responses(page, self.collector, ["de"])
+        self.assertEqual(dates, [datetime(2025, 10, 14, 8, 30), datetime(2025, 11, 3, 10, 0)])
+        self.assertEqual(mock_next_month.await_count, 2)
+
+    async def test_month_without_response_falls_back_to_dom(self, mock_month_info, mock_next_month):
+        page = ResponsePage(self.collector, [[{"startTime": "2025-11-03T10:00:00"}], None])
+        with patch("builtins.print"):
+            self.assertIsNone(await find_test_dates_from_responses(page, self.collector, ["de"]))
+
+if __name__ == "__main__":
+    unittest.main()
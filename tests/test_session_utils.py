@@ -0,0 +1,46 @@
+import json
+import os
+import stat
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from utils.session_utils import load_session, save_session, clear_session, get_session_path
+
+BOOKING_URL = "https://example.com/public/booking/1?token=a"
+CALENDAR_URL = "https://example.com/public/booking/1/change/availability"
+
+class TestSessionUtils(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = os.path.join(self.tmp.name, "sessions")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_save_and_load(self):
+        state = {"cookies": [{"name": "SESSION", "value": "ok"}], "origins": []}
+        save_session("default", BOOKING_URL, CALENDAR_URL, state, datetime(2025, 11, 19, 7, 30), self.dir)
+        session = load_session("default", BOOKING_URL, 24, self.dir)
+        self.assertEqual(session["calendar_url"], CALENDAR_URL)
+        self.assertEqual(session["storage_state"], state)
+        self.assertEqual(session["scheduled_date"], datetime(2025, 11, 19, 7, 30))
+        self.assertEqual(stat.S_IMODE(os.stat(get_session_path("default", self.dir)).st_mode), 0o600)
+
+    def test_unusable_sessions(self):
+        self.assertIsNone(load_session("default", BOOKING_URL, 24, self.dir))
+        save_session("default", BOOKING_URL, CALENDAR_URL, {}, directory=self.dir)
+        self.assertIsNone(load_session("default", "https://example.com/public/booking/2?token=b", 24, self.dir))
+
+        path = get_session_path("default", self.dir)
+        with open(path) as f:
+            session = json.load(f)
+        session["saved_at"] = (datetime.now() - timedelta(hours=25)).isoformat()
+        with open(path, "w") as f:
+            json.dump(session, f)
+        self.assertIsNone(load_session("default", BOOKING_URL, 24, self.dir))
+
+        clear_session("default", self.dir)
+        self.assertFalse(os.path.exists(path))
+
+if __name__ == "__main__":
+    unittest.main()
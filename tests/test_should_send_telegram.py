@@ -1,28 +1,59 @@
+import configparser
+import os
+import tempfile
 import unittest
 from datetime import datetime
-from utils.config_utils import load_config
-from utils.storage_utils import save_current_dates
+from utils.storage_utils import record_scan, get_last_dates
 from scrape import should_send_telegram
 
 class TestShouldSendTelegram(unittest.TestCase):
     def setUp(self):
-        self.config = load_config()
-        # Save a known last_dates.json
-        save_current_dates({datetime(2025, 10, 14, 12, 45)})
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "availability.db")
+        self.config = configparser.ConfigParser()
+        self.config.read_string(f"[TELEGRAM]\nFORCE_NOTIFY = false\nNOTIFY_ONLY_IF_EARLIER = false\n"
+                                f"[STORAGE]\nDB_PATH = {self.db_path}\n")
+        # Record a known previous run
+        record_scan({datetime(2025, 10, 14, 12, 45)}, path=self.db_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def scan(self, dates):
+        return record_scan(dates, path=self.db_path)
 
     def test_force_notify(self):
         self.config["TELEGRAM"]["FORCE_NOTIFY"] = "true"
-        result = should_send_telegram([datetime(2025, 10, 15, 8, 0)], self.config)
+        result = should_send_telegram(self.scan([datetime(2025, 10, 15, 8, 0)]), self.config)
         self.assertTrue(result)
         self.config["TELEGRAM"]["FORCE_NOTIFY"] = "false"
 
     def test_new_dates(self):
-        result = should_send_telegram([datetime(2025, 10, 16, 8, 0)], self.config)
+        result = should_send_telegram(self.scan([datetime(2025, 10, 16, 8, 0)]), self.config)
         self.assertTrue(result)
 
     def test_no_new_dates(self):
-        result = should_send_telegram([datetime(2025, 10, 14, 12, 45)], self.config)
+        result = should_send_telegram(self.scan([datetime(2025, 10, 14, 12, 45)]), self.config)
         self.assertTrue(result)  # Should send if no scheduled_date and NOTIFY_ONLY_IF_EARLIER is false
 
+    def test_no_new_dates_with_scheduled_date(self):
+        result = should_send_telegram(self.scan([datetime(2025, 10, 14, 12, 45)]), self.config, datetime(2025, 12, 1, 8, 0))
+        self.assertFalse(result)
+
+    def test_notify_only_if_earlier(self):
+        self.config["TELEGRAM"]["NOTIFY_ONLY_IF_EARLIER"] = "true"
+        scheduled_date = datetime(2025, 11, 1, 8, 0)
+        self.assertFalse(should_send_telegram(self.scan([datetime(2025, 11, 5, 8, 0)]), self.config, scheduled_date))
+        self.assertTrue(should_send_telegram(self.scan([datetime(2025, 10, 20, 8, 0)]), self.config, scheduled_date))
+
+    def test_does_not_write_history(self):
+        run_id = self.scan([datetime(2025, 10, 16, 8, 0)])
+        self.assertTrue(should_send_telegram(run_id, self.config))
+        self.assertTrue(should_send_telegram(run_id, self.config))
+        self.assertEqual(get_last_dates(path=self.db_path), {datetime(2025, 10, 16, 8, 0)})
+
+    def test_unrecorded_scan_is_sent(self):
+        self.assertTrue(should_send_telegram(None, self.config, datetime(2025, 12, 1, 8, 0)))
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from datetime import datetime
+from utils.snapshot_utils import SnapshotServer, update_snapshot, load_snapshot, etag_matches
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snapshot.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_update_keeps_other_targets(self):
+        update_snapshot(self.path, "anna", "Eupen", [datetime(2025, 10, 14, 8, 0)], None, now=datetime(2025, 10, 1, 9, 0))
+        update_snapshot(self.path, "ben", "Kettenis", [], datetime(2025, 12, 1, 7, 30),
+                        scanned_until=datetime(2025, 12, 2), now=datetime(2025, 10, 1, 9, 5))
+        snapshot = load_snapshot(self.path)
+        self.assertEqual(snapshot["updated_at"], "2025-10-01T09:05:00")
+        self.assertEqual(snapshot["targets"]["anna"]["available_dates"], ["2025-10-14T08:00:00"])
+        self.assertEqual(snapshot["targets"]["ben"]["scheduled_date"], "2025-12-01T07:30:00")
+        self.assertEqual(snapshot["targets"]["ben"]["scanned_until"], "2025-12-02T00:00:00")
+
+    def test_etag_matches(self):
+        self.assertTrue(etag_matches('"a", "b"', '"b"'))
+        self.assertTrue(etag_matches('W/"b"', '"b"'))
+        self.assertTrue(etag_matches("*", '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+        self.assertFalse(etag_matches(None, '"b"'))
+
+class TestSnapshotServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "snapshot.json")
+        update_snapshot(self.path, "anna", "Eupen", [datetime(2025, 10, 14, 8, 0)], None)
+        self.server = SnapshotServer(self.path, port=0).start()
+        self.url = f"http://127.0.0.1:{self.server.port}"
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def get(self, path, etag=None):
+        request = urllib.request.Request(self.url + path, headers={"If-None-Match": etag} if etag else {})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, response.headers["ETag"], response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers["ETag"], b""
+
+    def test_etag_and_not_modified(self):
+        status, etag, body = self.get("/snapshot")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["targets"]["anna"]["available_dates"], ["2025-10-14T08:00:00"])
+        self.assertEqual(self.get("/snapshot", etag)[:2], (304, etag))
+
+        update_snapshot(self.path, "anna", "Eupen", [], None)
+        status, new_etag, body = self.get("/snapshot", etag)
+        self.assertEqual(status, 200)
+        self.assertNotEqual(new_etag, etag)
+        self.assertEqual(json.loads(body)["targets"]["anna"]["available_dates"], [])
+
+    def test_target(self):
+        status, _, body = self.get("/targets/anna")
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["target"], "anna")
+        self.assertEqual(self.get("/targets/ben")[0], 404)
+
+    def test_read_only(self):
+        request = urllib.request.Request(self.url + "/snapshot", data=b"{}", method="POST")
+        with self.assertRaises(urllib.error.HTTPError) as cm:
+            urllib.request.urlopen(request)
+        self.assertEqual(cm.exception.code, 405)
+
+if __name__ == "__main__":
+    unittest.main()
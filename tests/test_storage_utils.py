@@ -1,34 +1,112 @@
 import unittest
 from datetime import datetime
-import os
 import json
-from utils.storage_utils import load_last_dates, save_current_dates, LAST_DATES_PATH
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from utils.storage_utils import record_scan, get_new_dates, get_last_dates, prune, record_rebooking, get_rebookings, import_last_dates
 
 class TestStorageUtils(unittest.TestCase):
     def setUp(self):
-        # Backup existing file if present
-        if os.path.exists(LAST_DATES_PATH):
-            os.rename(LAST_DATES_PATH, LAST_DATES_PATH + ".bak")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "availability.db")
 
     def tearDown(self):
-        # Remove test file
-        if os.path.exists(LAST_DATES_PATH):
-            os.remove(LAST_DATES_PATH)
-        # Restore backup
-        if os.path.exists(LAST_DATES_PATH + ".bak"):
-            os.rename(LAST_DATES_PATH + ".bak", LAST_DATES_PATH)
-
-    def test_save_and_load_dates(self):
+        self.tmp.cleanup()
+
+    def test_record_and_load_dates(self):
         dates = {datetime(2025, 10, 14, 12, 45), datetime(2025, 11, 1, 8, 0)}
-        save_current_dates(dates)
-        loaded = load_last_dates()
-        self.assertEqual(dates, loaded)
+        record_scan(dates, path=self.path)
+        self.assertEqual(get_last_dates(path=self.path), dates)
 
     def test_load_empty(self):
-        if os.path.exists(LAST_DATES_PATH):
-            os.remove(LAST_DATES_PATH)
-        loaded = load_last_dates()
-        self.assertEqual(loaded, set())
+        self.assertEqual(get_last_dates(path=self.path), set())
+
+    def test_new_dates_since_last_run(self):
+        first = record_scan([datetime(2025, 10, 14, 12, 45)], path=self.path)
+        self.assertEqual(get_new_dates(first, path=self.path), [datetime(2025, 10, 14, 12, 45)])
+        second = record_scan([datetime(2025, 10, 14, 12, 45), datetime(2025, 10, 16, 8, 0)], path=self.path)
+        self.assertEqual(get_new_dates(second, path=self.path), [datetime(2025, 10, 16, 8, 0)])
+        # A slot that disappears and comes back is new again
+        record_scan([datetime(2025, 10, 16, 8, 0)], path=self.path)
+        fourth = record_scan([datetime(2025, 10, 14, 12, 45), datetime(2025, 10, 16, 8, 0)], path=self.path)
+        self.assertEqual(get_new_dates(fourth, path=self.path), [datetime(2025, 10, 14, 12, 45)])
+
+    def test_partial_scan_carries_over_later_slots(self):
+        record_scan([datetime(2025, 10, 14, 12, 45), datetime(2025, 12, 1, 8, 0)], path=self.path)
+        record_scan([datetime(2025, 10, 16, 8, 0)], path=self.path, scanned_until=datetime(2025, 11, 1))
+        self.assertEqual(get_last_dates(path=self.path), {datetime(2025, 10, 16, 8, 0), datetime(2025, 12, 1, 8, 0)})
+        run_id = record_scan([datetime(2025, 10, 16, 8, 0), datetime(2025, 12, 1, 8, 0)], path=self.path)
+        self.assertEqual(get_new_dates(run_id, path=self.path), [])
+
+    def test_record_rebooking(self):
+        record_rebooking("eupen", datetime(2025, 10, 20, 9, 0), datetime(2025, 11, 19, 7, 30), "booked", 0.42, path=self.path)
+        record_rebooking("eupen", datetime(2025, 10, 21, 9, 0), None, "error", detail="Timeout", path=self.path)
+        attempts = get_rebookings("eupen", path=self.path)
+        self.assertEqual([a["outcome"] for a in attempts], ["booked", "error"])
+        self.assertEqual(attempts[0]["seconds"], 0.42)
+        self.assertIsNone(attempts[1]["previous_slot"])
+        self.assertEqual(get_rebookings(path=self.path), [])
+
+    def test_earlier_than(self):
+        run_id = record_scan([datetime(2025, 10, 14, 12, 45), datetime(2025, 12, 1, 8, 0)], path=self.path)
+        self.assertEqual(get_new_dates(run_id, earlier_than=datetime(2025, 11, 1), path=self.path),
+                         [datetime(2025, 10, 14, 12, 45)])
+
+    def test_dates_per_target(self):
+        record_scan({datetime(2025, 10, 14, 12, 45)}, "anna", path=self.path)
+        self.assertEqual(get_last_dates("anna", path=self.path), {datetime(2025, 10, 14, 12, 45)})
+        self.assertEqual(get_last_dates(path=self.path), set())
+        run_id = record_scan({datetime(2025, 10, 14, 12, 45)}, path=self.path)
+        self.assertEqual(get_new_dates(run_id, path=self.path), [datetime(2025, 10, 14, 12, 45)])
+
+    def test_prune(self):
+        record_scan([datetime(2025, 1, 14, 12, 45)], now=datetime(2025, 1, 1), path=self.path)
+        run_id = record_scan([datetime(2025, 10, 14, 12, 45)], now=datetime(2025, 10, 1), path=self.path)
+        self.assertEqual(prune(90, now=datetime(2025, 10, 2), path=self.path), 1)
+        self.assertEqual(get_last_dates(path=self.path), {datetime(2025, 10, 14, 12, 45)})
+        # The latest run is kept, so the next scan still knows what it saw
+        next_run = record_scan([datetime(2025, 10, 14, 12, 45)], now=datetime(2026, 6, 1), path=self.path)
+        prune(90, now=datetime(2026, 6, 2), path=self.path)
+        self.assertEqual(get_new_dates(next_run, path=self.path), [])
+        self.assertGreater(next_run, run_id)
+
+    def test_concurrent_scan_builds_on_committed_run(self):
+        record_scan([], path=self.path)
+        # Another scanner is in the middle of recording a run that saw the slot
+        other = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        run_id = other.execute("INSERT INTO runs (target, run_at) VALUES ('default', '2025-10-01T09:00:00')").lastrowid
+        other.execute("INSERT INTO slots VALUES ('default', '2025-10-14T12:45:00', '2025-10-01T09:00:00', "
+                      "'2025-10-01T09:00:00', '2025-10-01T09:00:00', ?, ?)", (run_id, run_id))
+        result = {}
+        thread = threading.Thread(target=lambda: result.update(
+            run_id=record_scan([datetime(2025, 10, 14, 12, 45)], path=self.path)))
+        thread.start()
+        time.sleep(0.2)
+        other.execute("COMMIT")
+        other.close()
+        thread.join()
+        self.assertGreater(result["run_id"], run_id)
+        self.assertEqual(get_new_dates(result["run_id"], path=self.path), [])
+
+    def test_import_last_dates(self):
+        json_path = os.path.join(self.tmp.name, "last_dates.json")
+        self.assertIsNone(import_last_dates(json_path, path=self.path))
+        with open(json_path, "w") as f:
+            json.dump(["2025-10-14T12:45:00", "2025-11-01T08:00:00"], f)
+        self.assertEqual(import_last_dates(json_path, path=self.path), 2)
+        self.assertFalse(os.path.exists(json_path))
+        self.assertTrue(os.path.exists(json_path + ".imported"))
+        run_id = record_scan([datetime(2025, 10, 14, 12, 45), datetime(2025, 12, 1, 8, 0)], path=self.path)
+        self.assertEqual(get_new_dates(run_id, path=self.path), [datetime(2025, 12, 1, 8, 0)])
+        # A target with history is not overwritten by an old file
+        with open(json_path, "w") as f:
+            json.dump(["2026-01-05T08:00:00"], f)
+        self.assertEqual(import_last_dates(json_path, path=self.path), 0)
+        self.assertEqual(get_last_dates(path=self.path), {datetime(2025, 10, 14, 12, 45), datetime(2025, 12, 1, 8, 0)})
 
 if __name__ == "__main__":
     unittest.main()
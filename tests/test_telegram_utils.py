@@ -1,14 +1,77 @@
+import configparser
 import unittest
-from unittest.mock import patch, AsyncMock
-from utils.telegram_utils import send_telegram_message
+from unittest.mock import patch, AsyncMock, MagicMock
+import telegram
+from utils.telegram_utils import join_messages, split_message, TelegramNotifier
 
 class TestTelegramUtils(unittest.IsolatedAsyncioTestCase):
-    @patch("utils.telegram_utils.telegram.Bot")
-    async def test_send_telegram_message(self, mock_bot):
-        mock_instance = mock_bot.return_value
-        mock_instance.send_message = AsyncMock()
-        await send_telegram_message("dummy_token", "dummy_chat_id", "Test message")
-        mock_instance.send_message.assert_awaited_once()
+    def test_join_messages(self):
+        self.assertEqual(join_messages(["a", "b"]), ["a\n\nb"])
+        self.assertEqual(join_messages(["a" * 6, "b" * 6], limit=10), ["a" * 6, "b" * 6])
+        self.assertEqual(join_messages([]), [])
+
+    def test_long_messages_are_split_at_lines(self):
+        lines = [f"<b>Termin {i}:</b> Montag, 13.10.2025 08:{i:02d}" for i in range(40)]
+        parts = join_messages(["\n".join(lines)], limit=200)
+        self.assertGreater(len(parts), 1)
+        for part in parts:
+            self.assertLessEqual(len(part), 200)
+            self.assertEqual(part.count("<b>"), part.count("</b>"))
+        self.assertEqual("\n".join(parts).split("\n"), lines)
+
+    def test_overlong_line_is_cut_without_tags_or_broken_entities(self):
+        parts = split_message('<a href="https://example.com">' + "x" * 8 + "&amp;" + "y" * 8 + "</a>", limit=10)
+        self.assertEqual(parts, ["x" * 8, "&amp;" + "yyyyy", "yyy"])
+
+class TestTelegramNotifier(unittest.IsolatedAsyncioTestCase):
+    def make_notifier(self, chat_ids, **kwargs):
+        bot = MagicMock()
+        bot.send_message = AsyncMock()
+        bot.shutdown = AsyncMock()
+        notifier = TelegramNotifier("token", chat_ids, chat_interval_seconds=0.01, bot=bot, **kwargs)
+        notifier.retry_delay_seconds = 0.01
+        return notifier, bot
+
+    async def test_coalesces_and_fans_out(self):
+        notifier, bot = self.make_notifier(["1", "2", "3"], coalesce_seconds=0.05)
+        async with notifier:
+            await notifier.notify("first")
+            await notifier.notify("second")
+        self.assertEqual(bot.send_message.await_count, 3)
+        self.assertEqual({c.kwargs["chat_id"] for c in bot.send_message.await_args_list}, {"1", "2", "3"})
+        self.assertTrue(all(c.kwargs["text"] == "first\n\nsecond" for c in bot.send_message.await_args_list))
+        bot.shutdown.assert_awaited_once()
+
+    async def test_sends_immediately_without_window(self):
+        notifier, bot = self.make_notifier(["1"], coalesce_seconds=0)
+        async with notifier:
+            await notifier.notify("first")
+            await notifier.notify("second")
+        self.assertEqual([c.kwargs["text"] for c in bot.send_message.await_args_list], ["first", "second"])
+
+    async def test_retries_transient_errors(self):
+        notifier, bot = self.make_notifier(["1"], coalesce_seconds=0)
+        bot.send_message.side_effect = [telegram.error.RetryAfter(0), telegram.error.TimedOut(), None]
+        self.assertTrue(await notifier.send("1", "text"))
+        self.assertEqual(bot.send_message.await_count, 3)
+
+    async def test_gives_up(self):
+        notifier, bot = self.make_notifier(["1"], coalesce_seconds=0, max_retries=1)
+        bot.send_message.side_effect = telegram.error.NetworkError("down")
+        self.assertFalse(await notifier.send("1", "text"))
+        self.assertEqual(bot.send_message.await_count, 2)
+        bot.send_message.side_effect = telegram.error.BadRequest("chat not found")
+        self.assertFalse(await notifier.send("1", "text"))
+        self.assertEqual(bot.send_message.await_count, 3)
+
+    def test_from_config(self):
+        config = configparser.ConfigParser()
+        config.read_string("[TELEGRAM]\nENABLED = true\nTELEGRAM_BOT_TOKEN = 123:abc\nCHAT_ID = 1, -1002\nCOALESCE_SECONDS = 5\n")
+        notifier = TelegramNotifier.from_config(config)
+        self.assertEqual(notifier.chat_ids, ["1", "-1002"])
+        self.assertEqual(notifier.coalesce_seconds, 5)
+        config["TELEGRAM"]["ENABLED"] = "false"
+        self.assertIsNone(TelegramNotifier.from_config(config))
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from utils.wait_utils import wait_for_any
+
+class FakePage:
+    def __init__(self, visible, appears=True):
+        self.visible = visible
+        self.appears = appears
+        self.combined = MagicMock()
+        self.combined.first.wait_for = AsyncMock(side_effect=None if appears else PlaywrightTimeoutError("timeout"))
+
+    def locator(self, selector):
+        locator = MagicMock()
+        locator.first.is_visible = AsyncMock(return_value=selector in self.visible)
+        locator.first.or_.return_value = self.combined
+        self.combined.or_.return_value = self.combined
+        return locator
+
+class TestWaitUtils(unittest.IsolatedAsyncioTestCase):
+    async def test_most_advanced_state_wins(self):
+        page = FakePage({"#banner", "#change"})
+        state = await wait_for_any(page, [("change", "#change"), ("banner", "#banner"), ("booking", "#booking")])
+        self.assertEqual(state, "change")
+        page.combined.first.wait_for.assert_awaited_once_with(state="visible", timeout=5000)
+
+    async def test_timeout(self):
+        page = FakePage(set(), appears=False)
+        self.assertIsNone(await wait_for_any(page, [("banner", "#banner"), ("booking", "#booking")], timeout=100))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,257 @@
+import hashlib
+import json
+import os
+import re
+import time
+
+# Defaults for the [ASSET_CACHE] section
+DEFAULT_DIRECTORY = os.path.join("cache", "assets")
+DEFAULT_MAX_SIZE_MB = 100
+DEFAULT_TTL_SECONDS = 86400
+DEFAULT_RESOURCE_TYPES = ["script", "stylesheet", "font"]
+
+# Headers describing the transfer, not the body. Playwright hands out decoded bodies, so
+# a stored Content-Encoding would make the browser decode them a second time.
+TRANSFER_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "date"}
+
+INDEX_FILE = "index.json"
+
+def get_max_age(cache_control, default):
+    """
+    Args:
+        cache_control: Value of the Cache-Control header or None.
+        default: Lifetime in seconds of a response without max-age.
+    Returns:
+        Seconds the response may be used without revalidation, or None if it must not be stored.
+    """
+    directives = [d.strip().lower() for d in (cache_control or "").split(",")]
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for directive in directives:
+        match = re.fullmatch(r"max-age=(\d+)", directive)
+        if match:
+            return int(match.group(1))
+    return default
+
+class AssetCache:
+    """
+    Disk cache for the static bundles of the portal: scripts, stylesheets and fonts. Every
+    context starts without a browser cache, and routing requests turns the browser cache
+    off anyway, so without it the Angular app is downloaded again by every check.
+
+    Fresh entries are served from disk without a request. Expired entries are revalidated
+    with If-None-Match or If-Modified-Since and served from disk on 304. The cache is cut
+    to its size cap when it is saved, dropping the least recently used entries first.
+    """
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_size_bytes=DEFAULT_MAX_SIZE_MB * 2**20,
+                 ttl_seconds=DEFAULT_TTL_SECONDS, resource_types=None):
+        """
+        Args:
+            directory: Directory of the cached bodies and their index.
+            max_size_bytes: Size cap of the cached bodies.
+            ttl_seconds: Lifetime of a response that does not set max-age.
+            resource_types: Playwright resource types to cache, defaults to DEFAULT_RESOURCE_TYPES.
+        """
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.ttl_seconds = ttl_seconds
+        self.resource_types = set(DEFAULT_RESOURCE_TYPES if resource_types is None else resource_types)
+        self.entries = self.load_index()
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a cache from the [ASSET_CACHE] section.
+        Args:
+            config: ConfigParser object.
+        Returns:
+            AssetCache, or None if the cache is disabled.
+        """
+        if not config.getboolean("ASSET_CACHE", "ENABLED", fallback=False):
+            return None
+        section = config["ASSET_CACHE"]
+        resource_types = section.get("RESOURCE_TYPES", "")
+        return cls(
+            section.get("DIRECTORY", DEFAULT_DIRECTORY),
+            max_size_bytes=int(section.getfloat("MAX_SIZE_MB", fallback=DEFAULT_MAX_SIZE_MB) * 2**20),
+            ttl_seconds=section.getfloat("TTL_SECONDS", fallback=DEFAULT_TTL_SECONDS),
+            resource_types=[t.strip() for t in resource_types.split(",") if t.strip()] if resource_types else None,
+        )
+
+    def reset(self):
+        """
+        Resets the counters, e.g. at the start of a scan on a reused context.
+        """
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_from_disk = 0
+
+    def load_index(self):
+        """
+        Returns:
+            Dict of URL to entry from the index file, empty if there is none.
+        """
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"Could not load asset cache index: {e}")
+            return {}
+
+    def body_path(self, url):
+        """
+        Args:
+            url: Request URL.
+        Returns:
+            Path of the file the body of the URL is cached in.
+        """
+        return os.path.join(self.directory, hashlib.sha1(url.encode()).hexdigest())
+
+    def read_body(self, url):
+        """
+        Args:
+            url: Request URL.
+        Returns:
+            Cached body bytes, or None if the file is gone, e.g. evicted by another context.
+        """
+        try:
+            with open(self.body_path(url), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url, status, headers, body, now=None):
+        """
+        Stores a response if its headers allow it.
+        Args:
+            url: Request URL.
+            status: HTTP status, only 200 is stored.
+            headers: Dict of response headers.
+            body: Decoded body bytes.
+            now: Optional current time as a timestamp.
+        Returns:
+            True if the response was stored.
+        """
+        headers = {name.lower(): value for name, value in headers.items()}
+        max_age = get_max_age(headers.get("cache-control"), self.ttl_seconds)
+        if status != 200 or max_age is None or len(body) > self.max_size_bytes:
+            return False
+        now = now or time.time()
+        os.makedirs(self.directory, exist_ok=True)
+        tmp_path = self.body_path(url) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, self.body_path(url))
+        self.entries[url] = {
+            "headers": {name: value for name, value in headers.items() if name not in TRANSFER_HEADERS},
+            "size": len(body),
+            "expires_at": now + max_age,
+            "last_used": now,
+        }
+        return True
+
+    def save(self):
+        """
+        Merges the index with the one on disk, which other contexts may have saved in the
+        meantime, evicts the least recently used entries above the size cap and writes it.
+        """
+        entries = self.load_index()
+        for url, entry in self.entries.items():
+            if url not in entries or entries[url]["last_used"] <= entry["last_used"]:
+                entries[url] = entry
+        total = sum(entry["size"] for entry in entries.values())
+        for url in sorted(entries, key=lambda u: entries[u]["last_used"]):
+            if total <= self.max_size_bytes:
+                break
+            total -= entries.pop(url)["size"]
+            try:
+                os.remove(self.body_path(url))
+            except OSError:
+                pass
+        self.entries = entries
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = os.path.join(self.directory, INDEX_FILE + ".tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, os.path.join(self.directory, INDEX_FILE))
+        except OSError as e:
+            print(f"Could not save asset cache index: {e}")
+
+    async def attach(self, context):
+        """
+        Routes all requests of a browser context through the cache. Attach it before a
+        ResourceBlocker, so that the blocker sees requests first and hands the ones it
+        lets through to the cache with fallback().
+        Args:
+            context: Playwright browser context.
+        """
+        await context.route("**/*", self._handle_route)
+
+    async def _handle_route(self, route):
+        request = route.request
+        if request.method != "GET" or request.resource_type not in self.resource_types:
+            await route.fallback()
+            return
+        url = request.url
+        entry = self.entries.get(url)
+        body = self.read_body(url) if entry else None
+        now = time.time()
+        if body is not None and entry["expires_at"] > now:
+            self.hits += 1
+            await self._fulfill_from_disk(route, entry, body, now)
+            return
+
+        headers = dict(request.headers)
+        if body is not None:
+            if "etag" in entry["headers"]:
+                headers["if-none-match"] = entry["headers"]["etag"]
+            if "last-modified" in entry["headers"]:
+                headers["if-modified-since"] = entry["headers"]["last-modified"]
+        try:
+            response = await route.fetch(headers=headers)
+        except Exception as e:
+            print(f"Could not fetch {url} for the asset cache: {e}")
+            await route.fallback()
+            return
+        if response.status == 304 and body is not None:
+            self.revalidated += 1
+            max_age = get_max_age(response.headers.get("cache-control", entry["headers"].get("cache-control")),
+                                  self.ttl_seconds)
+            entry["expires_at"] = now + (max_age or 0)
+            await self._fulfill_from_disk(route, entry, body, now)
+            return
+        self.misses += 1
+        response_body = await response.body()
+        try:
+            self.store(url, response.status, response.headers, response_body, now)
+        except OSError as e:
+            print(f"Could not store {url} in the asset cache: {e}")
+        await route.fulfill(status=response.status, body=response_body, headers={
+            name: value for name, value in response.headers.items() if name.lower() not in TRANSFER_HEADERS})
+
+    async def _fulfill_from_disk(self, route, entry, body, now):
+        entry["last_used"] = now
+        self.bytes_from_disk += len(body)
+        await route.fulfill(status=200, headers=entry["headers"], body=body)
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the requests served from disk, revalidated and fetched since the last
+            reset, the hit rate and the bytes served from disk.
+        """
+        total = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidated) / total, 3) if total else None,
+            "bytes_from_disk": self.bytes_from_disk,
+        }
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import re
+import time
+CACHE_DIR = "cache"
+
+# Offers read from a day are reused for this long, unless the day's bubble changed
+DEFAULT_TTL_SECONDS = 900
+
+def get_cache_path(target, directory=None):
+    """
+    Returns the file the scan cache of a target is stored in.
+    Args:
+        target: Target name.
+        directory: Optional directory, defaults to CACHE_DIR.
+    Returns:
+        Path string.
+    """
+    return os.path.join(directory or CACHE_DIR, re.sub(r"[^A-Za-z0-9_-]+", "_", target) + ".json")
+
+def fingerprint(day_numbers):
+    """
+    Args:
+        day_numbers: Iterable of day numbers of a month that show an offer bubble.
+    Returns:
+        Short hash of the set of days.
+    """
+    days = ",".join(str(d) for d in sorted(int(d) for d in day_numbers))
+    return hashlib.sha1(days.encode()).hexdigest()[:16]
+
+class ScanCache:
+    """
+    Per month, the days that showed an offer bubble in the last scan, and per day the
+    offer times read from it. A day is only opened again when its bubble appeared since
+    the last scan or its offers are older than the TTL.
+    """
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, flag_selector=None, months=None, days=None):
+        """
+        Args:
+            ttl_seconds: Maximum age of the offers of a day.
+            flag_selector: CSS selector of the language flags the offers were read with.
+            months: Optional dict of "YYYY-MM" to {"fingerprint", "days"} from an earlier scan.
+            days: Optional dict of "YYYY-MM-DD" to {"read_at", "times"} from an earlier scan.
+        """
+        self.ttl_seconds = ttl_seconds
+        self.flag_selector = flag_selector
+        self.months = months or {}
+        self.days = days or {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, target, ttl_seconds=DEFAULT_TTL_SECONDS, flag_selector=None, directory=None):
+        """
+        Loads the cache of a target. An unreadable cache, or one read with other language
+        flags, is replaced by an empty one.
+        Args:
+            target: Target name.
+            ttl_seconds: Maximum age of the offers of a day.
+            flag_selector: CSS selector of the language flags of this scan.
+            directory: Optional directory, defaults to CACHE_DIR.
+        Returns:
+            ScanCache.
+        """
+        path = get_cache_path(target, directory)
+        if not os.path.exists(path):
+            return cls(ttl_seconds, flag_selector)
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not load scan cache {path}: {e}")
+            return cls(ttl_seconds, flag_selector)
+        if data.get("flag_selector") != flag_selector:
+            return cls(ttl_seconds, flag_selector)
+        return cls(ttl_seconds, flag_selector, data.get("months"), data.get("days"))
+
+    def save(self, target, directory=None, now=None):
+        """
+        Saves the cache of a target, without the days that expired.
+        Args:
+            target: Target name.
+            directory: Optional directory, defaults to CACHE_DIR.
+            now: Optional current time as Unix timestamp.
+        """
+        now = now or time.time()
+        current_month = time.strftime("%Y-%m", time.localtime(now))
+        months = {key: entry for key, entry in self.months.items() if key >= current_month}
+        days = {key: entry for key, entry in self.days.items() if now - entry["read_at"] <= self.ttl_seconds}
+        path = get_cache_path(target, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"flag_selector": self.flag_selector, "months": months, "days": days}, f)
+        os.replace(tmp_path, path)
+
+    def update_month(self, year, month, day_numbers):
+        """
+        Records the days of a month that show a bubble now. Cached offers of days whose
+        bubble appeared or disappeared since the last scan are dropped.
+        Args:
+            year: Integer year.
+            month: Integer month.
+            day_numbers: List of day number strings with a bubble.
+        Returns:
+            True if the bubbles are the same as in the last scan.
+        """
+        key = f"{year}-{month:02d}"
+        new_fingerprint = fingerprint(day_numbers)
+        previous = self.months.get(key)
+        self.months[key] = {"fingerprint": new_fingerprint, "days": sorted(int(d) for d in day_numbers)}
+        if previous and previous["fingerprint"] == new_fingerprint:
+            return True
+        if previous:
+            changed = set(previous["days"]) ^ set(int(d) for d in day_numbers)
+        else:
+            changed = set(int(d) for d in day_numbers)
+        for day in changed:
+            self.days.pop(f"{key}-{day:02d}", None)
+        return False
+
+    def get_day(self, year, month, day_number, now=None):
+        """
+        Args:
+            year: Integer year.
+            month: Integer month.
+            day_number: Day number string.
+            now: Optional current time as Unix timestamp.
+        Returns:
+            List of "HH:MM" offer times, or None if the day has to be opened.
+        """
+        entry = self.days.get(f"{year}-{month:02d}-{int(day_number):02d}")
+        if entry is None or (now or time.time()) - entry["read_at"] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["times"]
+
+    def put_day(self, year, month, day_number, times, now=None):
+        """
+        Caches the offers read from a day.
+        Args:
+            year: Integer year.
+            month: Integer month.
+            day_number: Day number string.
+            times: List of datetime objects of the day.
+            now: Optional current time as Unix timestamp.
+        """
+        self.days[f"{year}-{month:02d}-{int(day_number):02d}"] = {
+            "read_at": now or time.time(),
+            "times": [dt.strftime("%H:%M") for dt in times],
+        }
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the number of days taken from the cache and opened in this scan.
+        """
+        return {"days_cached": self.hits, "days_opened": self.misses}
@@ -1,6 +1,17 @@
 import configparser
+import re
+from collections import namedtuple
 CONFIG_PATH = "config.ini"
 
+# Defaults for the test center of a target
+DEFAULT_POSTAL_CODE = "4731"
+DEFAULT_CENTER = "Führerscheinzentrum Eupen (1029)"
+TARGET_SECTION_PREFIX = "TARGET "
+
+# A booking to check: name, booking URL, postal code typed into the site selector,
+# test center as listed in the site selector, and the center's site ID.
+Target = namedtuple("Target", ["name", "url", "postal_code", "center", "site_id"])
+
 def load_config():
     """
     Loads configuration from CONFIG_PATH.
@@ -10,3 +21,32 @@ def load_config():
     config = configparser.ConfigParser()
     config.read(CONFIG_PATH)
     return config
+
+def load_targets(config):
+    """
+    Reads the bookings to check. Every [TARGET <name>] section is one target and inherits
+    URL, POSTAL_CODE and CENTER from [DEFAULT]. Without target sections, [DEFAULT] is the
+    only target, named "default".
+    Args:
+        config: ConfigParser object.
+    Returns:
+        List of Target tuples.
+    """
+    sections = [s for s in config.sections() if s.startswith(TARGET_SECTION_PREFIX)]
+    if not sections:
+        return [make_target("default", config["DEFAULT"])]
+    return [make_target(s[len(TARGET_SECTION_PREFIX):].strip(), config[s]) for s in sections]
+
+def make_target(name, section):
+    """
+    Builds a Target from a config section.
+    Args:
+        name: Target name.
+        section: ConfigParser section proxy.
+    Returns:
+        Target tuple.
+    """
+    center = section.get("CENTER", DEFAULT_CENTER)
+    match = re.search(r"\((\d+)\)", center)
+    site_id = section.get("SITE_ID", match.group(1) if match else "")
+    return Target(name, section.get("URL"), section.get("POSTAL_CODE", DEFAULT_POSTAL_CODE), center, site_id)
@@ -0,0 +1,285 @@
+import asyncio
+import inspect
+import json
+import os
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Playwright protocol methods that evaluate JavaScript in the page.
+EVALUATE_METHODS = {"evaluateExpression", "evaluateExpressionHandle", "evalOnSelector", "evalOnSelectorAll"}
+
+# Leading parameters of Connection._send_message_to_server that the call counter relies on
+EXPECTED_SEND_PARAMETERS = ["self", "object", "method"]
+
+# Metrics of the scan running in the current task, None if metrics are disabled
+current_metrics = ContextVar("current_metrics", default=None)
+
+# Warnings already printed by warn_once
+_warnings = set()
+
+class ScanMetrics:
+    """
+    Wall time per step, Playwright calls and bytes transferred of one scan.
+    """
+    def __init__(self, name):
+        """
+        Args:
+            name: Name of the scan, e.g. the target name.
+        """
+        self.name = name
+        self.started_at = time.time()
+        self.finished_at = None
+        self.steps = {}
+        self.calls = Counter()
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.details = {}
+        self._pending = set()
+        self._context = None
+
+    def activate(self):
+        """
+        Makes these metrics the current metrics of the running task and the tasks it starts.
+        """
+        current_metrics.set(self)
+        return self
+
+    def add_step(self, name, seconds):
+        """
+        Records one run of a step.
+        Args:
+            name: Step name.
+            seconds: Wall time of the step.
+        """
+        entry = self.steps.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        entry["max_seconds"] = max(entry["max_seconds"], seconds)
+
+    def attach(self, context):
+        """
+        Counts the requests and bytes of a browser context.
+        Args:
+            context: Playwright browser context.
+        """
+        context.on("requestfinished", self._on_request_finished)
+        self._context = context
+
+    def detach(self):
+        """
+        Stops counting the requests of the attached browser context. A context reused by
+        daemon rechecks gets new metrics for every scan, so the old ones have to let go.
+        """
+        if self._context:
+            self._context.remove_listener("requestfinished", self._on_request_finished)
+            self._context = None
+
+    def _on_request_finished(self, request):
+        task = asyncio.ensure_future(self._read_sizes(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read_sizes(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.requests += 1
+        self.bytes_received += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        self.bytes_sent += sizes["requestBodySize"] + sizes["requestHeadersSize"]
+
+    async def finish(self):
+        """
+        Stops counting requests, waits for pending request sizes and stops the wall clock.
+        """
+        self.detach()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        self.finished_at = time.time()
+
+    def summary(self):
+        """
+        Returns:
+            Dict with the metrics, ready for JSON.
+        """
+        finished_at = self.finished_at or time.time()
+        return {
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_seconds": round(finished_at - self.started_at, 3),
+            "steps": {name: {k: round(v, 3) for k, v in entry.items()} for name, entry in self.steps.items()},
+            "playwright_calls": sum(self.calls.values()),
+            "evaluations": sum(n for method, n in self.calls.items() if method in EVALUATE_METHODS),
+            "calls_by_method": dict(self.calls),
+            "requests": self.requests,
+            "bytes_received": self.bytes_received,
+            "bytes_sent": self.bytes_sent,
+            **self.details,
+        }
+
+@contextmanager
+def step(name):
+    """
+    Measures the wall time of a block as a step of the current scan. Does nothing if
+    metrics are disabled.
+    Args:
+        name: Step name.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_step(name, time.perf_counter() - started)
+
+def add_bytes(received=0, sent=0):
+    """
+    Adds bytes transferred outside the browser, e.g. by the API engine, to the current scan.
+    Args:
+        received: Bytes received.
+        sent: Bytes sent.
+    """
+    metrics = current_metrics.get()
+    if metrics is not None:
+        metrics.requests += 1
+        metrics.bytes_received += received
+        metrics.bytes_sent += sent
+
+def install_call_counter():
+    """
+    Counts every Playwright protocol call against the metrics of the calling task. All
+    Playwright API calls go through Connection._send_message_to_server, one per round trip.
+    That method is private to Playwright, so the counter is only installed if its
+    signature is the expected one. Otherwise calls are not counted and a warning is
+    printed once.
+    Returns:
+        True if calls are counted.
+    """
+    try:
+        from playwright._impl._connection import Connection
+        send_message_to_server = Connection._send_message_to_server
+    except (ImportError, AttributeError) as e:
+        warn_once(f"Could not count Playwright calls: {e}")
+        return False
+    if getattr(send_message_to_server, "_counts_calls", False):
+        return True
+    try:
+        parameters = list(inspect.signature(send_message_to_server).parameters)
+    except (TypeError, ValueError):
+        parameters = []
+    if parameters[:len(EXPECTED_SEND_PARAMETERS)] != EXPECTED_SEND_PARAMETERS:
+        warn_once(f"Could not count Playwright calls: this Playwright version sends messages with "
+                  f"({', '.join(parameters)}). Playwright calls are reported as 0.")
+        return False
+
+    def counting_send_message_to_server(self, object, method, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.calls[method] += 1
+        return send_message_to_server(self, object, method, *args, **kwargs)
+
+    counting_send_message_to_server._counts_calls = True
+    Connection._send_message_to_server = counting_send_message_to_server
+    return True
+
+def warn_once(message):
+    """
+    Prints a warning the first time it occurs.
+    Args:
+        message: Warning text.
+    """
+    if message not in _warnings:
+        _warnings.add(message)
+        print(message)
+
+def escape_label_value(value):
+    """
+    Escapes a Prometheus label value: backslash, double quote and line feed.
+    Args:
+        value: Label value, converted to a string.
+    Returns:
+        Escaped string, without the surrounding quotes.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def write_json(summaries, path, peak_rss_bytes=None):
+    """
+    Writes the summaries of a run as JSON.
+    Args:
+        summaries: List of dicts as returned by ScanMetrics.summary.
+        path: Output path.
+        peak_rss_bytes: Optional peak memory of the run, see ResourceMonitor.
+    """
+    run = {"finished_at": time.time(), "scans": summaries}
+    if peak_rss_bytes:
+        run["peak_rss_bytes"] = peak_rss_bytes
+    with open(path, "w") as f:
+        json.dump(run, f, indent=2)
+
+def write_prometheus(summaries, path, peak_rss_bytes=None):
+    """
+    Writes the summaries of a run for the Prometheus node exporter textfile collector.
+    The file is replaced atomically so the collector never reads a partial file.
+    Args:
+        summaries: List of dicts as returned by ScanMetrics.summary.
+        path: Output path, should end in .prom.
+        peak_rss_bytes: Optional peak memory of the run, see ResourceMonitor.
+    """
+    lines = [
+        "# HELP autosecurite_scan_duration_seconds Wall time of the last scan.",
+        "# TYPE autosecurite_scan_duration_seconds gauge",
+        "# HELP autosecurite_scan_step_seconds Total wall time per step of the last scan.",
+        "# TYPE autosecurite_scan_step_seconds gauge",
+        "# HELP autosecurite_scan_step_count Number of runs per step of the last scan.",
+        "# TYPE autosecurite_scan_step_count gauge",
+        "# HELP autosecurite_scan_playwright_calls Playwright round trips of the last scan.",
+        "# TYPE autosecurite_scan_playwright_calls gauge",
+        "# HELP autosecurite_scan_evaluations JavaScript evaluations of the last scan.",
+        "# TYPE autosecurite_scan_evaluations gauge",
+        "# HELP autosecurite_scan_requests Network requests of the last scan.",
+        "# TYPE autosecurite_scan_requests gauge",
+        "# HELP autosecurite_scan_bytes Bytes transferred by the last scan.",
+        "# TYPE autosecurite_scan_bytes gauge",
+        "# HELP autosecurite_scan_timestamp_seconds Start of the last scan.",
+        "# TYPE autosecurite_scan_timestamp_seconds gauge",
+        "# HELP autosecurite_scan_blocked_requests Requests aborted by the resource blocker in the last scan. They are aborted before they are sent, so their size is unknown and not counted.",
+        "# TYPE autosecurite_scan_blocked_requests gauge",
+        "# HELP autosecurite_scan_allowed_requests Requests passed by the resource blocker in the last scan.",
+        "# TYPE autosecurite_scan_allowed_requests gauge",
+        "# HELP autosecurite_scan_asset_cache_requests Static requests of the last scan by asset cache result.",
+        "# TYPE autosecurite_scan_asset_cache_requests gauge",
+    ]
+    for summary in summaries:
+        target = f'target="{escape_label_value(summary["name"])}"'
+        lines.append(f'autosecurite_scan_duration_seconds{{{target}}} {summary["duration_seconds"]}')
+        for name, entry in summary["steps"].items():
+            step_label = f'step="{escape_label_value(name)}"'
+            lines.append(f'autosecurite_scan_step_seconds{{{target},{step_label}}} {entry["seconds"]}')
+            lines.append(f'autosecurite_scan_step_count{{{target},{step_label}}} {entry["count"]}')
+        lines.append(f'autosecurite_scan_playwright_calls{{{target}}} {summary["playwright_calls"]}')
+        lines.append(f'autosecurite_scan_evaluations{{{target}}} {summary["evaluations"]}')
+        lines.append(f'autosecurite_scan_requests{{{target}}} {summary["requests"]}')
+        lines.append(f'autosecurite_scan_bytes{{{target},direction="received"}} {summary["bytes_received"]}')
+        lines.append(f'autosecurite_scan_bytes{{{target},direction="sent"}} {summary["bytes_sent"]}')
+        lines.append(f'autosecurite_scan_timestamp_seconds{{{target}}} {summary["started_at"]}')
+        if "blocking" in summary:
+            blocking = summary["blocking"]
+            lines.append(f'autosecurite_scan_blocked_requests{{{target}}} {blocking["requests_blocked"]}')
+            lines.append(f'autosecurite_scan_allowed_requests{{{target}}} {blocking["requests_allowed"]}')
+        if "asset_cache" in summary:
+            for result in ("hits", "revalidated", "misses"):
+                lines.append(f'autosecurite_scan_asset_cache_requests{{{target},result="{result}"}} {summary["asset_cache"][result]}')
+    if peak_rss_bytes:
+        lines.append("# HELP autosecurite_run_peak_rss_bytes Peak resident memory of the scraper and its browser in the last run.")
+        lines.append("# TYPE autosecurite_run_peak_rss_bytes gauge")
+        lines.append(f"autosecurite_run_peak_rss_bytes {peak_rss_bytes}")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
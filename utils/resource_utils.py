@@ -0,0 +1,237 @@
+import ctypes
+import os
+import signal
+import threading
+import time
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Chromium switches for devices with about 1 GB of RAM: one renderer process without
+# site isolation, no GPU process, shared memory in /tmp instead of the small /dev/shm,
+# no background services, and a smaller JavaScript heap
+LOW_MEMORY_ARGS = [
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-software-rasterizer",
+    "--renderer-process-limit=1",
+    "--disable-site-isolation-trials",
+    "--disable-features=site-per-process,IsolateOrigins,Translate,MediaRouter,OptimizationHints",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--js-flags=--max-old-space-size=192",
+]
+
+# Defaults for the [RESOURCES] section
+DEFAULT_LOCK_PATH = "scrape.lock"
+DEFAULT_SCAN_TIMEOUT_SECONDS = 300
+
+# Time the scan gets to clean up after its budget ran out, before the browser is killed
+KILL_GRACE_SECONDS = 30
+
+# Names of the browser processes started by Playwright
+BROWSER_PROCESS_NAMES = ("chrome", "chromium", "headless_shell")
+
+PR_SET_CHILD_SUBREAPER = 36
+
+def get_child_pids(pid):
+    """
+    Args:
+        pid: Process ID.
+    Returns:
+        List of the IDs of all descendants of the process, read from /proc.
+    """
+    if not os.path.isdir("/proc"):
+        return []
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The name in brackets may contain spaces, the parent ID is the second field after it
+        parent = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(parent, []).append(int(entry))
+    result = []
+    pending = [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            result.append(child)
+            pending.append(child)
+    return result
+
+def get_process_name(pid):
+    """
+    Args:
+        pid: Process ID.
+    Returns:
+        Name of the process, or "" if it is gone.
+    """
+    try:
+        with open(f"/proc/{pid}/comm") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+def get_rss_bytes(pids):
+    """
+    Args:
+        pids: Iterable of process IDs.
+    Returns:
+        Sum of the resident memory of the processes in bytes.
+    """
+    total = 0
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total
+
+def find_browser_pids(pid=None):
+    """
+    Args:
+        pid: Optional root process ID, defaults to this process.
+    Returns:
+        List of the IDs of the browser processes below the root process.
+    """
+    return [child for child in get_child_pids(pid or os.getpid())
+            if get_process_name(child).lower().startswith(BROWSER_PROCESS_NAMES)]
+
+def become_subreaper():
+    """
+    Makes this process adopt the orphans of its descendants, so killed browser processes
+    whose parent is gone can be reaped here instead of staying zombies. Linux only.
+    Returns:
+        True on success.
+    """
+    try:
+        return ctypes.CDLL(None, use_errno=True).prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0) == 0
+    except (OSError, AttributeError):
+        return False
+
+def kill_processes(pids):
+    """
+    Kills processes and reaps the ones that are children of this process.
+    Args:
+        pids: List of process IDs.
+    Returns:
+        List of the IDs of the processes that were killed.
+    """
+    killed = []
+    for pid in pids:
+        try:
+            os.kill(pid, signal.SIGKILL)
+            killed.append(pid)
+        except ProcessLookupError:
+            continue
+        except PermissionError as e:
+            print(f"Could not kill process {pid}: {e}")
+    for pid in killed:
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            pass
+    return killed
+
+class ResourceMonitor:
+    """
+    Watches the processes of a run from a background thread: samples the resident memory
+    of this process and its descendants, and kills the browser if the run is still going
+    after its time budget and grace period.
+    """
+    def __init__(self, budget_seconds=None, sample_seconds=1.0, grace_seconds=KILL_GRACE_SECONDS):
+        """
+        Args:
+            budget_seconds: Optional time budget of the run, no browser is killed without.
+            sample_seconds: Interval of the memory samples.
+            grace_seconds: Time after the budget before the browser is killed.
+        """
+        self.budget_seconds = budget_seconds
+        self.sample_seconds = sample_seconds
+        self.grace_seconds = grace_seconds
+        self.peak_rss_bytes = 0
+        self.killed = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.sample()
+
+    def sample(self):
+        """
+        Updates the peak with the current memory of this process and its descendants.
+        """
+        pid = os.getpid()
+        self.peak_rss_bytes = max(self.peak_rss_bytes, get_rss_bytes([pid] + get_child_pids(pid)))
+
+    def _run(self):
+        deadline = time.monotonic() + self.budget_seconds + self.grace_seconds if self.budget_seconds else None
+        while not self._stop.wait(self.sample_seconds):
+            self.sample()
+            if deadline and time.monotonic() > deadline:
+                # Browser processes orphaned by the kill are reaped here, not left as zombies
+                # in containers whose init does not reap
+                become_subreaper()
+                self.killed = kill_processes(find_browser_pids())
+                print(f"Run exceeded its budget of {self.budget_seconds:.0f} s, killed {len(self.killed)} browser processes.")
+                deadline = None
+
+class OverlapLock:
+    """
+    Exclusive lock on a file, so that only one scan runs at a time. The operating system
+    releases it when the process ends, also if it is killed.
+    """
+    def __init__(self, path=DEFAULT_LOCK_PATH):
+        """
+        Args:
+            path: Path of the lock file.
+        """
+        self.path = path
+        self.file = None
+
+    def acquire(self):
+        """
+        Returns:
+            True if the lock was taken, False if another process holds it.
+        """
+        self.file = open(self.path, "a+")
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self.file.close()
+            self.file = None
+            return False
+        self.file.seek(0)
+        self.file.truncate()
+        self.file.write(str(os.getpid()))
+        self.file.flush()
+        return True
+
+    def release(self):
+        """
+        Releases the lock if it is held.
+        """
+        if self.file:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,214 @@
+import asyncio
+import re
+from datetime import datetime, date
+from zoneinfo import ZoneInfo
+
+# Keys under which the portal's JSON responses carry the start of an offer or the day of an availability.
+DATETIME_KEYS = ("startDateTime", "startTime", "start", "dateTime", "datetime", "date", "day")
+TIME_KEYS = ("time", "hour", "startHour")
+LANGUAGE_KEYS = ("language", "languages", "lang", "languageCode", "languageCodes")
+PORTAL_TIMEZONE = ZoneInfo("Europe/Brussels")
+
+# Keys of the lists whose entries are availabilities or offers, including generic wrappers
+# such as {"data": [...]}, and keys of the booking itself, whose appointment must never be
+# taken for a free slot.
+LIST_KEY_PATTERN = re.compile(r"availabilit|offer|slot|day|date|time|data|items|results|content", re.IGNORECASE)
+BOOKING_KEY_PATTERN = re.compile(r"booking|reservation|appointment|scheduled|current", re.IGNORECASE)
+
+def parse_portal_datetime(value):
+    """
+    Parses an ISO date or datetime string as sent by the portal.
+    Args:
+        value: String, e.g. "2025-10-14T08:30:00Z" or "2025-10-14".
+    Returns:
+        Naive datetime in portal local time, date if value has no time part, or None.
+    """
+    if not isinstance(value, str) or not re.match(r"\d{4}-\d{2}-\d{2}", value):
+        return None
+    if len(value) == 10:
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if dt.tzinfo:
+        dt = dt.astimezone(PORTAL_TIMEZONE).replace(tzinfo=None)
+    return dt.replace(second=0, microsecond=0)
+
+def get_languages(entry):
+    """
+    Returns the exam languages of an offer entry.
+    Args:
+        entry: Dict from a JSON response.
+    Returns:
+        Set of lower case two letter language codes, empty if the entry has none.
+    """
+    for key in LANGUAGE_KEYS:
+        value = entry.get(key)
+        if value is None:
+            continue
+        values = value if isinstance(value, list) else [value]
+        return set(str(v.get("code", "") if isinstance(v, dict) else v).lower()[:2] for v in values)
+    return set()
+
+def extract_slots(payload, date_languages=None):
+    """
+    Walks a JSON payload and collects offer start times and days with availability. Only
+    entries of availability or offer lists count: items of a top-level list, or of a list
+    under a key matching LIST_KEY_PATTERN. A top-level object, e.g. the booking resource
+    with its appointment, and anything under a key matching BOOKING_KEY_PATTERN are not
+    taken as slots.
+    Args:
+        payload: Decoded JSON response.
+        date_languages: Optional list of language codes, e.g. ["de", "fr"]. Offers that
+            carry language information but none of these languages are skipped.
+    Returns:
+        Tuple (slots, days): set of datetime objects with a time, and set of date objects
+        that were listed without a time.
+    """
+    slots = set()
+    days = set()
+    # Each node comes with whether it is an entry of an availability or offer list
+    stack = [(payload, isinstance(payload, list))]
+    while stack:
+        node, listed = stack.pop()
+        if isinstance(node, list):
+            stack.extend((item, listed) for item in node)
+            continue
+        if not isinstance(node, dict):
+            continue
+        for key, value in node.items():
+            if isinstance(value, (dict, list)) and not BOOKING_KEY_PATTERN.search(key):
+                stack.append((value, isinstance(value, list) and bool(LIST_KEY_PATTERN.search(key))))
+        if not listed:
+            continue
+
+        languages = get_languages(node)
+        if date_languages and languages and not languages & set(date_languages):
+            continue
+        value = parse_entry(node)
+        if isinstance(value, datetime):
+            slots.add(value)
+        elif value is not None:
+            days.add(value)
+    return slots, days
+
+def parse_entry(entry):
+    """
+    Args:
+        entry: Dict from a JSON response.
+    Returns:
+        Start of the entry as datetime, its day as date if it has no time, or None.
+    """
+    for key in DATETIME_KEYS:
+        value = parse_portal_datetime(entry.get(key))
+        if value is None:
+            continue
+        if isinstance(value, datetime):
+            return value
+        time_text = next((entry[k] for k in TIME_KEYS if isinstance(entry.get(k), str)), None)
+        match = re.match(r"(\d{1,2}):(\d{2})", time_text or "")
+        if match:
+            return datetime(value.year, value.month, value.day, int(match.group(1)), int(match.group(2)))
+        return value
+    return None
+
+def extract_booked_date(payload):
+    """
+    Walks the booking resource and returns the start of the booked offer. Lists, e.g.
+    opening hours of the site, are not looked into: the booking has a single offer.
+    Args:
+        payload: Decoded JSON response of the booking endpoint.
+    Returns:
+        Earliest datetime with a time in the payload, or None.
+    """
+    found = []
+    stack = [payload]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(v for v in node.values() if isinstance(v, dict))
+            value = parse_entry(node)
+            if isinstance(value, datetime):
+                found.append(value)
+    return min(found) if found else None
+
+class SlotResponseCollector:
+    """
+    Collects the JSON responses of the availability endpoints while a page walks the booking flow.
+    """
+    def __init__(self, url_pattern):
+        """
+        Args:
+            url_pattern: Regular expression matched against response URLs.
+        """
+        self.url_pattern = re.compile(url_pattern, re.IGNORECASE)
+        self.payloads = []
+        self.matched = 0
+        self._pending = set()
+
+    def attach(self, page):
+        """
+        Starts listening to the responses of a page. Call before page.goto.
+        Args:
+            page: Playwright page object.
+        """
+        page.on("response", self._on_response)
+
+    def clear(self):
+        """
+        Forgets the responses collected so far, e.g. before a recheck on the same page.
+        """
+        self.payloads.clear()
+        self.matched = 0
+
+    def matches(self, response):
+        """
+        Args:
+            response: Playwright response object.
+        Returns:
+            True if the response comes from an availability endpoint.
+        """
+        return bool(self.url_pattern.search(response.url))
+
+    def _on_response(self, response):
+        if not self.matches(response):
+            return
+        self.matched += 1
+        if "json" not in response.headers.get("content-type", ""):
+            return
+        task = asyncio.ensure_future(self._read(response))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read(self, response):
+        try:
+            self.payloads.append(await response.json())
+        except Exception as e:
+            print(f"Could not read availability response {response.url}: {e}")
+
+    async def drain(self):
+        """
+        Waits until all matched responses have been read.
+        """
+        while self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    def slots(self, date_languages=None):
+        """
+        Returns the offers found in all collected responses.
+        Args:
+            date_languages: Optional list of language codes to filter offers.
+        Returns:
+            Tuple (slots, days) as returned by extract_slots, merged over all responses.
+        """
+        slots = set()
+        days = set()
+        for payload in self.payloads:
+            payload_slots, payload_days = extract_slots(payload, date_languages)
+            slots |= payload_slots
+            days |= payload_days
+        return slots, days
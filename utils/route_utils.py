@@ -0,0 +1,126 @@
+import asyncio
+import re
+from collections import Counter
+
+# Defaults of the [BLOCKING] section. Stylesheets and scripts are needed by the booking flow:
+# the Angular app is built from scripts, and the visibility checks depend on the styles.
+DEFAULT_BLOCKED_RESOURCE_TYPES = ["image", "media", "font"]
+DEFAULT_BLOCKED_URL_PATTERNS = [
+    r"google-analytics\.com", r"googletagmanager\.com", r"doubleclick\.net",
+    r"hotjar\.com", r"connect\.facebook\.net", r"clarity\.ms",
+]
+
+def split_list(value):
+    """
+    Splits a comma separated config value.
+    Args:
+        value: String, e.g. "image, media, font".
+    Returns:
+        List of non-empty stripped strings.
+    """
+    return [item.strip() for item in (value or "").split(",") if item.strip()]
+
+class ResourceBlocker:
+    """
+    Aborts requests the scraper does not need and counts requests and bytes per resource type.
+    """
+    def __init__(self, blocked_types=None, blocked_patterns=None, allowed_patterns=None):
+        """
+        Args:
+            blocked_types: Playwright resource types to block, e.g. ["image", "font"].
+            blocked_patterns: Regular expressions of URLs to block regardless of type.
+            allowed_patterns: Regular expressions of URLs that are never blocked.
+        """
+        self.blocked_types = set(DEFAULT_BLOCKED_RESOURCE_TYPES if blocked_types is None else blocked_types)
+        self.blocked_patterns = [re.compile(p, re.IGNORECASE) for p in
+                                 (DEFAULT_BLOCKED_URL_PATTERNS if blocked_patterns is None else blocked_patterns)]
+        self.allowed_patterns = [re.compile(p, re.IGNORECASE) for p in (allowed_patterns or [])]
+        self._pending = set()
+        self.reset()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a blocker from the [BLOCKING] section.
+        Args:
+            config: ConfigParser object.
+        Returns:
+            ResourceBlocker, or None if blocking is disabled.
+        """
+        if not config.getboolean("BLOCKING", "ENABLED", fallback=False):
+            return None
+        section = config["BLOCKING"]
+        return cls(
+            split_list(section.get("RESOURCE_TYPES")) if "RESOURCE_TYPES" in section else None,
+            split_list(section.get("BLOCK_PATTERNS")) if "BLOCK_PATTERNS" in section else None,
+            split_list(section.get("ALLOW_PATTERNS")),
+        )
+
+    def reset(self):
+        """
+        Resets the counters, e.g. at the start of a scan on a reused context.
+        """
+        self.blocked = Counter()
+        self.allowed = Counter()
+        self.bytes_allowed = Counter()
+
+    def should_block(self, resource_type, url):
+        """
+        Args:
+            resource_type: Playwright resource type, e.g. "image".
+            url: Request URL.
+        Returns:
+            True if the request should be aborted.
+        """
+        if any(p.search(url) for p in self.allowed_patterns):
+            return False
+        return resource_type in self.blocked_types or any(p.search(url) for p in self.blocked_patterns)
+
+    async def attach(self, context):
+        """
+        Routes all requests of a browser context through the blocker.
+        Args:
+            context: Playwright browser context.
+        """
+        await context.route("**/*", self._handle_route)
+        context.on("requestfinished", self._on_request_finished)
+
+    async def _handle_route(self, route):
+        request = route.request
+        if self.should_block(request.resource_type, request.url):
+            self.blocked[request.resource_type] += 1
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed[request.resource_type] += 1
+            await route.fallback()
+
+    def _on_request_finished(self, request):
+        task = asyncio.ensure_future(self._read_sizes(request))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _read_sizes(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            return
+        self.bytes_allowed[request.resource_type] += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+
+    async def summary(self):
+        """
+        Returns:
+            Dict with the number of blocked and allowed requests and the bytes received for
+            allowed requests, in total and per resource type. Blocked requests are aborted
+            before they are sent, so the bytes they would have cost are unknown and there
+            is no bytes_blocked.
+        """
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        return {
+            "requests_blocked": sum(self.blocked.values()),
+            "requests_allowed": sum(self.allowed.values()),
+            "bytes_allowed": sum(self.bytes_allowed.values()),
+            "blocked_by_type": dict(self.blocked),
+            "allowed_by_type": dict(self.allowed),
+            "bytes_allowed_by_type": dict(self.bytes_allowed),
+        }
@@ -0,0 +1,178 @@
+import json
+import random
+import sqlite3
+from collections import namedtuple
+from datetime import datetime, timedelta
+from utils.storage_utils import get_churn_stats, count_appeared_since
+
+# Defaults for the adaptive interval of the [DAEMON] section
+DEFAULT_MIN_INTERVAL_SECONDS = 60
+DEFAULT_MAX_INTERVAL_SECONDS = 1800
+DEFAULT_HISTORY_DAYS = 28
+
+# A weekday and hour needs checks on this many days before its history is trusted
+MIN_DAYS_OBSERVED = 3
+
+# Checks are spaced so that about this many slots appear between two of them
+SLOTS_PER_CHECK = 0.5
+
+# and so that a slot of average lifetime is seen at least twice
+LIFETIME_FRACTION = 0.5
+
+# After a check found new slots, the interval is shortened by this factor, as freed
+# slots tend to come in bursts
+BURST_FACTOR = 0.5
+
+WEEKDAY_NAMES = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Outcome of AdaptiveScheduler.decide: delay until the next check including jitter, the
+# interval before jitter, the slots per hour and average slot lifetime it is based on, the
+# slots that appeared since the last decision and the reason as text.
+Decision = namedtuple("Decision", ["delay", "interval", "rate_per_hour", "lifetime_seconds", "new_slots", "reason"])
+
+class AdaptiveScheduler:
+    """
+    Chooses the delay between daemon checks from the availability history. Hours of the
+    week in which slots often appear, or disappear quickly, are checked more often, quiet
+    hours less often, always within the floor and ceiling.
+    """
+    def __init__(self, base_interval, min_interval=DEFAULT_MIN_INTERVAL_SECONDS,
+                 max_interval=DEFAULT_MAX_INTERVAL_SECONDS, jitter=0, history_days=DEFAULT_HISTORY_DAYS,
+                 db_path=None, log_path=None, rng=None):
+        """
+        Args:
+            base_interval: Interval used while there is not enough history.
+            min_interval: Hard floor of the delay, whatever the history says.
+            max_interval: Longest interval.
+            jitter: Random extra delay, 0 to jitter seconds.
+            history_days: Days of history taken into account.
+            db_path: Optional path of the availability database.
+            log_path: Optional path of a JSON lines file every decision is appended to.
+            rng: Optional random.Random for the jitter.
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.jitter = jitter
+        self.history_days = history_days
+        self.db_path = db_path
+        self.log_path = log_path
+        self.rng = rng or random.Random()
+        self.last_decision_at = None
+
+    @classmethod
+    def from_config(cls, config, base_interval, jitter):
+        """
+        Creates a scheduler from the [DAEMON] section.
+        Args:
+            config: ConfigParser object.
+            base_interval: INTERVAL_SECONDS.
+            jitter: JITTER_SECONDS.
+        Returns:
+            AdaptiveScheduler, or None if ADAPTIVE is disabled.
+        """
+        if not config.getboolean("DAEMON", "ADAPTIVE", fallback=False):
+            return None
+        section = config["DAEMON"]
+        return cls(
+            base_interval,
+            min_interval=section.getfloat("MIN_INTERVAL_SECONDS", fallback=DEFAULT_MIN_INTERVAL_SECONDS),
+            max_interval=section.getfloat("MAX_INTERVAL_SECONDS", fallback=DEFAULT_MAX_INTERVAL_SECONDS),
+            jitter=jitter,
+            history_days=section.getint("HISTORY_DAYS", fallback=DEFAULT_HISTORY_DAYS),
+            db_path=config.get("STORAGE", "DB_PATH", fallback=None),
+            log_path=section.get("DECISION_LOG", "") or None,
+        )
+
+    def bucket_stats(self, stats, weekday, hour):
+        """
+        Returns the history of one hour of the week. An hour with too few observations
+        falls back to the same hour on all weekdays.
+        Args:
+            stats: Dict as returned by get_churn_stats.
+            weekday: Weekday, Monday is 0.
+            hour: Hour of the day.
+        Returns:
+            Tuple (rate_per_hour, lifetime_seconds, source), or None if the history is too
+            short. source describes the hours the figures are taken from.
+        """
+        days, appeared, lifetime = stats.get((weekday, hour), (0, 0, None))
+        source = f"{WEEKDAY_NAMES[weekday]} {hour:02d}h"
+        if days < MIN_DAYS_OBSERVED:
+            same_hour = [stats[(day, hour)] for day in range(7) if (day, hour) in stats]
+            days = sum(entry[0] for entry in same_hour)
+            appeared = sum(entry[1] for entry in same_hour)
+            lifetimes = [entry[2] for entry in same_hour if entry[2] is not None]
+            lifetime = sum(lifetimes) / len(lifetimes) if lifetimes else None
+            source = f"all days {hour:02d}h"
+            if days < MIN_DAYS_OBSERVED:
+                return None
+        return appeared / days, lifetime, source
+
+    def interval_for(self, stats, now, new_slots=0):
+        """
+        Args:
+            stats: Dict as returned by get_churn_stats.
+            now: Time of the decision.
+            new_slots: Number of slots that appeared since the last decision.
+        Returns:
+            Decision without jitter, delay equals interval.
+        """
+        figures = self.bucket_stats(stats, now.weekday(), now.hour)
+        if figures is None:
+            interval, rate, lifetime, reason = self.base_interval, None, None, "not enough history"
+        else:
+            rate, lifetime, source = figures
+            if rate == 0:
+                interval, reason = self.max_interval, f"no slots appeared on {source}"
+            else:
+                interval = 3600 * SLOTS_PER_CHECK / rate
+                reason = f"{rate:.2f} slots/h on {source}"
+                if lifetime is not None and lifetime * LIFETIME_FRACTION < interval:
+                    interval = lifetime * LIFETIME_FRACTION
+                    reason += f", slots last {lifetime / 60:.0f} min"
+        if new_slots:
+            interval *= BURST_FACTOR
+            reason += f", {new_slots} new slots in the last check"
+        interval = min(max(interval, self.min_interval), self.max_interval)
+        return Decision(interval, interval, rate, lifetime, new_slots, reason)
+
+    def decide(self, now=None):
+        """
+        Chooses the delay until the next check from the history, logs the decision and
+        appends it to the decision log.
+        Args:
+            now: Optional current time, defaults to now.
+        Returns:
+            Decision.
+        """
+        now = now or datetime.now()
+        try:
+            stats = get_churn_stats(now - timedelta(days=self.history_days), self.db_path)
+            new_slots = count_appeared_since(self.last_decision_at, self.db_path) if self.last_decision_at else 0
+        except sqlite3.Error as e:
+            print(f"Could not read the availability history: {e}")
+            stats, new_slots = {}, 0
+        self.last_decision_at = now
+        decision = self.interval_for(stats, now, new_slots)
+        decision = decision._replace(delay=decision.interval + self.rng.uniform(0, self.jitter))
+        print(f"Next check in {decision.delay:.0f} s ({decision.reason}).")
+        if self.log_path:
+            self.log(decision, now)
+        return decision
+
+    def log(self, decision, now):
+        """
+        Appends a decision to the decision log, with the checks per hour it costs and the
+        average time a slot appearing now waits until it is found.
+        Args:
+            decision: Decision.
+            now: Time of the decision.
+        """
+        entry = dict(decision._asdict(), at=now.isoformat(), checks_per_hour=round(3600 / decision.delay, 2),
+                     expected_latency_seconds=round(decision.delay / 2, 1))
+        try:
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        except OSError as e:
+            print(f"Could not write scheduling decision to {self.log_path}: {e}")
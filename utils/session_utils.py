@@ -0,0 +1,81 @@
+import json
+import os
+import re
+from datetime import datetime, timedelta
+SESSION_DIR = "sessions"
+
+def get_session_path(target, directory=None):
+    """
+    Returns the file the session of a target is stored in.
+    Args:
+        target: Target name.
+        directory: Optional directory, defaults to SESSION_DIR.
+    Returns:
+        Path string.
+    """
+    return os.path.join(directory or SESSION_DIR, re.sub(r"[^A-Za-z0-9_-]+", "_", target) + ".json")
+
+def load_session(target, booking_url, max_age_hours, directory=None):
+    """
+    Loads the saved session of a target if it is recent and belongs to the same booking.
+    Args:
+        target: Target name.
+        booking_url: Booking URL the session has to belong to.
+        max_age_hours: Maximum age of the session.
+        directory: Optional directory, defaults to SESSION_DIR.
+    Returns:
+        Dict with "calendar_url", "storage_state" and "scheduled_date" (datetime or None),
+        or None if there is no usable session.
+    """
+    path = get_session_path(target, directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            session = json.load(f)
+        saved_at = datetime.fromisoformat(session["saved_at"])
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Could not load session {path}: {e}")
+        return None
+    if session.get("booking_url") != booking_url or datetime.now() - saved_at > timedelta(hours=max_age_hours):
+        return None
+    scheduled_date = session.get("scheduled_date")
+    session["scheduled_date"] = datetime.fromisoformat(scheduled_date) if scheduled_date else None
+    return session
+
+def save_session(target, booking_url, calendar_url, storage_state, scheduled_date=None, directory=None):
+    """
+    Saves the storage state and the calendar route of a target. The file holds the session
+    cookies, so it is only readable by the owner.
+    Args:
+        target: Target name.
+        booking_url: Booking URL the session belongs to.
+        calendar_url: URL of the center's calendar.
+        storage_state: Dict as returned by BrowserContext.storage_state.
+        scheduled_date: Optional currently scheduled datetime.
+        directory: Optional directory, defaults to SESSION_DIR.
+    """
+    path = get_session_path(target, directory)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    session = {
+        "saved_at": datetime.now().isoformat(),
+        "booking_url": booking_url,
+        "calendar_url": calendar_url,
+        "scheduled_date": scheduled_date.isoformat() if scheduled_date else None,
+        "storage_state": storage_state,
+    }
+    tmp_path = path + ".tmp"
+    with open(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as f:
+        json.dump(session, f)
+    os.replace(tmp_path, path)
+
+def clear_session(target, directory=None):
+    """
+    Deletes the saved session of a target, e.g. after the shortcut failed.
+    Args:
+        target: Target name.
+        directory: Optional directory, defaults to SESSION_DIR.
+    """
+    path = get_session_path(target, directory)
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,210 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, unquote
+
+# Defaults for the [SERVER] section
+DEFAULT_SNAPSHOT_PATH = "snapshot.json"
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+def load_snapshot(path):
+    """
+    Args:
+        path: Path of the snapshot file.
+    Returns:
+        Dict with "updated_at" and "targets", empty if there is no readable snapshot.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"updated_at": None, "targets": {}}
+
+def update_snapshot(path, target, center, available_dates, scheduled_date, scanned_until=None, now=None):
+    """
+    Replaces the entry of a target in the snapshot file with the result of a scan. The
+    file is replaced atomically, so a server never reads a partial snapshot.
+    Args:
+        path: Path of the snapshot file.
+        target: Target name.
+        center: Test center of the target.
+        available_dates: List of datetime objects.
+        scheduled_date: Currently scheduled datetime or None.
+        scanned_until: Optional datetime from which on the calendar was not read.
+        now: Optional time of the scan, defaults to now.
+    """
+    scanned_at = (now or datetime.now()).isoformat(timespec="seconds")
+    snapshot = load_snapshot(path)
+    snapshot["updated_at"] = scanned_at
+    snapshot["targets"][target] = {
+        "center": center,
+        "scanned_at": scanned_at,
+        "scheduled_date": scheduled_date.isoformat() if scheduled_date else None,
+        "available_dates": [dt.isoformat() for dt in sorted(set(available_dates))],
+        "scanned_until": scanned_until.isoformat() if scanned_until else None,
+    }
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def make_etag(body):
+    """
+    Args:
+        body: Response body bytes.
+    Returns:
+        Strong ETag header value.
+    """
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+def etag_matches(if_none_match, etag):
+    """
+    Args:
+        if_none_match: Value of the If-None-Match header or None.
+        etag: Current ETag.
+    Returns:
+        True if the client's copy is current, compared weakly as required for GET.
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+class SnapshotServer:
+    """
+    Read-only HTTP server for the snapshot file written by the scanner. The file is read
+    again only when it changed, so clients can poll as often as they like without any load
+    on the portal.
+
+    GET /snapshot returns the snapshot of all targets, GET /targets/<name> the entry of
+    one target. Responses carry an ETag, and a request whose If-None-Match matches it is
+    answered with 304 Not Modified.
+    """
+    def __init__(self, path=DEFAULT_SNAPSHOT_PATH, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """
+        Args:
+            path: Path of the snapshot file.
+            host: Address to listen on.
+            port: Port to listen on, 0 for any free port.
+        """
+        self.path = path
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+        self._lock = threading.Lock()
+        self._stat = None
+        self._snapshot = None
+        self._bodies = {}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a server from the [SERVER] section.
+        Args:
+            config: ConfigParser object.
+        Returns:
+            SnapshotServer, or None if the server is disabled.
+        """
+        if not config.getboolean("SERVER", "ENABLED", fallback=False):
+            return None
+        section = config["SERVER"]
+        return cls(section.get("SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH), section.get("HOST", DEFAULT_HOST),
+                   section.getint("PORT", fallback=DEFAULT_PORT))
+
+    def get(self, key):
+        """
+        Args:
+            key: None for the whole snapshot, or a target name.
+        Returns:
+            Tuple (body, etag), or None for an unknown target.
+        """
+        try:
+            stat = os.stat(self.path)
+            stat = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stat = None
+        with self._lock:
+            if stat != self._stat or self._snapshot is None:
+                self._snapshot = load_snapshot(self.path)
+                self._stat = stat
+                self._bodies = {}
+            if key not in self._bodies:
+                if key is None:
+                    data = self._snapshot
+                elif key in self._snapshot["targets"]:
+                    data = dict(self._snapshot["targets"][key], target=key)
+                else:
+                    return None
+                body = json.dumps(data, indent=2, sort_keys=True).encode()
+                self._bodies[key] = (body, make_etag(body))
+            return self._bodies[key]
+
+    def start(self):
+        """
+        Serves in a background thread.
+        Returns:
+            self.
+        """
+        self.server = ThreadingHTTPServer((self.host, self.port), SnapshotHandler)
+        self.server.daemon_threads = True
+        self.server.snapshots = self
+        self.port = self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Serving the latest scan on http://{self.host}:{self.port}/snapshot")
+        return self
+
+    def stop(self):
+        """
+        Stops the server started by start.
+        """
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+class SnapshotHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def do_POST(self):
+        self.send_error(405)
+
+    do_PUT = do_DELETE = do_PATCH = do_POST
+
+    def respond(self, send_body):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path in ("", "/snapshot"):
+            response = self.server.snapshots.get(None)
+        elif path.startswith("/targets/"):
+            response = self.server.snapshots.get(unquote(path[len("/targets/"):]))
+        else:
+            response = None
+        if response is None:
+            return self.send_error(404)
+        body, etag = response
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
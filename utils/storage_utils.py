@@ -1,24 +1,306 @@
 import json
 import os
-from datetime import datetime
+import sqlite3
+from datetime import datetime, timedelta
+DB_PATH = "availability.db"
+
+# File the slots of the last run were kept in before the database
 LAST_DATES_PATH = "last_dates.json"
 
-def load_last_dates():
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    run_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_target ON runs (target, id);
+CREATE TABLE IF NOT EXISTS slots (
+    target TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    appeared_at TEXT NOT NULL,
+    appeared_run INTEGER NOT NULL,
+    last_run INTEGER NOT NULL,
+    PRIMARY KEY (target, slot)
+);
+CREATE INDEX IF NOT EXISTS slots_appeared ON slots (target, appeared_run, slot);
+CREATE INDEX IF NOT EXISTS slots_last_seen ON slots (last_seen);
+CREATE TABLE IF NOT EXISTS rebookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    target TEXT NOT NULL,
+    attempted_at TEXT NOT NULL,
+    slot TEXT NOT NULL,
+    previous_slot TEXT,
+    outcome TEXT NOT NULL,
+    seconds REAL,
+    detail TEXT
+);
+"""
+
+def connect(path=None):
     """
-    Loads last known dates from LAST_DATES_PATH.
+    Opens the availability database and creates the tables if needed. WAL mode and a busy
+    timeout let several scanners write to the same database.
+    Args:
+        path: Optional database path, defaults to DB_PATH.
     Returns:
-        Set of datetime objects.
+        sqlite3.Connection.
     """
-    if os.path.exists(LAST_DATES_PATH):
-        with open(LAST_DATES_PATH, "r") as f:
-            return set(datetime.fromisoformat(dtstr) for dtstr in json.load(f))
-    return set()
+    conn = sqlite3.connect(path or DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    return conn
 
-def save_current_dates(dates):
+def record_scan(dates, target="default", now=None, path=None, scanned_until=None):
     """
-    Saves current dates to LAST_DATES_PATH.
+    Records the slots found by a scan. Slots not seen in the previous run of the target,
+    including slots that disappeared and came back, count as appeared in this run. The
+    previous run is read in the same write transaction, so concurrent scanners of the
+    same target cannot both build on it.
     Args:
         dates: Iterable of datetime objects.
+        target: Target name.
+        now: Optional time of the scan, defaults to now.
+        path: Optional database path.
+        scanned_until: Optional datetime up to which the calendar was read, for scans that
+            stopped early. Slots of the previous run from then on are carried over unchanged.
+    Returns:
+        ID of the run, for get_new_dates.
+    """
+    seen_at = (now or datetime.now()).isoformat()
+    conn = connect(path)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT MAX(id) FROM runs WHERE target = ?", (target,)).fetchone()
+            previous_run = row[0] if row[0] is not None else -1
+            run_id = conn.execute("INSERT INTO runs (target, run_at) VALUES (?, ?)", (target, seen_at)).lastrowid
+            conn.executemany(
+                """
+                INSERT INTO slots (target, slot, first_seen, last_seen, appeared_at, appeared_run, last_run)
+                VALUES (:target, :slot, :seen_at, :seen_at, :seen_at, :run_id, :run_id)
+                ON CONFLICT (target, slot) DO UPDATE SET
+                    appeared_at = CASE WHEN slots.last_run = :previous_run THEN slots.appeared_at ELSE excluded.appeared_at END,
+                    appeared_run = CASE WHEN slots.last_run = :previous_run THEN slots.appeared_run ELSE excluded.appeared_run END,
+                    last_seen = excluded.last_seen,
+                    last_run = excluded.last_run
+                """,
+                [{"target": target, "slot": dt.isoformat(), "seen_at": seen_at, "run_id": run_id,
+                  "previous_run": previous_run} for dt in set(dates)]
+            )
+            if scanned_until is not None:
+                conn.execute(
+                    "UPDATE slots SET last_run = ? WHERE target = ? AND last_run = ? AND slot >= ?",
+                    (run_id, target, previous_run, scanned_until.isoformat())
+                )
+        return run_id
+    finally:
+        conn.close()
+
+def import_last_dates(json_path=LAST_DATES_PATH, target="default", path=None):
+    """
+    Imports the slots of last_dates.json, written by earlier versions, as a run of the
+    target, so the first run after the upgrade does not report all of them as new. The
+    file is renamed to json_path + ".imported" afterwards. If the target already has
+    runs, nothing is imported.
+    Args:
+        json_path: Path of the old file.
+        target: Target the old file belongs to.
+        path: Optional database path.
+    Returns:
+        Number of slots imported, or None if there was no file to import.
+    """
+    if not os.path.exists(json_path):
+        return None
+    try:
+        with open(json_path, "r") as f:
+            dates = [datetime.fromisoformat(value) for value in json.load(f)]
+    except (OSError, ValueError, TypeError) as e:
+        print(f"Could not import {json_path}: {e}")
+        return None
+    conn = connect(path)
+    try:
+        has_runs = conn.execute("SELECT 1 FROM runs WHERE target = ? LIMIT 1", (target,)).fetchone() is not None
+    finally:
+        conn.close()
+    if not has_runs:
+        record_scan(dates, target, now=datetime.fromtimestamp(os.path.getmtime(json_path)), path=path)
+    os.replace(json_path, json_path + ".imported")
+    return 0 if has_runs else len(dates)
+
+def get_new_dates(run_id, target="default", earlier_than=None, path=None):
+    """
+    Returns the slots that appeared in a run, i.e. were not seen in the run before.
+    Args:
+        run_id: Run ID as returned by record_scan.
+        target: Target name.
+        earlier_than: Optional datetime, only slots before it are returned.
+        path: Optional database path.
+    Returns:
+        Sorted list of datetime objects.
+    """
+    query = "SELECT slot FROM slots WHERE target = ? AND appeared_run = ?"
+    params = [target, run_id]
+    if earlier_than:
+        query += " AND slot < ?"
+        params.append(earlier_than.isoformat())
+    conn = connect(path)
+    try:
+        return [datetime.fromisoformat(row[0]) for row in conn.execute(query + " ORDER BY slot", params)]
+    finally:
+        conn.close()
+
+def get_last_dates(target="default", path=None):
+    """
+    Returns the slots seen in the latest run of a target.
+    Args:
+        target: Target name.
+        path: Optional database path.
+    Returns:
+        Set of datetime objects.
+    """
+    conn = connect(path)
+    try:
+        rows = conn.execute(
+            "SELECT slot FROM slots WHERE target = ? AND last_run = (SELECT MAX(id) FROM runs WHERE target = ?)",
+            (target, target)
+        )
+        return set(datetime.fromisoformat(row[0]) for row in rows)
+    finally:
+        conn.close()
+
+def get_churn_stats(since, path=None):
+    """
+    Summarizes the history by weekday and hour of the day: on how many days checks ran in
+    that hour, how many slots appeared in it and how long they stayed, from the check that
+    found a slot to the first check that did not. Slots of the first run of a target are not
+    counted as appeared, and slots that disappeared because their day came not as taken.
+    Args:
+        since: datetime, older runs and slots are ignored.
+        path: Optional database path.
+    Returns:
+        Dict of (weekday, hour) to (days, appeared, lifetime_seconds) tuples. Monday is
+        weekday 0, lifetime_seconds is the average or None if no slot has disappeared yet.
+    """
+    conn = connect(path)
+    try:
+        stats = {}
+        rows = conn.execute(
+            """
+            SELECT CAST(strftime('%w', run_at) AS INTEGER), CAST(strftime('%H', run_at) AS INTEGER),
+                   COUNT(DISTINCT date(run_at))
+            FROM runs WHERE run_at >= ? GROUP BY 1, 2
+            """,
+            (since.isoformat(),)
+        )
+        for weekday, hour, days in rows:
+            stats[((weekday + 6) % 7, hour)] = (days, 0, None)
+        rows = conn.execute(
+            """
+            SELECT CAST(strftime('%w', appeared_at) AS INTEGER), CAST(strftime('%H', appeared_at) AS INTEGER),
+                   COUNT(*),
+                   AVG(CASE WHEN julianday(slot) > julianday(last_seen) + 1
+                            THEN (julianday(gone_at) - julianday(appeared_at)) * 86400 END)
+            FROM (
+                SELECT slots.*, (SELECT run_at FROM runs WHERE target = slots.target AND id > slots.last_run ORDER BY id LIMIT 1) AS gone_at
+                FROM slots
+            ) AS slots
+            WHERE appeared_at >= ? AND appeared_run > (SELECT MIN(id) FROM runs WHERE target = slots.target)
+            GROUP BY 1, 2
+            """,
+            (since.isoformat(),)
+        )
+        for weekday, hour, appeared, lifetime in rows:
+            key = ((weekday + 6) % 7, hour)
+            stats[key] = (stats.get(key, (1, 0, None))[0], appeared, lifetime)
+        return stats
+    finally:
+        conn.close()
+
+def count_appeared_since(since, path=None):
+    """
+    Args:
+        since: datetime.
+        path: Optional database path.
+    Returns:
+        Number of slots of all targets that appeared since then, not counting the first
+        run of a target.
+    """
+    conn = connect(path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM slots WHERE appeared_at >= ? "
+            "AND appeared_run > (SELECT MIN(id) FROM runs WHERE target = slots.target)",
+            (since.isoformat(),)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+def record_rebooking(target, slot, previous_slot, outcome, seconds=None, detail=None, now=None, path=None):
+    """
+    Records an attempt to move a booking to an earlier slot.
+    Args:
+        target: Target name.
+        slot: datetime of the slot booked.
+        previous_slot: Previously scheduled datetime or None.
+        outcome: Outcome string, e.g. "booked".
+        seconds: Optional time from finding the slot to the end of the attempt.
+        detail: Optional error message.
+        now: Optional time of the attempt, defaults to now.
+        path: Optional database path.
+    Returns:
+        ID of the attempt.
+    """
+    conn = connect(path)
+    try:
+        with conn:
+            return conn.execute(
+                "INSERT INTO rebookings (target, attempted_at, slot, previous_slot, outcome, seconds, detail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (target, (now or datetime.now()).isoformat(), slot.isoformat(),
+                 previous_slot.isoformat() if previous_slot else None, outcome, seconds, detail)
+            ).lastrowid
+    finally:
+        conn.close()
+
+def get_rebookings(target="default", path=None):
+    """
+    Returns the rebooking attempts of a target, oldest first.
+    Args:
+        target: Target name.
+        path: Optional database path.
+    Returns:
+        List of dicts with the columns of the rebookings table.
+    """
+    conn = connect(path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = conn.execute("SELECT * FROM rebookings WHERE target = ? ORDER BY id", (target,))
+        return [dict(row) for row in rows]
+    finally:
+        conn.close()
+
+def prune(retention_days, now=None, path=None):
+    """
+    Deletes slots not seen and runs older than the retention period. The latest run of each
+    target is kept so the next scan can still tell which slots are new.
+    Args:
+        retention_days: Number of days to keep.
+        now: Optional current time, defaults to now.
+        path: Optional database path.
+    Returns:
+        Number of deleted slots.
     """
-    with open(LAST_DATES_PATH, "w") as f:
-        json.dump([dt.isoformat() for dt in dates], f)
+    cutoff = ((now or datetime.now()) - timedelta(days=retention_days)).isoformat()
+    conn = connect(path)
+    try:
+        with conn:
+            deleted = conn.execute("DELETE FROM slots WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute(
+                "DELETE FROM runs WHERE run_at < ? AND id NOT IN (SELECT MAX(id) FROM runs GROUP BY target)",
+                (cutoff,)
+            )
+        return deleted
+    finally:
+        conn.close()
@@ -1,15 +1,257 @@
+import asyncio
+import re
+import time
+from datetime import timedelta
 import telegram
+from telegram.request import HTTPXRequest
 
-async def send_telegram_message(token, chat_id, message):
+# Defaults for the [TELEGRAM] section. Telegram allows about 30 messages per second in
+# total and one message per second to the same chat.
+DEFAULT_RATE_PER_SECOND = 25
+DEFAULT_CHAT_INTERVAL_SECONDS = 1.0
+DEFAULT_COALESCE_SECONDS = 2.0
+DEFAULT_MAX_RETRIES = 3
+
+# First wait after a timeout or network error, doubled with every retry
+RETRY_DELAY_SECONDS = 1.0
+
+# Longest text Telegram accepts in one message
+MAX_MESSAGE_LENGTH = 4096
+
+def split_chat_ids(value):
+    """
+    Args:
+        value: CHAT_ID setting, one or more comma separated chat IDs.
+    Returns:
+        List of chat ID strings.
+    """
+    return [chat_id.strip() for chat_id in (value or "").split(",") if chat_id.strip()]
+
+def split_message(message, limit=MAX_MESSAGE_LENGTH):
     """
-    Sends a message via Telegram bot.
+    Splits an HTML message into parts of at most limit characters at line breaks, so no
+    tag or entity is cut. The messages never open a tag on one line and close it on
+    another. A single line longer than limit loses its tags and is cut between entities.
     Args:
-        token: Telegram bot token string.
-        chat_id: Telegram chat ID string.
-        message: Message string to send.
-    """
-    bot = telegram.Bot(token=token)
-    try:
-        await bot.send_message(chat_id=chat_id, text=message, parse_mode=telegram.constants.ParseMode.HTML)
-    except Exception as e:
-        print(f"Telegram error: {e}")
+        message: Message string.
+        limit: Maximum length of a part.
+    Returns:
+        List of parts.
+    """
+    parts = []
+    for line in message.split("\n"):
+        while len(line) > limit:
+            line = re.sub(r"<[^>]*>", "", line)
+            if len(line) <= limit:
+                break
+            cut = limit
+            entity = line.rfind("&", 0, cut)
+            if entity != -1 and ";" not in line[entity:cut]:
+                cut = entity
+            parts.append(line[:cut])
+            line = line[cut:]
+        if parts and len(parts[-1]) + 1 + len(line) <= limit:
+            parts[-1] += "\n" + line
+        else:
+            parts.append(line)
+    return parts
+
+def join_messages(messages, limit=MAX_MESSAGE_LENGTH):
+    """
+    Combines messages into as few texts as possible, each at most limit characters long.
+    Longer messages are split with split_message.
+    Args:
+        messages: List of message strings.
+        limit: Maximum length of a text.
+    Returns:
+        List of texts.
+    """
+    texts = []
+    for message in messages:
+        for part in split_message(message, limit):
+            if texts and len(texts[-1]) + 2 + len(part) <= limit:
+                texts[-1] += "\n\n" + part
+            else:
+                texts.append(part)
+    return texts
+
+class TokenBucket:
+    """
+    Hands out at most rate tokens per second, with bursts of up to capacity tokens.
+    Waiting callers are served in order.
+    """
+    def __init__(self, rate, capacity=1):
+        """
+        Args:
+            rate: Tokens added per second.
+            capacity: Maximum number of tokens.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """
+        Waits until a token is available and takes it.
+        """
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class TelegramNotifier:
+    """
+    Sends notifications to several chats over one bot and connection pool. Messages
+    arriving within the coalesce window are combined, and every chat is sent to
+    concurrently within Telegram's rate limits. Transient failures are retried.
+    """
+    def __init__(self, token, chat_ids, rate_per_second=DEFAULT_RATE_PER_SECOND,
+                 chat_interval_seconds=DEFAULT_CHAT_INTERVAL_SECONDS, coalesce_seconds=DEFAULT_COALESCE_SECONDS,
+                 max_retries=DEFAULT_MAX_RETRIES, bot=None):
+        """
+        Args:
+            token: Telegram bot token string.
+            chat_ids: List of chat ID strings.
+            rate_per_second: Maximum number of messages per second over all chats.
+            chat_interval_seconds: Minimum time between two messages to the same chat.
+            coalesce_seconds: Messages within this time after the first one are sent as one.
+                0 sends every message immediately.
+            max_retries: Number of retries after a transient failure.
+            bot: Optional telegram.Bot, created from token if not given.
+        """
+        self.bot = bot or telegram.Bot(token=token, request=HTTPXRequest(connection_pool_size=max(len(chat_ids), 1) + 1))
+        self.chat_ids = chat_ids
+        self.bucket = TokenBucket(rate_per_second, capacity=rate_per_second)
+        self.chat_interval_seconds = chat_interval_seconds
+        self.chat_buckets = {}
+        self.coalesce_seconds = coalesce_seconds
+        self.max_retries = max_retries
+        self.retry_delay_seconds = RETRY_DELAY_SECONDS
+        self.pending = []
+        self._flush_task = None
+        self._tasks = set()
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Creates a notifier from the [TELEGRAM] section.
+        Args:
+            config: ConfigParser object.
+        Returns:
+            TelegramNotifier, or None if Telegram is disabled or not configured.
+        """
+        if not config.getboolean("TELEGRAM", "ENABLED", fallback=False):
+            return None
+        section = config["TELEGRAM"]
+        token = section.get("TELEGRAM_BOT_TOKEN", "")
+        chat_ids = split_chat_ids(section.get("CHAT_ID"))
+        if not token or not chat_ids:
+            return None
+        return cls(
+            token,
+            chat_ids,
+            rate_per_second=section.getfloat("RATE_PER_SECOND", fallback=DEFAULT_RATE_PER_SECOND),
+            chat_interval_seconds=section.getfloat("CHAT_INTERVAL_SECONDS", fallback=DEFAULT_CHAT_INTERVAL_SECONDS),
+            coalesce_seconds=section.getfloat("COALESCE_SECONDS", fallback=DEFAULT_COALESCE_SECONDS),
+            max_retries=section.getint("MAX_RETRIES", fallback=DEFAULT_MAX_RETRIES),
+        )
+
+    async def notify(self, message):
+        """
+        Queues a message. It is sent when the coalesce window of the first queued message
+        ends, together with all messages queued until then. Returns without waiting for
+        the message to be sent.
+        Args:
+            message: Message string, HTML formatted.
+        """
+        self.pending.append(message)
+        if self.coalesce_seconds <= 0:
+            self.flush()
+        elif self._flush_task is None:
+            self._flush_task = self._start(self._flush_later())
+
+    def flush(self):
+        """
+        Sends the queued messages to all chats now.
+        """
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        texts = join_messages(self.pending)
+        self.pending = []
+        for text in texts:
+            for chat_id in self.chat_ids:
+                self._start(self.send(chat_id, text))
+
+    async def close(self):
+        """
+        Sends the queued messages, waits until all messages are sent and closes the
+        connection pool.
+        """
+        self.flush()
+        while self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        try:
+            await self.bot.shutdown()
+        except Exception as e:
+            print(f"Could not close Telegram connection: {e}")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def _start(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.coalesce_seconds)
+        self.flush()
+
+    async def send(self, chat_id, text):
+        """
+        Sends a text to one chat within the rate limits, retrying after flood control,
+        timeouts and network errors with exponential backoff.
+        Args:
+            chat_id: Chat ID string.
+            text: Message string, HTML formatted.
+        Returns:
+            True if the message was sent.
+        """
+        chat_bucket = self.chat_buckets.setdefault(chat_id, TokenBucket(1 / self.chat_interval_seconds))
+        delay = self.retry_delay_seconds
+        for attempt in range(self.max_retries + 1):
+            await chat_bucket.acquire()
+            await self.bucket.acquire()
+            try:
+                await self.bot.send_message(chat_id=chat_id, text=text, parse_mode=telegram.constants.ParseMode.HTML)
+                return True
+            except telegram.error.BadRequest as e:
+                # Subclass of NetworkError, but sending again will not help
+                print(f"Telegram error for chat {chat_id}: {e}")
+                return False
+            except telegram.error.RetryAfter as e:
+                retry_after = e.retry_after
+                wait = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+            except (telegram.error.TimedOut, telegram.error.NetworkError) as e:
+                print(f"Telegram error for chat {chat_id}: {e}")
+                wait = delay
+                delay *= 2
+            except Exception as e:
+                print(f"Telegram error for chat {chat_id}: {e}")
+                return False
+            if attempt < self.max_retries:
+                await asyncio.sleep(wait)
+        print(f"Giving up sending Telegram message to chat {chat_id} after {self.max_retries} retries.")
+        return False
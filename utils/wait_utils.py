@@ -0,0 +1,70 @@
+import asyncio
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+async def wait_for_any(page, states, timeout=5000):
+    """
+    Waits until the first of several possible page states is visible.
+    Args:
+        page: Playwright page object.
+        states: List of (name, selector) tuples, ordered from most to least advanced state.
+        timeout: Maximum time to wait in milliseconds.
+    Returns:
+        Name of the most advanced visible state, or None if none became visible in time.
+    """
+    locators = [(name, page.locator(selector).first) for name, selector in states]
+    any_state = locators[0][1]
+    for _, locator in locators[1:]:
+        any_state = any_state.or_(locator)
+    try:
+        await any_state.first.wait_for(state="visible", timeout=timeout)
+    except PlaywrightTimeoutError:
+        return None
+    for name, locator in locators:
+        if await locator.is_visible():
+            return name
+    return None
+
+async def wait_for_state_to_pass(page, selector, later_states, timeout=5000):
+    """
+    Waits until the element of a state that was just handled is hidden or detached, or one
+    of the later states is visible. While a click still changes the Angular route, the
+    clicked element stays visible and would otherwise win the next wait_for_any again.
+    Args:
+        page: Playwright page object.
+        selector: CSS selector of the handled state.
+        later_states: List of (name, selector) tuples of the states that may follow it.
+        timeout: Maximum time to wait in milliseconds.
+    Returns:
+        True if the state passed, False if it was still shown after timeout.
+    """
+    waits = [page.locator(selector).first.wait_for(state="hidden", timeout=timeout)]
+    if later_states:
+        any_state = page.locator(later_states[0][1]).first
+        for _, later_selector in later_states[1:]:
+            any_state = any_state.or_(page.locator(later_selector).first)
+        waits.append(any_state.first.wait_for(state="visible", timeout=timeout))
+    pending = [asyncio.ensure_future(wait) for wait in waits]
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if any(task.exception() is None for task in done):
+                return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def wait_for_text_change(page, selector, old_text, timeout=5000):
+    """
+    Waits until the text of an element differs from old_text.
+    Args:
+        page: Playwright page object.
+        selector: CSS selector of the element.
+        old_text: Text before the change.
+        timeout: Maximum time to wait in milliseconds.
+    """
+    await page.wait_for_function(
+        "([selector, oldText]) => { const el = document.querySelector(selector); return el && el.innerText !== oldText; }",
+        arg=[selector, old_text],
+        timeout=timeout,
+    )